@@ -14,6 +14,16 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# 与应用保持一致：设置 DATABASE_URL 时迁移目标为该数据库（configparser 需要转义 %）
+import os
+
+_database_url = os.getenv("DATABASE_URL")
+if _database_url:
+    for _prefix in ("postgres://", "postgresql://"):
+        if _database_url.startswith(_prefix):
+            _database_url = "postgresql+psycopg://" + _database_url[len(_prefix):]
+    config.set_main_option("sqlalchemy.url", _database_url.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 from db.models import BaseModel
@@ -74,7 +84,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
                 # -------- 关键配置 --------
-            render_as_batch = True,  # 启用批处理模式，适配 SQLite
+            render_as_batch = connection.dialect.name == "sqlite",  # SQLite 使用批处理模式
             dialect_opts = {"paramstyle": "named"},
         )
 
@@ -0,0 +1,155 @@
+"""split execution results into summary columns and compressed detail
+
+Revision ID: a2b3c4d5e6f7
+Revises: 9f1a2b3c4d5e
+Create Date: 2026-10-19 00:00:00.000000
+"""
+import gzip
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a2b3c4d5e6f7"
+down_revision: Union[str, Sequence[str], None] = "9f1a2b3c4d5e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SUMMARY_COLUMNS = ("duration_ms", "total_steps", "passed_steps", "failed_steps")
+RESULT_TABLES = {
+    "apiscenarioresult": "scenario_result",
+    "testcaseexecutionlog": "testcase_log",
+}
+BATCH_SIZE = 500
+
+
+def _summary(result: dict) -> dict:
+    steps = [step for step in (result.get("steps") or []) if isinstance(step, dict)]
+    passed_steps = sum(1 for step in steps if step.get("status") == "passed")
+    duration_ms = sum(int((step.get("response") or {}).get("elapsed_ms") or 0) for step in steps)
+    return {
+        "duration_ms": duration_ms,
+        "total_steps": len(steps),
+        "passed_steps": passed_steps,
+        "failed_steps": len(steps) - passed_steps,
+    }
+
+
+def _move_results_to_detail(table_name: str, owner_type: str) -> None:
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        # 已有详情的记录（应用启动后按新格式写入的）跳过
+        rows = conn.execute(
+            sa.text(
+                f"SELECT id, created_at, result FROM {table_name} t WHERE id > :last_id AND NOT EXISTS ("
+                "SELECT 1 FROM executionresultdetail d WHERE d.owner_type = :owner_type AND d.owner_id = t.id"
+                ") ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "owner_type": owner_type, "limit": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        for row_id, created_at, raw in rows:
+            last_id = row_id
+            try:
+                result = json.loads(raw) if isinstance(raw, str) else (raw or {})
+            except ValueError:
+                result = {}
+            if not isinstance(result, dict):
+                result = {}
+            encoded = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            conn.execute(
+                sa.text(
+                    "INSERT INTO executionresultdetail "
+                    "(created_at, updated_at, owner_type, owner_id, codec, raw_size, payload) "
+                    "VALUES (:created_at, :created_at, :owner_type, :owner_id, 'gzip', :raw_size, :payload)"
+                ),
+                {
+                    "created_at": created_at,
+                    "owner_type": owner_type,
+                    "owner_id": row_id,
+                    "raw_size": len(encoded),
+                    "payload": gzip.compress(encoded, compresslevel=6),
+                },
+            )
+            conn.execute(
+                sa.text(
+                    f"UPDATE {table_name} SET result = '{{}}', duration_ms = :duration_ms, "
+                    "total_steps = :total_steps, passed_steps = :passed_steps, failed_steps = :failed_steps "
+                    "WHERE id = :id"
+                ),
+                {"id": row_id, **_summary(result)},
+            )
+
+
+def upgrade() -> None:
+    # 应用启动时 create_all 和自动补列可能已经建好表和列，只补缺失的部分，数据迁移照常执行
+    inspector = sa.inspect(op.get_bind())
+    if "executionresultdetail" not in inspector.get_table_names():
+        op.create_table(
+            "executionresultdetail",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("owner_type", sa.String(), nullable=False),
+            sa.Column("owner_id", sa.Integer(), nullable=False),
+            sa.Column("codec", sa.String(), nullable=False),
+            sa.Column("raw_size", sa.Integer(), nullable=False),
+            sa.Column("payload", sa.LargeBinary(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    op.create_index(
+        "ix_executionresultdetail_owner",
+        "executionresultdetail",
+        ["owner_type", "owner_id"],
+        unique=True,
+        if_not_exists=True,
+    )
+
+    for table_name, owner_type in RESULT_TABLES.items():
+        columns = {column["name"] for column in inspector.get_columns(table_name)}
+        missing = [column for column in SUMMARY_COLUMNS if column not in columns]
+        if missing:
+            with op.batch_alter_table(table_name, schema=None) as batch_op:
+                for column in missing:
+                    batch_op.add_column(sa.Column(column, sa.Integer(), nullable=False, server_default="0"))
+        _move_results_to_detail(table_name, owner_type)
+
+
+def _check_detail_codecs(conn) -> None:
+    """降级会删除 executionresultdetail，存在无法解码的结果时直接中止，避免数据丢失"""
+    codecs = {row[0] for row in conn.execute(sa.text("SELECT DISTINCT codec FROM executionresultdetail"))}
+    unknown = codecs - {"gzip", "zstd"}
+    if unknown:
+        raise RuntimeError(f"executionresultdetail 中存在未知编码 {sorted(unknown)}，已中止降级")
+    if "zstd" in codecs:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise RuntimeError("executionresultdetail 中存在 zstd 编码的结果，请先安装 zstandard 再降级") from None
+
+
+def downgrade() -> None:
+    from app.services.result_store import decompress_payload
+
+    conn = op.get_bind()
+    _check_detail_codecs(conn)
+    for table_name, owner_type in RESULT_TABLES.items():
+        rows = conn.execute(
+            sa.text("SELECT owner_id, codec, payload FROM executionresultdetail WHERE owner_type = :owner_type"),
+            {"owner_type": owner_type},
+        ).fetchall()
+        for owner_id, codec, payload in rows:
+            conn.execute(
+                sa.text(f"UPDATE {table_name} SET result = :result WHERE id = :id"),
+                {"id": owner_id, "result": decompress_payload(payload, codec).decode("utf-8")},
+            )
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for column in reversed(SUMMARY_COLUMNS):
+                batch_op.drop_column(column)
+
+    op.drop_index("ix_executionresultdetail_owner", table_name="executionresultdetail")
+    op.drop_table("executionresultdetail")
@@ -0,0 +1,58 @@
+"""add api endpoint latency stat table
+
+Revision ID: b3c4d5e6f7a8
+Revises: a2b3c4d5e6f7
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+
+revision: str = "b3c4d5e6f7a8"
+down_revision: Union[str, Sequence[str], None] = "a2b3c4d5e6f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 应用启动时 create_all 可能已经建好该表和索引
+    if "apiendpointlatencystat" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "apiendpointlatencystat",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("project_id", sa.Integer(), nullable=False),
+            sa.Column("endpoint_id", sa.Integer(), nullable=False),
+            sa.Column("stat_date", sa.String(), nullable=False),
+            sa.Column("phase", sa.String(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.Column("total_ms", sa.Float(), nullable=False),
+            sa.Column("min_ms", sa.Float(), nullable=True),
+            sa.Column("max_ms", sa.Float(), nullable=True),
+            sa.Column("buckets", sqlite.JSON(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    op.create_index(
+        "ix_apiendpointlatencystat_key",
+        "apiendpointlatencystat",
+        ["endpoint_id", "stat_date", "phase"],
+        unique=True,
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_apiendpointlatencystat_project",
+        "apiendpointlatencystat",
+        ["project_id", "stat_date"],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_apiendpointlatencystat_project", table_name="apiendpointlatencystat")
+    op.drop_index("ix_apiendpointlatencystat_key", table_name="apiendpointlatencystat")
+    op.drop_table("apiendpointlatencystat")
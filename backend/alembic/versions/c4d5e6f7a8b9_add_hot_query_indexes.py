@@ -0,0 +1,37 @@
+"""add composite indexes for hot list/count queries
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3c4d5e6f7a8
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "c4d5e6f7a8b9"
+down_revision: Union[str, Sequence[str], None] = "b3c4d5e6f7a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 应用启动时也会补建模型中声明的索引，这里使用 if_not_exists 避免重复创建
+INDEXES = (
+    ("ix_testcase_session_module_status", "testcase", ["session_id", "module_id", "status", "bug_id"]),
+    ("ix_historyprompt_module_created", "historyprompt", ["module_id", "created_at"]),
+    ("ix_historyprompt_session_created", "historyprompt", ["session_id", "created_at"]),
+    ("ix_apiscenarioresult_retention", "apiscenarioresult", ["scenario_id", "user_id", "created_at", "id"]),
+    ("ix_testcaseexecutionlog_retention", "testcaseexecutionlog", ["testcase_id", "created_at", "id"]),
+    ("ix_mocklog_created", "mocklog", ["created_at", "id"]),
+    ("ix_mocklog_config_created", "mocklog", ["config_id", "created_at", "id"]),
+    ("ix_mocklog_matched_created", "mocklog", ["matched", "created_at", "id"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,35 @@
+"""add ordering indexes for testcase keyset pagination
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "d5e6f7a8b9c0"
+down_revision: Union[str, Sequence[str], None] = "c4d5e6f7a8b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与列表排序 (case_level, created_at DESC, id DESC) 一致，翻页时无需临时排序
+INDEXES = (
+    ("ix_testcase_session_order", ["session_id", "case_level", sa.text("created_at DESC"), sa.text("id DESC")]),
+    (
+        "ix_testcase_module_order",
+        ["session_id", "module_id", "case_level", sa.text("created_at DESC"), sa.text("id DESC")],
+    ),
+)
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES:
+        op.create_index(name, "testcase", columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="testcase", if_exists=True)
@@ -0,0 +1,47 @@
+"""add load test run table
+
+Revision ID: e7f8a9b0c1d2
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+
+revision: str = "e7f8a9b0c1d2"
+down_revision: Union[str, Sequence[str], None] = "d5e6f7a8b9c0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 应用启动时 create_all 可能已经建好该表和索引
+    if "loadtestrun" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "loadtestrun",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("target_type", sa.String(), nullable=False),
+            sa.Column("target_id", sa.Integer(), nullable=False),
+            sa.Column("target_name", sa.String(), nullable=False),
+            sa.Column("project_id", sa.Integer(), nullable=True),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("config", sqlite.JSON(), nullable=True),
+            sa.Column("summary", sqlite.JSON(), nullable=True),
+            sa.Column("timeline", sqlite.JSON(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.Column("user_id", sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    op.create_index("ix_loadtestrun_user_id", "loadtestrun", ["user_id"], unique=False, if_not_exists=True)
+    op.create_index("ix_loadtestrun_user_created", "loadtestrun", ["user_id", "created_at", "id"], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_loadtestrun_user_created", table_name="loadtestrun")
+    op.drop_index("ix_loadtestrun_user_id", table_name="loadtestrun")
+    op.drop_table("loadtestrun")
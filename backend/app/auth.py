@@ -2,17 +2,22 @@
 
 实现基于 Keycloak JWKS 公钥的本地 JWT 验证，无需每次请求回调 Keycloak introspect 端点。
 """
+import asyncio
+import hashlib
 import os
 import time
 import logging
+from collections import OrderedDict
 from typing import Optional
 
-import httpx
 from jose import JWTError, jwt, jwk
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 
+from utils.http_clients import POOL_IDENTITY, http_session
+from utils.metrics import register_cache_stats
+
 logger = logging.getLogger(__name__)
 
 # Keycloak 配置（从环境变量读取）
@@ -23,10 +28,23 @@ KEYCLOAK_EXTERNAL_URL = os.getenv("KEYCLOAK_EXTERNAL_URL", KEYCLOAK_SERVER_URL)
 KEYCLOAK_REALM = os.getenv("KEYCLOAK_REALM", "ai-testcase")
 KEYCLOAK_CLIENT_ID = os.getenv("KEYCLOAK_CLIENT_ID", "backend")
 
-# JWKS 缓存
-_jwks_cache: Optional[dict] = None
-_jwks_cache_time: float = 0
+# 已验证 Token 缓存条数，0 表示关闭；缓存项在 Token 过期时失效
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+# JWKS 缓存：按 kid 保存已解析好的公钥，过期后在后台刷新，刷新期间继续使用旧公钥
 _JWKS_CACHE_TTL = 86400  # 24小时刷新一次
+_JWKS_MISS_REFRESH_INTERVAL = 30  # 遇到未知 kid 时最短的强制刷新间隔（秒），防止伪造 kid 刷爆 Keycloak
+_public_keys: dict[str, object] = {}
+_jwks_fetched_at: float = 0
+_jwks_lock: Optional[asyncio.Lock] = None
+_jwks_refresh_task: Optional[asyncio.Task] = None
+
+# 已验证 Token 的 LRU：sha256(token) -> (用户信息, 过期时间戳)
+_token_cache: "OrderedDict[str, tuple[UserInfo, float]]" = OrderedDict()
+_token_cache_hits = 0
+_token_cache_misses = 0
+
+_ISSUER = f"{KEYCLOAK_EXTERNAL_URL}/realms/{KEYCLOAK_REALM}"
 
 security = HTTPBearer(auto_error=False)
 
@@ -44,44 +62,132 @@ def _get_jwks_url() -> str:
     return f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs"
 
 
-def _get_jwks() -> dict:
-    """从 Keycloak 获取 JWKS 公钥，带内存缓存"""
-    global _jwks_cache, _jwks_cache_time
+def _parse_jwks(jwks: dict) -> dict[str, object]:
+    """把 JWKS 中的签名公钥预先构造为 Key 对象，验证时无需再解析"""
+    keys = {}
+    for key in jwks.get("keys", []):
+        if key.get("use", "sig") != "sig" or not key.get("kid"):
+            continue
+        try:
+            keys[key["kid"]] = jwk.construct(key, algorithm=key.get("alg", "RS256"))
+        except JWTError as e:
+            logger.warning(f"Skip unsupported JWKS key {key.get('kid')}: {e}")
+    return keys
+
+
+async def _fetch_jwks() -> None:
+    """异步拉取 JWKS 并替换公钥表，同一时刻只有一个请求在拉取"""
+    global _public_keys, _jwks_fetched_at, _jwks_lock
+    if _jwks_lock is None:
+        _jwks_lock = asyncio.Lock()
+    fetched_at = _jwks_fetched_at
+    async with _jwks_lock:
+        if _jwks_fetched_at != fetched_at:
+            return  # 等锁期间其它请求已刷新
+        try:
+            async with http_session(POOL_IDENTITY, timeout=10) as client:
+                response = await client.get(_get_jwks_url())
+                response.raise_for_status()
+                keys = _parse_jwks(response.json())
+        except Exception as e:
+            logger.error(f"Failed to fetch JWKS: {e}")
+            if not _public_keys:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Unable to fetch authentication keys"
+                )
+            logger.warning("Using cached JWKS as fallback")
+            _jwks_fetched_at = time.time()  # 失败后同样等待一个刷新间隔，避免每个请求都去重试
+            return
+        _public_keys = keys
+        _jwks_fetched_at = time.time()
+        logger.info("JWKS public keys fetched and cached successfully")
 
-    now = time.time()
-    if _jwks_cache and (now - _jwks_cache_time) < _JWKS_CACHE_TTL:
-        return _jwks_cache
 
+def _schedule_jwks_refresh() -> None:
+    global _jwks_refresh_task
+    if _jwks_refresh_task is None or _jwks_refresh_task.done():
+        _jwks_refresh_task = asyncio.create_task(_refresh_jwks_quietly())
+
+
+async def _refresh_jwks_quietly() -> None:
     try:
-        with httpx.Client(timeout=10) as client:
-            response = client.get(_get_jwks_url())
-            response.raise_for_status()
-            _jwks_cache = response.json()
-            _jwks_cache_time = now
-            logger.info("JWKS public keys fetched and cached successfully")
-            return _jwks_cache
-    except Exception as e:
-        logger.error(f"Failed to fetch JWKS: {e}")
-        if _jwks_cache:
-            logger.warning("Using cached JWKS as fallback")
-            return _jwks_cache
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Unable to fetch authentication keys"
-        )
+        await _fetch_jwks()
+    except HTTPException:
+        pass
+
+
+async def _get_public_key(kid: Optional[str]):
+    """按 kid 获取公钥：首次使用时等待拉取，过期时后台刷新，未知 kid 时限频强制刷新"""
+    if not _public_keys:
+        await _fetch_jwks()
+    elif time.time() - _jwks_fetched_at >= _JWKS_CACHE_TTL:
+        _schedule_jwks_refresh()
+
+    key = _public_keys.get(kid)
+    if key is None and time.time() - _jwks_fetched_at >= _JWKS_MISS_REFRESH_INTERVAL:
+        # 公钥未找到（Keycloak 可能轮换了密钥），刷新 JWKS 缓存
+        logger.info(f"Key ID '{kid}' not found in JWKS, refreshing cache")
+        await _fetch_jwks()
+        key = _public_keys.get(kid)
+    return key
 
 
-def _refresh_jwks() -> dict:
-    """强制刷新 JWKS 缓存"""
-    global _jwks_cache, _jwks_cache_time
-    _jwks_cache = None
-    _jwks_cache_time = 0
-    return _get_jwks()
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _get_cached_user(cache_key: str) -> Optional[UserInfo]:
+    global _token_cache_hits, _token_cache_misses
+    entry = _token_cache.get(cache_key)
+    if entry is None or entry[1] <= time.time():
+        _token_cache.pop(cache_key, None)
+        _token_cache_misses += 1
+        return None
+    _token_cache.move_to_end(cache_key)
+    _token_cache_hits += 1
+    return entry[0]
+
 
+def _cache_user(cache_key: str, user: UserInfo, expires_at: Optional[float]) -> None:
+    if AUTH_TOKEN_CACHE_SIZE <= 0 or not expires_at:
+        return
+    _token_cache[cache_key] = (user, float(expires_at))
+    _token_cache.move_to_end(cache_key)
+    while len(_token_cache) > AUTH_TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
 
-def verify_token(token: str) -> UserInfo:
+
+def clear_token_cache() -> None:
+    _token_cache.clear()
+
+
+register_cache_stats("auth_token", lambda: (_token_cache_hits, _token_cache_misses, len(_token_cache)))
+
+
+def _user_from_payload(payload: dict) -> UserInfo:
+    # 提取用户信息
+    realm_access = payload.get("realm_access", {})
+    roles = list(realm_access.get("roles", []))
+
+    # 也检查 resource_access 中的客户端角色
+    resource_access = payload.get("resource_access", {})
+    client_roles = resource_access.get(KEYCLOAK_CLIENT_ID, {}).get("roles", [])
+    roles = list(dict.fromkeys(roles + client_roles))
+
+    return UserInfo(
+        user_id=payload.get("sub", ""),
+        username=payload.get("preferred_username", payload.get("sub", "")),
+        email=payload.get("email"),
+        roles=roles,
+    )
+
+
+async def verify_token(token: str) -> UserInfo:
     """验证 JWT Token 签名和有效期，返回用户信息
 
+    已验证过的 Token 在过期前直接命中缓存，不再重复验签。
+
     Args:
         token: JWT Token 字符串
 
@@ -91,65 +197,30 @@ def verify_token(token: str) -> UserInfo:
     Raises:
         HTTPException: Token 无效或过期
     """
-    jwks = _get_jwks()
+    cache_key = _token_cache_key(token)
+    cached = _get_cached_user(cache_key)
+    if cached is not None:
+        return cached
 
     try:
         # 获取 Token 的 kid (Key ID)
-        unverified_header = jwt.get_unverified_header(token)
-        kid = unverified_header.get("kid")
-
-        # 从 JWKS 中找到匹配的公钥
-        rsa_key = {}
-        for key in jwks.get("keys", []):
-            if key.get("kid") == kid:
-                rsa_key = key
-                break
-
-        if not rsa_key:
-            # 公钥未找到，尝试刷新 JWKS 缓存
-            logger.info(f"Key ID '{kid}' not found in JWKS, refreshing cache")
-            jwks = _refresh_jwks()
-            for key in jwks.get("keys", []):
-                if key.get("kid") == kid:
-                    rsa_key = key
-                    break
-
-        if not rsa_key:
+        kid = jwt.get_unverified_header(token).get("kid")
+        public_key = await _get_public_key(kid)
+        if public_key is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Unable to find matching key in JWKS"
             )
 
-        # 构造公钥用于验证
-        public_key = jwk.construct(rsa_key)
-
         # 验证 Token
         # issuer 使用外部地址（浏览器视角），JWKS 使用内部地址
-        issuer = f"{KEYCLOAK_EXTERNAL_URL}/realms/{KEYCLOAK_REALM}"
         payload = jwt.decode(
             token,
-            public_key.to_pem().decode("utf-8"),
+            public_key,
             algorithms=["RS256"],
-            issuer=issuer,
+            issuer=_ISSUER,
             options={"verify_aud": False},  # 前端 token 的 aud 是 frontend client，后端不做 audience 校验
         )
-
-        # 提取用户信息
-        realm_access = payload.get("realm_access", {})
-        roles = list(realm_access.get("roles", []))
-
-        # 也检查 resource_access 中的客户端角色
-        resource_access = payload.get("resource_access", {})
-        client_roles = resource_access.get(KEYCLOAK_CLIENT_ID, {}).get("roles", [])
-        roles = list(dict.fromkeys(roles + client_roles))
-
-        return UserInfo(
-            user_id=payload.get("sub", ""),
-            username=payload.get("preferred_username", payload.get("sub", "")),
-            email=payload.get("email"),
-            roles=roles,
-        )
-
     except JWTError as e:
         logger.warning(f"JWT verification failed: {e}")
         raise HTTPException(
@@ -158,6 +229,10 @@ def verify_token(token: str) -> UserInfo:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    user = _user_from_payload(payload)
+    _cache_user(cache_key, user, payload.get("exp"))
+    return user
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -176,7 +251,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return verify_token(credentials.credentials)
+    return await verify_token(credentials.credentials)
 
 
 async def get_optional_user(
@@ -186,6 +261,6 @@ async def get_optional_user(
     if credentials is None:
         return None
     try:
-        return verify_token(credentials.credentials)
+        return await verify_token(credentials.credentials)
     except HTTPException:
         return None
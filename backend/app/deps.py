@@ -3,7 +3,9 @@ from typing import Generator, Annotated
 from fastapi import Depends
 from sqlmodel import Session
 
-from db.db import engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.db import engine, get_async_db
 from app.auth import get_current_user, UserInfo
 
 
@@ -13,4 +15,5 @@ def get_db() -> Generator[Session, None, None]:
         yield session
     
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 CurrentUser = Annotated[UserInfo, Depends(get_current_user)]
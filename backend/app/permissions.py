@@ -1,8 +1,10 @@
 from collections.abc import Iterable
+from functools import lru_cache
 
 from fastapi import Depends, HTTPException, Request, status
 
 from app.auth import UserInfo, get_current_user
+from utils.metrics import register_cache_stats
 
 
 class Permission:
@@ -94,11 +96,20 @@ ROLE_PERMISSIONS: dict[str, set[str]] = {
 }
 
 
-def get_user_permissions(user: UserInfo) -> set[str]:
+@lru_cache(maxsize=256)
+def _role_set_permissions(roles: frozenset[str]) -> frozenset[str]:
     permissions: set[str] = set()
-    for role in user.roles:
+    for role in roles:
         permissions.update(ROLE_PERMISSIONS.get(role, set()))
-    return permissions
+    return frozenset(permissions)
+
+
+register_cache_stats("role_permissions", _role_set_permissions)
+
+
+def get_user_permissions(user: UserInfo) -> frozenset[str]:
+    # 角色组合很少，按角色集合缓存计算结果
+    return _role_set_permissions(frozenset(user.roles))
 
 
 def require_permissions(*required: str, require_all: bool = True):
@@ -1,12 +1,16 @@
 from typing import List, Optional
 
-import httpx
 from fastapi import APIRouter, File, Form, Query, UploadFile, status
+from fastapi import Response as HTTPResponse
+from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
+from sqlalchemy import delete
 from sqlmodel import select
 
 from app.deps import CurrentUser, SessionDep
 from app.services.api_test_tool import (
+    REMOVED_FROM_SPEC_TAG,
+    create_project_unit_test_scenarios,
     create_unit_test_scenario,
     detect_base_url,
     endpoints_from_spec,
@@ -17,8 +21,21 @@ from app.services.api_test_tool import (
     run_scenario,
     sync_project_from_spec,
 )
-from db.models import ApiEndpoint, ApiProject, ApiScenario, ApiScenarioResult
+from app.services.response_capture import get_blob_path
+from app.services.result_store import (
+    SCENARIO_RESULT,
+    delete_result_details,
+    load_result_detail,
+    load_result_details,
+    save_scenario_result,
+    with_result,
+)
+from app.services.step_timing import endpoint_latency_stats
+from db.write_queue import run_write
+from db.models import ApiEndpoint, ApiEndpointLatencyStat, ApiProject, ApiScenario, ApiScenarioResult
 from utils.base_response import Response
+from utils.http_clients import POOL_TARGETS, http_session
+from utils.pagination import decode_cursor, keyset_filter, keyset_order_by, row_cursor
 
 router = APIRouter(prefix="/api-test", tags=["api-test"])
 MAX_SCENARIO_RESULT_RECORDS = 10
@@ -56,6 +73,11 @@ class RunScenarioBatchRequest(BaseModel):
     run_all: bool = False
 
 
+class GenerateProjectScenarioTestsRequest(BaseModel):
+    endpoint_ids: List[int] = Field(default_factory=list)
+    generate_all: bool = False
+
+
 class ScenarioBatchResultItem(BaseModel):
     scenario_id: int
     scenario_name: str
@@ -208,9 +230,10 @@ def delete_project(project_id: int, session: SessionDep, user: CurrentUser):
         return Response(code=status.HTTP_404_NOT_FOUND, message="接口项目不存在")
     endpoints = session.exec(select(ApiEndpoint).where(ApiEndpoint.project_id == project_id)).all()
     scenarios = session.exec(select(ApiScenario).where(ApiScenario.project_id == project_id)).all()
-    results = session.exec(select(ApiScenarioResult).where(ApiScenarioResult.project_id == project_id)).all()
-    for item in results:
-        session.delete(item)
+    result_ids = select(ApiScenarioResult.id).where(ApiScenarioResult.project_id == project_id)
+    delete_result_details(session, SCENARIO_RESULT, result_ids)
+    session.exec(delete(ApiScenarioResult).where(ApiScenarioResult.project_id == project_id))
+    session.exec(delete(ApiEndpointLatencyStat).where(ApiEndpointLatencyStat.project_id == project_id))
     for item in endpoints + scenarios:
         session.delete(item)
     session.delete(db_project)
@@ -233,7 +256,7 @@ async def import_openapi(
         source_url = None
         project_name = name.strip() or (file.filename or "导入接口项目")
     elif source_url:
-        async with httpx.AsyncClient() as client:
+        async with http_session(POOL_TARGETS) as client:
             resp = await client.get(source_url, timeout=30.0)
             resp.raise_for_status()
             raw = resp.text
@@ -282,7 +305,7 @@ async def sync_openapi_project(project_id: int, session: SessionDep, user: Curre
     if project.source_type != "url" or not project.source_url:
         return Response(code=status.HTTP_400_BAD_REQUEST, message="Only URL imported projects can be synced")
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_session(POOL_TARGETS) as client:
             resp = await client.get(project.source_url, timeout=30.0)
             resp.raise_for_status()
             raw = resp.text
@@ -431,6 +454,7 @@ def delete_endpoint(endpoint_id: int, session: SessionDep, user: CurrentUser):
     db_endpoint = session.get(ApiEndpoint, endpoint_id)
     if not db_endpoint or db_endpoint.user_id != user.user_id:
         return Response(code=status.HTTP_404_NOT_FOUND, message="接口不存在")
+    session.exec(delete(ApiEndpointLatencyStat).where(ApiEndpointLatencyStat.endpoint_id == endpoint_id))
     session.delete(db_endpoint)
     session.commit()
     return Response(message="接口已删除")
@@ -448,6 +472,36 @@ async def run_api_endpoint(endpoint_id: int, request: RunEndpointRequest, sessio
     return Response(data=result, message="接口调试完成")
 
 
+@router.get("/projects/{project_id}/latency-stats", response_model=Response[List[dict]])
+def get_project_latency_stats(
+    project_id: int,
+    session: SessionDep,
+    user: CurrentUser,
+    endpoint_id: Optional[int] = Query(None, description="只查询指定接口"),
+    days: int = Query(7, ge=1, le=90, description="统计最近多少天"),
+):
+    """按接口返回各耗时阶段的 p50/p95/p99 及每日总耗时分位数"""
+    project = session.get(ApiProject, project_id)
+    if not project or project.user_id != user.user_id:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="接口项目不存在")
+    stats = endpoint_latency_stats(session, project_id, endpoint_id=endpoint_id, days=days)
+    endpoints = session.exec(
+        select(ApiEndpoint).where(ApiEndpoint.id.in_(list(stats)))
+    ).all() if stats else []
+    data = [
+        {
+            "endpoint_id": endpoint.id,
+            "name": endpoint.name,
+            "method": endpoint.method,
+            "path": endpoint.path,
+            **stats[endpoint.id],
+        }
+        for endpoint in endpoints
+    ]
+    data.sort(key=lambda item: -(item["phases"].get("total", {}).get("p95") or 0))
+    return Response(data=data)
+
+
 @router.post("/endpoints/{endpoint_id}/generate-body", response_model=Response[dict])
 async def generate_endpoint_body(endpoint_id: int, request: GenerateBodyRequest, session: SessionDep, user: CurrentUser):
     endpoint = session.get(ApiEndpoint, endpoint_id)
@@ -484,6 +538,42 @@ def generate_endpoint_scenario_tests(endpoint_id: int, session: SessionDep, user
     return Response(data=scenario, message="Scenario tests generated")
 
 
+@router.post("/projects/{project_id}/generate-scenario-tests", response_model=Response[List[ApiScenario]])
+def generate_project_scenario_tests(
+    project_id: int,
+    request: GenerateProjectScenarioTestsRequest,
+    session: SessionDep,
+    user: CurrentUser,
+):
+    project = session.get(ApiProject, project_id)
+    if not project or project.user_id != user.user_id:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="接口项目不存在")
+    if not request.generate_all and not request.endpoint_ids:
+        return Response(code=status.HTTP_400_BAD_REQUEST, message="请选择要生成单测的接口")
+
+    query = (
+        select(ApiEndpoint)
+        .where(ApiEndpoint.project_id == project_id)
+        .where(ApiEndpoint.user_id == user.user_id)
+        .order_by(ApiEndpoint.id)
+    )
+    if not request.generate_all:
+        query = query.where(ApiEndpoint.id.in_(request.endpoint_ids))
+    endpoints = session.exec(query).all()
+
+    if request.generate_all:
+        endpoints = [endpoint for endpoint in endpoints if REMOVED_FROM_SPEC_TAG not in (endpoint.tags or [])]
+    else:
+        found_ids = {endpoint.id for endpoint in endpoints}
+        missing_ids = [endpoint_id for endpoint_id in request.endpoint_ids if endpoint_id not in found_ids]
+        if missing_ids:
+            missing_text = ", ".join(str(endpoint_id) for endpoint_id in missing_ids)
+            return Response(code=status.HTTP_400_BAD_REQUEST, message=f"接口不存在或无权限: {missing_text}")
+
+    scenarios = create_project_unit_test_scenarios(session, project, list(endpoints), user.user_id)
+    return Response(data=scenarios, message=f"已生成 {len(scenarios)} 个接口单测场景")
+
+
 @router.get("/projects/{project_id}/scenarios", response_model=Response[List[ApiScenario]])
 def list_scenarios(project_id: int, session: SessionDep, user: CurrentUser):
     project = session.get(ApiProject, project_id)
@@ -540,32 +630,58 @@ def delete_scenario(scenario_id: int, session: SessionDep, user: CurrentUser):
     db_scenario = session.get(ApiScenario, scenario_id)
     if not db_scenario or db_scenario.user_id != user.user_id:
         return Response(code=status.HTTP_404_NOT_FOUND, message="场景不存在")
-    results = session.exec(select(ApiScenarioResult).where(ApiScenarioResult.scenario_id == scenario_id)).all()
-    for item in results:
-        session.delete(item)
+    result_ids = select(ApiScenarioResult.id).where(ApiScenarioResult.scenario_id == scenario_id)
+    delete_result_details(session, SCENARIO_RESULT, result_ids)
+    session.exec(delete(ApiScenarioResult).where(ApiScenarioResult.scenario_id == scenario_id))
     session.delete(db_scenario)
     session.commit()
     return Response(message="场景已删除")
 
 
+# 场景执行记录按时间倒序，与 ix_apiscenarioresult_retention 索引一致
+SCENARIO_RESULT_ORDER = ((ApiScenarioResult.created_at, True), (ApiScenarioResult.id, True))
+
+
 @router.get("/scenarios/{scenario_id}/results", response_model=Response[List[ApiScenarioResult]])
 def list_scenario_results(
     scenario_id: int,
     session: SessionDep,
     user: CurrentUser,
+    http_response: HTTPResponse,
     limit: int = Query(MAX_SCENARIO_RESULT_RECORDS, ge=1, le=50),
+    include_result: bool = Query(True, description="是否附带完整执行结果；为 false 时只返回摘要字段"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
 ):
     scenario = session.get(ApiScenario, scenario_id)
     if not scenario or scenario.user_id != user.user_id:
         return Response(code=status.HTTP_404_NOT_FOUND, message="场景不存在")
-    results = session.exec(
+    query = (
         select(ApiScenarioResult)
         .where(ApiScenarioResult.scenario_id == scenario_id)
         .where(ApiScenarioResult.user_id == user.user_id)
-        .order_by(ApiScenarioResult.created_at.desc(), ApiScenarioResult.id.desc())
-        .limit(limit)
-    ).all()
-    return Response(data=results)
+        .order_by(*keyset_order_by(SCENARIO_RESULT_ORDER))
+    )
+    if cursor:
+        try:
+            query = query.where(keyset_filter(SCENARIO_RESULT_ORDER, decode_cursor(cursor, SCENARIO_RESULT_ORDER)))
+        except ValueError as e:
+            return Response(code=status.HTTP_400_BAD_REQUEST, message=str(e))
+    results = session.exec(query.limit(limit)).all()
+    if len(results) == limit:
+        http_response.headers["X-Next-Cursor"] = row_cursor(results[-1], SCENARIO_RESULT_ORDER)
+    if not include_result:
+        return Response(data=results)
+    details = load_result_details(session, SCENARIO_RESULT, list(results))
+    return Response(data=[with_result(record, details[record.id]) for record in results])
+
+
+@router.get("/scenario-results/{record_id}", response_model=Response[ApiScenarioResult])
+def get_scenario_result(record_id: int, session: SessionDep, user: CurrentUser):
+    """获取单条场景执行记录的完整结果"""
+    record = session.get(ApiScenarioResult, record_id)
+    if not record or record.user_id != user.user_id:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="执行记录不存在")
+    return Response(data=with_result(record, load_result_detail(session, SCENARIO_RESULT, record)))
 
 
 @router.post("/projects/{project_id}/scenarios/run-batch", response_model=Response[RunScenarioBatchResponse])
@@ -611,7 +727,7 @@ async def run_api_scenarios_batch(
         except Exception as exc:
             result = {"passed": False, "error": str(exc), "steps": []}
 
-        record = _store_scenario_result(session, scenario, project, user.user_id, result)
+        record = await _store_scenario_result(scenario, project, user.user_id, result)
         if record.passed:
             passed_count += 1
         result_items.append(
@@ -621,7 +737,7 @@ async def run_api_scenarios_batch(
                 record_id=record.id,
                 passed=record.passed,
                 created_at=record.created_at.isoformat(),
-                result=record.result,
+                result=result,
             )
         )
 
@@ -634,36 +750,22 @@ async def run_api_scenarios_batch(
     return Response(data=response, message="场景批量执行完成")
 
 
-def _store_scenario_result(
-    session: SessionDep,
+async def _store_scenario_result(
     scenario: ApiScenario,
     project: ApiProject,
     user_id: str,
     result: dict,
 ) -> ApiScenarioResult:
-    record = ApiScenarioResult(
-        scenario_id=scenario.id,
-        project_id=project.id,
-        scenario_name=scenario.name,
-        passed=bool(result.get("passed")),
-        result=result,
+    scenario_id, project_id, scenario_name = scenario.id, project.id, scenario.name
+    return await run_write(lambda db: save_scenario_result(
+        db,
+        scenario_id=scenario_id,
+        project_id=project_id,
+        scenario_name=scenario_name,
         user_id=user_id,
-    )
-    session.add(record)
-    session.flush()
-
-    records = session.exec(
-        select(ApiScenarioResult)
-        .where(ApiScenarioResult.scenario_id == scenario.id)
-        .where(ApiScenarioResult.user_id == user_id)
-        .order_by(ApiScenarioResult.created_at.desc(), ApiScenarioResult.id.desc())
-    ).all()
-    for old_record in records[MAX_SCENARIO_RESULT_RECORDS:]:
-        session.delete(old_record)
-
-    session.commit()
-    session.refresh(record)
-    return record
+        result=result,
+        keep=MAX_SCENARIO_RESULT_RECORDS,
+    ))
 
 
 @router.post("/scenarios/{scenario_id}/run", response_model=Response[ApiScenarioResult])
@@ -675,5 +777,14 @@ async def run_api_scenario(scenario_id: int, session: SessionDep, user: CurrentU
     if not project or project.user_id != user.user_id:
         return Response(code=status.HTTP_404_NOT_FOUND, message="接口项目不存在")
     result = await run_scenario(session, scenario, project)
-    record = _store_scenario_result(session, scenario, project, user.user_id, result)
-    return Response(data=record, message="场景执行完成")
+    record = await _store_scenario_result(scenario, project, user.user_id, result)
+    return Response(data=with_result(record, result), message="场景执行完成")
+
+
+@router.get("/response-blobs/{digest}")
+def download_response_blob(digest: str, user: CurrentUser):
+    """下载被截断的完整响应体（按 sha256 寻址，仅限执行过产生该响应体的请求的用户）"""
+    path = get_blob_path(digest, user.user_id)
+    if path is None:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="响应体不存在或未开启完整响应体存储")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{digest}.body")
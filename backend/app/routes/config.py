@@ -6,6 +6,7 @@ from pydantic import BaseModel
 
 from config import config_manager
 from utils.base_response import Response
+from utils.http_clients import POOL_LLM, POOL_MCP, http_session
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +39,7 @@ async def _forward_cookie_to_lanhu_mcp(cookie: str) -> bool:
 
     for url in unique:
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
+            async with http_session(POOL_MCP, timeout=5) as client:
                 resp = await client.post(
                     f"{url}/config/cookie",
                     json={"cookie": cookie},
@@ -87,7 +88,7 @@ async def list_api_models(
         return Response(code=status.HTTP_400_BAD_REQUEST, message="api_key 不能为空")
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with http_session(POOL_LLM, timeout=15) as client:
             resp = await client.get(
                 f"{api_base_url}/models",
                 headers={"Authorization": f"Bearer {api_key}"},
@@ -126,7 +126,7 @@ class ExtractAndSaveRequest(BaseModel):
 def extract_and_save(request: ExtractAndSaveRequest, session: SessionDep, user: CurrentUser):
     """从响应数据中通过 JSONPath 提取变量，保存到指定环境参数中"""
     try:
-        from jsonpath_ng import parse
+        from utils.jsonpath_cache import find_jsonpath_values
 
         env = session.get(GlobalParameter, request.environment_id)
         if not env:
@@ -139,10 +139,9 @@ def extract_and_save(request: ExtractAndSaveRequest, session: SessionDep, user:
 
         for rule in request.extractions:
             try:
-                jsonpath_expr = parse(rule.jsonpath)
-                matches = jsonpath_expr.find(request.response_data)
+                matches = find_jsonpath_values(rule.jsonpath, request.response_data)
                 if matches:
-                    value = matches[0].value
+                    value = matches[0]
                     extracted[rule.variable] = str(value) if not isinstance(value, str) else value
 
                     # 更新或添加到参数列表
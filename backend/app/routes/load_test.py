@@ -0,0 +1,170 @@
+import asyncio
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlmodel import select
+
+from app.deps import CurrentUser, SessionDep
+from app.permissions import Permission, get_user_permissions
+from app.services.load_test import (
+    TARGET_SAVED_REQUEST,
+    can_start_load_test,
+    event_payload,
+    get_active_load_test,
+    load_target,
+    normalize_config,
+    start_load_test,
+)
+from db.models import ApiScenario, LoadTestRun, SavedRequest
+from utils.base_response import Response
+
+router = APIRouter(prefix="/load-tests", tags=["load-tests"])
+# SSE 心跳间隔，避免代理因长时间无数据断开连接
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+class LoadTestCreate(BaseModel):
+    target_type: Literal["saved_request", "scenario"] = "saved_request"
+    target_id: int
+    mode: Literal["concurrency", "rps"] = "concurrency"
+    concurrency: Optional[int] = Field(default=10, description="concurrency 模式下的虚拟用户数")
+    rps: Optional[float] = Field(default=None, description="rps 模式下的目标每秒迭代数")
+    max_concurrency: Optional[int] = Field(default=None, description="rps 模式下同时执行的迭代上限")
+    duration_seconds: int = 60
+    ramp_up_seconds: int = 0
+    think_time_ms: int = 0
+    timeout_seconds: float = 30.0
+    verify_ssl: bool = True
+    environment_id: Optional[int] = None
+    variables: List[dict] = Field(default_factory=list, description="覆盖环境/场景变量，格式同环境参数")
+    vu_variables: List[dict] = Field(default_factory=list, description="按虚拟用户轮流分配的数据行，如 [{\"user\": \"a\"}]")
+
+
+def _with_live_state(run: LoadTestRun) -> dict:
+    data = run.model_dump()
+    runner = get_active_load_test(run.id)
+    if runner is not None:
+        data.update(runner.snapshot())
+    return data
+
+
+@router.post("", response_model=Response[LoadTestRun])
+async def create_load_test(payload: LoadTestCreate, session: SessionDep, user: CurrentUser):
+    """创建并启动压测，结果通过 /load-tests/{id}/stream 实时推送"""
+    if not can_start_load_test():
+        return Response(code=status.HTTP_429_TOO_MANY_REQUESTS, message="进行中的压测过多，请稍后再试")
+    try:
+        config = normalize_config(payload.model_dump(exclude={"target_type", "target_id"}))
+    except ValueError as exc:
+        return Response(code=status.HTTP_400_BAD_REQUEST, message=str(exc))
+    # 与 /proxy/forward 一致：没有全局参数管理权限时不使用指定环境的参数
+    if config.get("environment_id") and Permission.GLOBAL_PARAMETER_MANAGE not in get_user_permissions(user):
+        config["environment_id"] = None
+
+    if payload.target_type == TARGET_SAVED_REQUEST:
+        target = session.get(SavedRequest, payload.target_id)
+        if not target:
+            return Response(code=status.HTTP_404_NOT_FOUND, message="请求配置不存在")
+        project_id = None
+    else:
+        target = session.get(ApiScenario, payload.target_id)
+        if not target or target.user_id != user.user_id:
+            return Response(code=status.HTTP_404_NOT_FOUND, message="场景不存在")
+        project_id = target.project_id
+
+    run = LoadTestRun(
+        target_type=payload.target_type,
+        target_id=payload.target_id,
+        target_name=target.name,
+        project_id=project_id,
+        config=config,
+        user_id=user.user_id,
+    )
+    try:
+        runner_target = load_target(session, run, config)
+    except ValueError as exc:
+        return Response(code=status.HTTP_400_BAD_REQUEST, message=str(exc))
+    session.add(run)
+    session.commit()
+    session.refresh(run)
+    start_load_test(run.id, config, runner_target)
+    return Response(data=run, message="压测已启动")
+
+
+@router.get("", response_model=Response[List[LoadTestRun]])
+def list_load_tests(
+    session: SessionDep,
+    user: CurrentUser,
+    target_type: Optional[str] = Query(default=None),
+    target_id: Optional[int] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=200),
+):
+    """压测记录列表（不含逐秒数据）"""
+    statement = select(LoadTestRun).where(LoadTestRun.user_id == user.user_id)
+    if target_type:
+        statement = statement.where(LoadTestRun.target_type == target_type)
+    if target_id is not None:
+        statement = statement.where(LoadTestRun.target_id == target_id)
+    runs = session.exec(statement.order_by(LoadTestRun.created_at.desc(), LoadTestRun.id.desc()).limit(limit)).all()
+    return Response(data=[run.model_dump(exclude={"timeline"}) for run in runs])
+
+
+@router.get("/{run_id}", response_model=Response[LoadTestRun])
+def get_load_test(run_id: int, session: SessionDep, user: CurrentUser):
+    """压测详情；进行中的压测返回实时汇总"""
+    run = session.get(LoadTestRun, run_id)
+    if not run or run.user_id != user.user_id:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="压测记录不存在")
+    return Response(data=_with_live_state(run))
+
+
+@router.post("/{run_id}/stop", response_model=Response)
+async def stop_load_test(run_id: int, session: SessionDep, user: CurrentUser):
+    run = session.get(LoadTestRun, run_id)
+    if not run or run.user_id != user.user_id:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="压测记录不存在")
+    runner = get_active_load_test(run_id)
+    if runner is None:
+        return Response(code=status.HTTP_400_BAD_REQUEST, message="压测已结束")
+    runner.stop()
+    return Response(message="已发送停止指令")
+
+
+@router.get("/{run_id}/stream")
+def stream_load_test(run_id: int, session: SessionDep, user: CurrentUser):
+    """以 SSE 推送压测进度：snapshot（当前状态）→ tick（每秒统计）→ done（汇总报告）"""
+    run = session.get(LoadTestRun, run_id)
+    if not run or run.user_id != user.user_id:
+        return Response(code=status.HTTP_404_NOT_FOUND, message="压测记录不存在")
+    runner = get_active_load_test(run_id)
+    finished = {"status": run.status, "summary": run.summary, "timeline": run.timeline}
+
+    async def _events():
+        if runner is None:
+            yield event_payload("done", finished)
+            return
+        queue = runner.subscribe()
+        try:
+            if runner.finished:
+                yield event_payload("done", {"status": runner.status, "summary": runner.summary})
+                return
+            yield event_payload("snapshot", runner.snapshot())
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield event_payload(event, data)
+                if event == "done":
+                    return
+        finally:
+            runner.unsubscribe(queue)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
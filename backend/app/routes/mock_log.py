@@ -1,40 +1,84 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Union
 
 from fastapi import APIRouter, Query
-from sqlmodel import select, func, desc
+from fastapi import Response as HTTPResponse
+from pydantic import BaseModel
+from sqlmodel import select, func
 
 from app.deps import SessionDep, CurrentUser
 from db.models import MockLog
 from utils.base_response import Response
+from utils.pagination import decode_cursor, keyset_filter, keyset_order_by, row_cursor
 
 router = APIRouter(prefix="/mock-logs", tags=["mock-logs"])
 
+# 日志按时间倒序，与 ix_mocklog_*_created 索引一致
+MOCK_LOG_ORDER = ((MockLog.created_at, True), (MockLog.id, True))
 
-@router.get("", response_model=Response[List[MockLog]])
+
+class MockLogSummary(BaseModel):
+    """view=summary 的日志条目：不含请求/响应头和body"""
+    id: int
+    config_id: Optional[int] = None
+    config_name: str
+    request_method: str
+    request_path: str
+    response_status_code: int
+    matched: bool
+    user_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+MOCK_LOG_SUMMARY_FIELDS = tuple(MockLogSummary.model_fields)
+
+
+# summary 在前：字段相同时联合类型按顺序选择，完整日志字段更多会匹配 MockLog
+@router.get("", response_model=Response[Union[List[MockLogSummary], List[MockLog]]])
 def get_mock_logs(
     session: SessionDep,
     user: CurrentUser,
+    http_response: HTTPResponse,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100),
     config_id: int | None = Query(default=None),
     matched: bool | None = Query(default=None),
+    cursor: str | None = Query(default=None, description="上一页响应头 X-Next-Cursor 的值；传入后忽略 page"),
+    view: str = Query(default="full", pattern="^(full|summary)$", description="summary 不返回请求/响应头和body"),
 ):
-    """获取Mock请求日志列表，支持分页和按config_id/matched过滤"""
+    """获取Mock请求日志列表，支持分页和按config_id/matched过滤
+
+    总数通过 X-Total-Count 响应头返回（游标翻页时不再统计），下一页游标通过 X-Next-Cursor 返回。
+    """
     filters = []
     if config_id is not None:
         filters.append(MockLog.config_id == config_id)
     if matched is not None:
         filters.append(MockLog.matched == matched)
 
-    total = session.exec(
-        select(func.count(MockLog.id)).where(*filters)
-    ).one()
+    if view == "summary":
+        query = select(*(getattr(MockLog, field) for field in MOCK_LOG_SUMMARY_FIELDS))
+    else:
+        query = select(MockLog)
+    query = query.where(*filters).order_by(*keyset_order_by(MOCK_LOG_ORDER))
+
+    if cursor:
+        try:
+            query = query.where(keyset_filter(MOCK_LOG_ORDER, decode_cursor(cursor, MOCK_LOG_ORDER)))
+        except ValueError as e:
+            return Response(code=400, message=str(e))
+    else:
+        total = session.exec(select(func.count(MockLog.id)).where(*filters)).one()
+        http_response.headers["X-Total-Count"] = str(total)
+        query = query.offset((page - 1) * page_size)
 
-    query = select(MockLog).where(*filters).order_by(desc(MockLog.created_at))
-    offset = (page - 1) * page_size
-    logs = session.exec(query.offset(offset).limit(page_size)).all()
+    rows = session.exec(query.limit(page_size)).all()
+    logs = [dict(row._mapping) for row in rows] if view == "summary" else rows
+    if len(logs) == page_size:
+        http_response.headers["X-Next-Cursor"] = row_cursor(logs[-1], MOCK_LOG_ORDER)
 
-    return Response(data=logs, pagination={"total": total, "page": page, "page_size": page_size})
+    return Response(data=logs)
 
 
 @router.get("/{log_id}", response_model=Response[MockLog])
@@ -3,16 +3,20 @@ import copy
 import json
 import logging
 import re
+import time
 import uuid
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Request, Response as HttpResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from db.db import engine
+from app.deps import AsyncSessionDep
+from db.write_queue import submit_write
 from db.models import MockConfig, GlobalParameter, MockLog
 from utils.js_expression import eval_js_expression
+from utils.metrics import observe_mock
 
 logger = logging.getLogger(__name__)
 
@@ -249,7 +253,20 @@ def _eval_js(expression: str) -> str | None:
     return eval_js_expression(expression)
 
 
-def _substitute_variables(text: str, env_id: Optional[int], path_params: dict = None) -> str:
+async def _load_env_params(db: AsyncSession, env_id: Optional[int]) -> dict:
+    """读取环境变量映射，每个 Mock 请求只查询一次"""
+    param_map = {}
+    if not env_id:
+        return param_map
+    env = await db.get(GlobalParameter, env_id)
+    if env:
+        for p in env.parameters or []:
+            if isinstance(p, dict) and p.get("key"):
+                param_map[p["key"]] = str(p.get("value", ""))
+    return param_map
+
+
+def _substitute_variables(text: str, env_params: Optional[dict], path_params: dict = None) -> str:
     """替换文本中的变量占位符，支持多种格式：
     
     替换顺序:
@@ -260,21 +277,13 @@ def _substitute_variables(text: str, env_id: Optional[int], path_params: dict =
     
     Args:
         text: 要替换的文本
-        env_id: 环境变量ID
+        env_params: 环境变量映射（由 _load_env_params 预先加载）
         path_params: 路径参数字典（如 {'id': '123'}）
     """
     if not text:
         return text
     
-    # 获取环境变量映射
-    param_map = {}
-    if env_id:
-        with Session(engine) as session:
-            env = session.exec(select(GlobalParameter).where(GlobalParameter.id == env_id)).first()
-        if env:
-            for p in env.parameters or []:
-                if isinstance(p, dict) and p.get("key"):
-                    param_map[p["key"]] = str(p.get("value", ""))
+    param_map = env_params or {}
     
     # 合并路径参数（路径参数优先级更高）
     if path_params:
@@ -368,39 +377,42 @@ def _save_mock_log(config_id, config_name, request_method, request_path,
                    request_headers, request_query_params, request_body,
                    response_status_code, response_headers, response_body,
                    matched, user_id):
-    """保存Mock请求日志到数据库"""
-    try:
-        with Session(engine) as session:
-            log = MockLog(
-                config_id=config_id,
-                config_name=config_name,
-                request_method=request_method,
-                request_path=request_path,
-                request_headers=request_headers,
-                request_query_params=request_query_params,
-                request_body=request_body,
-                response_status_code=response_status_code,
-                response_headers=response_headers,
-                response_body=response_body,
-                matched=matched,
-                user_id=user_id,
-            )
+    """保存Mock请求日志到数据库（交给后台写线程，不阻塞 Mock 响应）"""
+    log = MockLog(
+        config_id=config_id,
+        config_name=config_name,
+        request_method=request_method,
+        request_path=request_path,
+        request_headers=request_headers,
+        request_query_params=request_query_params,
+        request_body=request_body,
+        response_status_code=response_status_code,
+        response_headers=response_headers,
+        response_body=response_body,
+        matched=matched,
+        user_id=user_id,
+    )
+
+    def _write(session: Session) -> None:
+        try:
             session.add(log)
             session.commit()
-    except Exception as e:
-        logger.warning("Failed to save mock log: %s", e)
+        except Exception as e:
+            logger.warning("Failed to save mock log: %s", e)
+
+    submit_write(_write)
 
 
 @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
-async def mock_handler(request: Request, path: str):
+async def mock_handler(request: Request, path: str, db: AsyncSessionDep):
     """拦截所有请求，匹配已启用的Mock配置并返回预设响应"""
     request_path = f"/{path}"
     request_method = request.method
 
-    with Session(engine) as session:
-        configs = session.exec(
-            select(MockConfig).where(MockConfig.enabled == True)
-        ).all()
+    match_started = time.perf_counter()
+    configs = (await db.exec(
+        select(MockConfig).where(MockConfig.enabled == True)
+    )).all()
 
     matched_config = None
     path_params = {}
@@ -416,6 +428,8 @@ async def mock_handler(request: Request, path: str):
             logger.info("Mock matched: %s %s, path_params=%s", config.method, config.url_path, path_params)
             break
 
+    observe_mock(matched_config is not None, time.perf_counter() - match_started)
+
     if not matched_config:
         req_body_raw = await request.body()
         req_body_str = req_body_raw.decode() if req_body_raw else None
@@ -435,15 +449,16 @@ async def mock_handler(request: Request, path: str):
             media_type="application/json"
         )
 
+    env_params = await _load_env_params(db, matched_config.environment_id)
     resp_headers = {}
     for h in (matched_config.response_headers or []):
         if isinstance(h, dict) and h.get("key"):
-            resp_headers[h["key"]] = _substitute_variables(str(h["value"]), matched_config.environment_id, path_params)
+            resp_headers[h["key"]] = _substitute_variables(str(h["value"]), env_params, path_params)
 
     body = None
     if matched_config.response_body:
         
-        body = _substitute_variables(matched_config.response_body, matched_config.environment_id, path_params)
+        body = _substitute_variables(matched_config.response_body, env_params, path_params)
         logger.info("Original body: %s", body)
         logger.info("Body type: %s", type(body))
         
@@ -506,7 +521,7 @@ async def mock_handler(request: Request, path: str):
                             if raw_item_template is not None:
                                 # 每次循环都重新序列化模板并替换变量，确保 $timestamp / $uuid / $randomInt 各不相同
                                 item_str = json.dumps(raw_item_template)
-                                item_str = _substitute_variables(item_str, matched_config.environment_id, path_params)
+                                item_str = _substitute_variables(item_str, env_params, path_params)
                                 try:
                                     data_array.append(json.loads(item_str))
                                 except json.JSONDecodeError:
@@ -8,13 +8,13 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlmodel import Session, select
-import httpx
 
 from db.db import get_db
 from db.models import GlobalParameter, MockConfig
 from app.deps import CurrentUser
 from app.permissions import Permission, get_user_permissions
 from utils.base_response import Response
+from utils.http_clients import POOL_TARGETS, http_session
 from utils.js_expression import eval_js_expression
 
 router = APIRouter(prefix="/proxy", tags=["proxy"])
@@ -212,20 +212,22 @@ def _mock_match_url(config: MockConfig, request_path: str) -> bool:
         return config.url_path == request_path
 
 
-def _mock_substitute(text: str, env_id: Optional[int]) -> str:
-    """替换文本中的 {{variable}} 占位符为环境变量值"""
-    if not env_id or not text:
-        return text
-    from db.db import engine as _engine
-    from sqlmodel import Session as _Session
-    with _Session(_engine) as session:
-        env = session.get(GlobalParameter, env_id)
+def _mock_env_params(db: Session, env_id: Optional[int]) -> dict:
+    """读取 Mock 配置关联的环境变量映射（使用请求的会话，只查询一次）"""
+    env = db.get(GlobalParameter, env_id) if env_id else None
     if not env:
+        return {}
+    return {
+        p["key"]: str(p.get("value", ""))
+        for p in env.parameters or []
+        if isinstance(p, dict) and p.get("key")
+    }
+
+
+def _mock_substitute(text: str, param_map: dict) -> str:
+    """替换文本中的 {{variable}} 占位符为环境变量值"""
+    if not param_map or not text:
         return text
-    param_map = {}
-    for p in env.parameters or []:
-        if isinstance(p, dict) and p.get("key"):
-            param_map[p["key"]] = str(p.get("value", ""))
 
     def replacer(match):
         return param_map.get(match.group(1), match.group(0))
@@ -253,14 +255,15 @@ def try_mock_response(db: Session, method: str, url: str, param_map: dict, unres
     for config in enabled_mocks:
         if config.method.upper() == method.upper() and _mock_match_url(config, request_path):
             # 匹配成功，构建 mock 响应
+            env_params = _mock_env_params(db, config.environment_id)
             resp_headers = {}
             for h in (config.response_headers or []):
                 if isinstance(h, dict) and h.get("key"):
-                    resp_headers[h["key"]] = _mock_substitute(str(h["value"]), config.environment_id)
+                    resp_headers[h["key"]] = _mock_substitute(str(h["value"]), env_params)
 
             body = None
             if config.response_body:
-                body = _mock_substitute(config.response_body, config.environment_id)
+                body = _mock_substitute(config.response_body, env_params)
                 try:
                     body = json.loads(body)
                 except (json.JSONDecodeError, TypeError):
@@ -332,7 +335,7 @@ async def forward_request(
     if mock_result:
         return mock_result
 
-    async with httpx.AsyncClient() as client:
+    async with http_session(POOL_TARGETS) as client:
         
         try:
             response = await client.request(
@@ -9,6 +9,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from utils.base_response import Response
+from utils.http_clients import POOL_TARGETS, http_session
 
 logger = logging.getLogger(__name__)
 
@@ -132,7 +133,7 @@ async def install_skill(req: InstallRequest):
     logger.info(f"Installing skill from: {req.url}")
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with http_session(POOL_TARGETS, timeout=30) as client:
             resp = await client.get(req.url, headers={"Accept": "application/json"})
             resp.raise_for_status()
             data = resp.json()
@@ -12,8 +12,11 @@ from app.deps import SessionDep, CurrentUser
 from app.permissions import Permission, get_user_permissions
 from db.models import Session, TestCase, StatusValue, McpServer, TestCaseExecutionLog, ApiEndpoint, ApiProject, ApiScenario
 from utils.base_response import Response
+from utils.pagination import decode_cursor, keyset_filter, keyset_order_by, row_cursor
 import traceback
 from app.services.api_test_tool import run_endpoint_steps, run_scenario
+from db.write_queue import run_write
+from app.services.result_store import TESTCASE_LOG, load_result_detail, load_result_details, save_testcase_log, with_result
 
 router = APIRouter(prefix="/testcases", tags=["testcases"])
 
@@ -182,6 +185,7 @@ class TestCasePage(BaseModel):
     failed: int = Field(0, description="未通过的用例数")
     not_run: int = Field(0, description="未执行的用例数")
     totalBugs: int = Field(0, description="Bug数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
     model_config = {
         "arbitrary_types_allowed": True,
     }
@@ -190,31 +194,21 @@ class TestCasePage(BaseModel):
 MAX_TESTCASE_EXECUTION_LOGS = 10
 
 
-def _save_execution_log(db_session, testcase: TestCase, result: dict, passed: bool, status: str) -> TestCaseExecutionLog:
-    """保存测试用例执行日志，并清理超出限制的旧日志。"""
-    # 移除超出限制的旧日志
-    existing_logs = db_session.exec(
-        select(TestCaseExecutionLog)
-        .where(TestCaseExecutionLog.testcase_id == testcase.id)
-        .order_by(desc(TestCaseExecutionLog.created_at))
-    ).all()
-    if len(existing_logs) >= MAX_TESTCASE_EXECUTION_LOGS:
-        for old_log in existing_logs[MAX_TESTCASE_EXECUTION_LOGS - 1:]:
-            db_session.delete(old_log)
-
-    log = TestCaseExecutionLog(
-        testcase_id=testcase.id,
-        session_id=testcase.session_id,
-        case_name=testcase.case_name,
+async def _save_execution_log(testcase: TestCase, result: dict, passed: bool, status: str) -> TestCaseExecutionLog:
+    """保存测试用例执行日志（详情压缩存储，经后台写线程提交），并清理超出限制的旧日志。"""
+    testcase_id, session_id = testcase.id, testcase.session_id
+    case_name, user_id = testcase.case_name, testcase.user_id
+    return await run_write(lambda db: save_testcase_log(
+        db,
+        testcase_id=testcase_id,
+        session_id=session_id,
+        case_name=case_name,
         passed=passed,
         status=status,
+        user_id=user_id,
         result=result,
-        user_id=testcase.user_id,
-    )
-    db_session.add(log)
-    db_session.commit()
-    db_session.refresh(log)
-    return log
+        keep=MAX_TESTCASE_EXECUTION_LOGS,
+    ))
 
 
 
@@ -349,10 +343,11 @@ async def get_execution_logs(
     user: CurrentUser,
     session_id: int,
     testcase_id: int,
+    include_result: bool = Query(True, description="是否附带完整执行日志；为 false 时只返回摘要字段"),
 ):
     """获取测试用例的执行日志列表。"""
     testcase = session.get(TestCase, testcase_id)
-    if not testcase or testcase.session_id != session_id:
+    if not testcase or testcase.session_id != session_id or (testcase.user_id and testcase.user_id != user.user_id):
         return Response(code=status.HTTP_404_NOT_FOUND, message="测试用例不存在")
 
     logs = session.exec(
@@ -361,10 +356,62 @@ async def get_execution_logs(
         .order_by(desc(TestCaseExecutionLog.created_at))
         .limit(MAX_TESTCASE_EXECUTION_LOGS)
     ).all()
-    return Response(data=list(logs))
+    if not include_result:
+        return Response(data=list(logs))
+    details = load_result_details(session, TESTCASE_LOG, list(logs))
+    return Response(data=[with_result(log, details[log.id]) for log in logs])
+
+
+@router.get("/{session_id}/testcases/{testcase_id}/execution-logs/{log_id}", response_model=Response[TestCaseExecutionLog])
+async def get_execution_log(
+    session: SessionDep,
+    user: CurrentUser,
+    session_id: int,
+    testcase_id: int,
+    log_id: int,
+):
+    """获取单条执行日志的完整详情。"""
+    log = session.get(TestCaseExecutionLog, log_id)
+    if (
+        not log
+        or log.testcase_id != testcase_id
+        or log.session_id != session_id
+        or (log.user_id and log.user_id != user.user_id)
+    ):
+        return Response(code=status.HTTP_404_NOT_FOUND, message="执行日志不存在")
+    return Response(data=with_result(log, load_result_detail(session, TESTCASE_LOG, log)))
 
 
 # 测试用例管理API
+def _testcase_status_counts(session, session_id: int, module_id: int | None) -> tuple[int, int, int, int, int]:
+    """一次按状态分组聚合得到总数、通过、失败、未执行和关联缺陷数（走 session/module/status 索引）。"""
+    filters = [TestCase.session_id == session_id]
+    if module_id is not None:
+        filters.append(TestCase.module_id == module_id)
+    rows = session.exec(
+        select(TestCase.status, func.count(), func.count(TestCase.bug_id))
+        .where(*filters)
+        .group_by(TestCase.status)
+    ).all()
+    by_status = {row_status: count for row_status, count, _ in rows}
+    return (
+        sum(by_status.values()),
+        by_status.get(StatusValue.PASSED.value, 0),
+        by_status.get(StatusValue.FAILED.value, 0),
+        by_status.get(StatusValue.NOT_RUN.value, 0),
+        sum(bugs for _, _, bugs in rows),
+    )
+
+
+# 用例列表排序：用例等级升序、创建时间倒序，id 保证游标唯一
+TESTCASE_LIST_ORDER = ((TestCase.case_level, False), (TestCase.created_at, True), (TestCase.id, True))
+# view=summary 时返回的列，步骤/预置条件/预期结果等大字段通过详情接口按需加载
+TESTCASE_SUMMARY_FIELDS = (
+    "id", "case_name", "case_level", "status", "bug_id", "session_id", "module_id",
+    "api_endpoint_id", "api_project_id", "scenario_id", "user_id", "created_at", "updated_at",
+)
+
+
 @router.get("/{session_id}/testcases", response_model=Response[TestCasePage])
 def get_testcases(
         session_id: int,
@@ -376,11 +423,16 @@ def get_testcases(
         case_name: str = None,
         status: str = None,
         bug_id: str = None,
-        exist_bug: bool = False
+        exist_bug: bool = False,
+        cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor；传入后忽略 offset"),
+        view: str = Query("full", pattern="^(full|summary)$", description="summary 只返回摘要字段"),
 ):
     """获取会话的测试用例"""
-    query = select(TestCase).where(TestCase.session_id == session_id).order_by(TestCase.case_level,
-                                                                               desc(TestCase.created_at))
+    if view == "summary":
+        query = select(*(getattr(TestCase, field) for field in TESTCASE_SUMMARY_FIELDS))
+    else:
+        query = select(TestCase)
+    query = query.where(TestCase.session_id == session_id).order_by(*keyset_order_by(TESTCASE_LIST_ORDER))
     if module_id:
         query = query.where(TestCase.module_id == module_id)
 
@@ -393,70 +445,64 @@ def get_testcases(
     if exist_bug:
         query = query.where(TestCase.bug_id != None)
 
-    testcases_db = session.exec(query.offset(offset).limit(limit)).all()
+    if cursor:
+        try:
+            query = query.where(keyset_filter(TESTCASE_LIST_ORDER, decode_cursor(cursor, TESTCASE_LIST_ORDER)))
+        except ValueError as e:
+            return Response(code=400, message=str(e))
+    else:
+        query = query.offset(offset)
+
+    if view == "summary":
+        rows = [dict(row._mapping) for row in session.exec(query.limit(limit)).all()]
+    else:
+        rows = [tc.model_dump() for tc in session.exec(query.limit(limit)).all()]
 
     # 批量加载关联场景的步骤摘要
-    scenario_ids = [tc.scenario_id for tc in testcases_db if tc.scenario_id]
+    scenario_ids = [tc["scenario_id"] for tc in rows if tc["scenario_id"]]
     scenario_steps_map: dict[int, list[dict]] = {}
     if scenario_ids:
         scenarios = session.exec(
-            select(ApiScenario).where(ApiScenario.id.in_(scenario_ids))
+            select(ApiScenario.id, ApiScenario.steps).where(ApiScenario.id.in_(scenario_ids))
         ).all()
-        for sc in scenarios:
+        for sc_id, sc_steps in scenarios:
             steps_summary = []
-            for step in (sc.steps or []):
+            for step in (sc_steps or []):
                 if isinstance(step, dict):
                     steps_summary.append({
                         "method": step.get("method", ""),
                         "path": step.get("path") or step.get("url", ""),
                         "name": step.get("name") or step.get("endpoint_name", ""),
                     })
-            scenario_steps_map[sc.id] = steps_summary
+            scenario_steps_map[sc_id] = steps_summary
 
     # 附加场景步骤摘要到用例
-    tc_items = []
-    for tc in testcases_db:
-        tc_dict = tc.model_dump()
-        tc_dict["scenario_steps"] = scenario_steps_map.get(tc.scenario_id, []) if tc.scenario_id else []
-        tc_items.append(tc_dict)
-
-    # 构建基础查询条件
-    count_query_base = [TestCase.session_id == session_id]
-    if module_id is not None:
-        count_query_base.append(TestCase.module_id == module_id)
-    totalNumber = session.scalar(select(func.count()).where(*count_query_base))
-
-    passed_query = [TestCase.session_id == session_id, TestCase.status == StatusValue.PASSED]
-    if module_id is not None:
-        passed_query.append(TestCase.module_id == module_id)
-    passed = session.scalar(select(func.count()).where(*passed_query))
+    for tc_dict in rows:
+        tc_dict["scenario_steps"] = scenario_steps_map.get(tc_dict["scenario_id"], []) if tc_dict["scenario_id"] else []
 
-    failed_query = [TestCase.session_id == session_id, TestCase.status == StatusValue.FAILED]
-    if module_id is not None:
-        failed_query.append(TestCase.module_id == module_id)
-    failed = session.scalar(select(func.count()).where(*failed_query))
-
-    not_run_query = [TestCase.session_id == session_id, TestCase.status == StatusValue.NOT_RUN]
-    if module_id is not None:
-        not_run_query.append(TestCase.module_id == module_id)
-    not_run = session.scalar(select(func.count()).where(*not_run_query))
-
-    total_bugs_query = [TestCase.session_id == session_id, TestCase.bug_id != None]
-    if module_id is not None:
-        total_bugs_query.append(TestCase.module_id == module_id)
-    totalBugs = session.scalar(select(func.count()).where(*total_bugs_query))
+    totalNumber, passed, failed, not_run, totalBugs = _testcase_status_counts(session, session_id, module_id)
 
     testcases = TestCasePage(
-        items=tc_items,
+        items=rows,
         totalNumber=totalNumber,
         passed=passed,
         failed=failed,
         not_run=not_run,
-        totalBugs=totalBugs
+        totalBugs=totalBugs,
+        next_cursor=row_cursor(rows[-1], TESTCASE_LIST_ORDER) if len(rows) == limit else None,
     )
     return Response(data=testcases)
 
 
+@router.get("/{session_id}/testcases/{testcase_id}", response_model=Response[TestCase])
+def get_testcase(session_id: int, testcase_id: int, session: SessionDep, user: CurrentUser):
+    """获取单条测试用例详情（列表使用 view=summary 时按需加载）"""
+    testcase = session.get(TestCase, testcase_id)
+    if not testcase or testcase.session_id != session_id or (testcase.user_id and testcase.user_id != user.user_id):
+        return Response(code=status.HTTP_404_NOT_FOUND, message="测试用例不存在")
+    return Response(data=testcase)
+
+
 # 请求模型
 class GenerateTestcasesRequest(BaseModel):
     model_type: str = "api"
@@ -866,7 +912,7 @@ async def execute_testcase(
                     testcase.status = "PASSED" if passed else "FAILED"
                     session.add(testcase)
                     session.commit()
-                    log = _save_execution_log(session, testcase, result, passed, testcase.status)
+                    log = await _save_execution_log(testcase, result, passed, testcase.status)
                     return Response(data={
                         "passed": passed,
                         "status": testcase.status,
@@ -904,7 +950,7 @@ async def execute_testcase(
         session.add(testcase)
         session.commit()
 
-        log = _save_execution_log(session, testcase, result, passed, testcase.status)
+        log = await _save_execution_log(testcase, result, passed, testcase.status)
 
         return Response(data={
             "passed": passed,
@@ -918,7 +964,7 @@ async def execute_testcase(
 
         error_result = {"steps": [{"index": 1, "status": "error", "detail": str(e)}]}
         try:
-            _save_execution_log(session, testcase, error_result, False, "FAILED")
+            await _save_execution_log(testcase, error_result, False, "FAILED")
         except Exception:
             pass
 
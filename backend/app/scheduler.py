@@ -2,17 +2,21 @@
 import json
 import logging
 import re
+import time
 from datetime import datetime
 
-import httpx
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from jsonpath_ng import parse
 from sqlmodel import Session, select
 
-from db.db import engine
+from db.db import engine, record_db_sessions, track_db_sessions
+from db.write_queue import run_write
 from db.models import ScheduledTask, SavedRequest, GlobalParameter
+from utils.jsonpath_cache import find_jsonpath_values
+from utils.metrics import SCHEDULER_JOB_LAG_SECONDS, SCHEDULER_JOB_SECONDS
+from utils.http_clients import POOL_TARGETS, http_session
 from app.routes.proxy import (
     build_param_map, substitute_variables, substitute_in_headers,
     substitute_in_data, substitute_in_params, is_valid_url,
@@ -24,6 +28,16 @@ logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
 
 
+def _record_job_lag(event) -> None:
+    # 计划触发时间到实际提交执行的延迟，持续偏大说明事件循环繁忙或任务堆积
+    if event.scheduled_run_times:
+        now = datetime.now(event.scheduled_run_times[0].tzinfo)
+        SCHEDULER_JOB_LAG_SECONDS.observe(max((now - min(event.scheduled_run_times)).total_seconds(), 0.0))
+
+
+scheduler.add_listener(_record_job_lag, EVENT_JOB_SUBMITTED)
+
+
 def strip_json_comments(text: str) -> str:
     """去除 JSON 字符串中的注释（支持 // 和 /* */）"""
     result = []
@@ -62,12 +76,38 @@ def strip_json_comments(text: str) -> str:
     return ''.join(result)
 
 
+async def _save_env_parameters(db: Session, env: GlobalParameter, params: list[dict]) -> None:
+    """经后台写线程保存后置提取的环境参数，并让当前会话重新读取最新值"""
+    env_id = env.id
+
+    def _write(session: Session) -> None:
+        target = session.get(GlobalParameter, env_id)
+        if target:
+            target.parameters = params
+            session.add(target)
+            session.commit()
+
+    await run_write(_write)
+    db.expire(env)
+
+
 async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
     """执行定时任务：按顺序执行所有关联的请求
 
     Args:
         force_run: 手动执行时为 True，忽略 enabled 检查
     """
+    started = time.perf_counter()
+    with track_db_sessions() as sessions:
+        try:
+            await _run_scheduled_task(task_id, force_run)
+        finally:
+            record_db_sessions("scheduler:execute_scheduled_task", len(sessions))
+            SCHEDULER_JOB_SECONDS.observe(time.perf_counter() - started)
+
+
+async def _run_scheduled_task(task_id: int, force_run: bool) -> None:
+    # 整个任务共用一个会话，写入交给后台写线程
     with Session(engine) as db:
         task = db.get(ScheduledTask, task_id)
         if not task:
@@ -84,8 +124,14 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                      task.name, task.environment_id, task.parameters, param_map)
         unresolved: set[str] = set()
 
+        # 一次查询取出任务关联的全部请求
+        saved_requests = {
+            saved.id: saved
+            for saved in db.exec(select(SavedRequest).where(SavedRequest.id.in_(task.request_ids or []))).all()
+        }
+
         for req_id in task.request_ids:
-            saved_req = db.get(SavedRequest, req_id)
+            saved_req = saved_requests.get(req_id)
             if not saved_req:
                 results.append({
                     "request_id": req_id,
@@ -177,7 +223,7 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                     # 通过本地代理转发，支持 file_params
                     import asyncio as _asyncio
                     try:
-                        async with httpx.AsyncClient() as proxy_client:
+                        async with http_session(POOL_TARGETS) as proxy_client:
                             proxy_resp = await proxy_client.post(
                                 "http://127.0.0.1:8000/api/proxy/forward",
                                 json={
@@ -226,10 +272,9 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                                         if not rule.get("variable") or not rule.get("jsonpath"):
                                             continue
                                         try:
-                                            jsonpath_expr = parse(rule["jsonpath"])
-                                            matches = jsonpath_expr.find(response_data)
+                                            matches = find_jsonpath_values(rule["jsonpath"], response_data)
                                             if matches:
-                                                value = matches[0].value
+                                                value = matches[0]
                                                 val_str = str(value) if not isinstance(value, str) else value
                                                 extracted[rule["variable"]] = val_str
                                                 if rule["variable"] in param_index:
@@ -241,9 +286,7 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                                         except Exception:
                                             pass
                                     if extracted:
-                                        env.parameters = params
-                                        db.add(env)
-                                        db.commit()
+                                        await _save_env_parameters(db, env, params)
                                         param_map.update(extracted)
                                         result_entry["extracted"] = extracted
 
@@ -267,7 +310,7 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                         continue
 
                 # 无文件参数时直接发送
-                async with httpx.AsyncClient() as client:
+                async with http_session(POOL_TARGETS) as client:
                     response = await client.request(
                         method=saved_req.method,
                         url=final_url,
@@ -312,10 +355,9 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                                 if not rule.get("variable") or not rule.get("jsonpath"):
                                     continue
                                 try:
-                                    jsonpath_expr = parse(rule["jsonpath"])
-                                    matches = jsonpath_expr.find(response_data)
+                                    matches = find_jsonpath_values(rule["jsonpath"], response_data)
                                     if matches:
-                                        value = matches[0].value
+                                        value = matches[0]
                                         val_str = str(value) if not isinstance(value, str) else value
                                         extracted[rule["variable"]] = val_str
                                         if rule["variable"] in param_index:
@@ -327,9 +369,7 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                                 except Exception:
                                     pass
                             if extracted:
-                                env.parameters = params
-                                db.add(env)
-                                db.commit()
+                                await _save_env_parameters(db, env, params)
                                 param_map.update(extracted)
                                 result_entry["extracted"] = extracted
 
@@ -344,10 +384,18 @@ async def execute_scheduled_task(task_id: int, *, force_run: bool = False):
                 })
 
         # 更新任务状态
-        task.last_run_at = datetime.now()
-        task.last_run_result = json.dumps(results, ensure_ascii=False, default=str)
-        db.add(task)
-        db.commit()
+        last_run_at = datetime.now()
+        last_run_result = json.dumps(results, ensure_ascii=False, default=str)
+
+        def _save_run_result(session: Session) -> None:
+            target = session.get(ScheduledTask, task_id)
+            if target:
+                target.last_run_at = last_run_at
+                target.last_run_result = last_run_result
+                session.add(target)
+                session.commit()
+
+        await run_write(_save_run_result)
 
         logger.info("Scheduled task [%s] completed, %d requests executed", task.name, len(results))
 
@@ -7,7 +7,6 @@ from urllib.parse import urljoin
 
 import httpx
 import yaml
-from jsonpath_ng import parse as parse_jsonpath
 from sqlmodel import Session, select
 
 from app.routes.proxy import (
@@ -18,13 +17,18 @@ from app.routes.proxy import (
     substitute_in_params,
     substitute_variables,
 )
+from app.services.response_capture import parse_response_body, read_response_body, response_body_snapshot
+from app.services.step_timing import StepTracer, record_endpoint_timings
 from db.models import ApiEndpoint, ApiProject, ApiScenario, GlobalParameter
+from db.write_queue import submit_write
+from utils.http_clients import POOL_LLM, POOL_TARGETS, http_clients, http_session
+from utils.metrics import observe_api_step
+from utils.jsonpath_cache import find_jsonpath_values
 
 
 HTTP_METHODS = {"get", "post", "put", "delete", "patch", "head", "options"}
 REMOVED_FROM_SPEC_TAG = "__removed_from_spec__"
 MAX_GENERATED_UNIT_STEPS = 24
-API_TEST_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=0)
 DEFAULT_SUCCESS_ASSERTIONS = [{"type": "jsonpath_equals", "value": 200, "jsonpath": "$.code"}]
 
 
@@ -696,15 +700,33 @@ def _extract_post_actions(actions: list[dict] | None, response_data: Any, variab
         expr = action.get("jsonpath")
         if not key or not expr:
             continue
-        matches = parse_jsonpath(expr).find(response_data)
+        matches = find_jsonpath_values(expr, response_data)
         if not matches:
             continue
-        value = matches[0].value
+        value = matches[0]
         extracted[key] = str(value) if not isinstance(value, str) else value
     variables.update(extracted)
     return extracted
 
 
+def _apply_pending_extractions(pending_extractions: dict[str, str], response_data: Any, variables: dict) -> None:
+    # 从当前步骤的响应中提取待提取的变量，提取成功的从待提取列表中移除
+    if not isinstance(response_data, (dict, list)):
+        return
+    extracted_keys = []
+    for var_name, jsonpath_expr in pending_extractions.items():
+        try:
+            matches = find_jsonpath_values(jsonpath_expr, response_data)
+            if matches:
+                value = matches[0]
+                variables[var_name] = str(value) if not isinstance(value, str) else value
+                extracted_keys.append(var_name)
+        except Exception:
+            pass
+    for key in extracted_keys:
+        del pending_extractions[key]
+
+
 def _run_assertions(assertions: list[dict] | None, response_data: Any, status_code: int, elapsed_ms: int, variables: dict | None = None) -> list[dict]:
     results = []
     for assertion in assertions or []:
@@ -747,13 +769,13 @@ def _run_assertions(assertions: list[dict] | None, response_data: Any, status_co
                 ok = elapsed_ms < expected
             elif kind == "jsonpath_exists":
                 expected = assertion.get("jsonpath")
-                actual = len(parse_jsonpath(expected).find(response_data)) if expected else 0
+                actual = len(find_jsonpath_values(expected, response_data)) if expected else 0
                 ok = actual > 0
             elif kind == "jsonpath_equals":
                 expr = assertion.get("jsonpath")
                 expected = str(expected) if expected is not None else ""
-                matches = parse_jsonpath(expr).find(response_data) if expr else []
-                actual = str(matches[0].value) if matches else None
+                matches = find_jsonpath_values(expr, response_data) if expr else []
+                actual = str(matches[0]) if matches else None
                 ok = actual == expected
             else:
                 continue
@@ -785,16 +807,14 @@ def _apply_path_parameters(path: str, params: list[dict] | None, variables: dict
     return result
 
 
-async def _execute_endpoint_step(
-    client: httpx.AsyncClient,
-    *,
+def build_step_request(
     project: ApiProject,
     endpoint: ApiEndpoint,
     step: dict,
     variables: dict,
     default_base_url: str,
-    index: int,
-) -> tuple[dict, bool]:
+) -> tuple[dict, dict, dict, set[str]]:
+    """合并接口与步骤配置并完成变量替换，返回 (merged, 请求快照, 前置动作更新, 未解析变量)"""
     merged = _merge_endpoint_step(endpoint, step)
     pre_updates = _apply_pre_actions(merged.get("pre_actions"), variables)
     unresolved: set[str] = set()
@@ -824,6 +844,36 @@ async def _execute_endpoint_step(
         "params": params,
         "body": data,
     }
+    return merged, request_snapshot, pre_updates, unresolved
+
+
+async def _send_captured_request(client: httpx.AsyncClient, request_kwargs: dict, owner: str | None = None):
+    tracer = StepTracer()
+    async with client.stream(**request_kwargs, extensions={"trace": tracer}) as response:
+        captured = await read_response_body(response, owner)
+        tracer.finish()
+    return response, captured, tracer.phases()
+
+
+async def _execute_endpoint_step(
+    client: httpx.AsyncClient,
+    *,
+    project: ApiProject,
+    endpoint: ApiEndpoint,
+    step: dict,
+    variables: dict,
+    default_base_url: str,
+    index: int,
+    pending_extractions: dict[str, str] | None = None,
+) -> tuple[dict, bool]:
+    substitution_start = time.perf_counter()
+    merged, request_snapshot, pre_updates, unresolved = build_step_request(
+        project, endpoint, step, variables, default_base_url
+    )
+    url = request_snapshot["url"]
+    headers = request_snapshot["headers"]
+    params = request_snapshot["params"]
+    data = request_snapshot["body"]
 
     if unresolved:
         return ({
@@ -843,6 +893,7 @@ async def _execute_endpoint_step(
             "request": request_snapshot,
         }, False)
 
+    substitution_ms = round((time.perf_counter() - substitution_start) * 1000, 2)
     start = time.monotonic()
     try:
         request_kwargs = {
@@ -855,16 +906,17 @@ async def _execute_endpoint_step(
             "timeout": 30.0,
         }
         try:
-            response = await client.request(**request_kwargs)
+            response, captured, network_timing = await _send_captured_request(client, request_kwargs, project.user_id)
         except httpx.RemoteProtocolError:
             retry_headers = dict(headers)
             retry_headers["Connection"] = "close"
-            response = await client.request(**{**request_kwargs, "headers": retry_headers})
-        elapsed_ms = int((time.monotonic() - start) * 1000)
-        try:
-            response_data = response.json()
-        except Exception:
-            response_data = response.text
+            response, captured, network_timing = await _send_captured_request(
+                client, {**request_kwargs, "headers": retry_headers}, project.user_id
+            )
+        elapsed = time.monotonic() - start
+        elapsed_ms = int(elapsed * 1000)
+        response_data = parse_response_body(response, captured)
+        assertions_start = time.perf_counter()
         assertion_results = _run_assertions(
             merged.get("assertions"),
             response_data,
@@ -872,12 +924,24 @@ async def _execute_endpoint_step(
             elapsed_ms,
             variables,
         )
+        extraction_start = time.perf_counter()
         extracted = _extract_post_actions(merged.get("post_actions"), response_data, variables)
         step_passed = (
             all(a["passed"] for a in assertion_results)
             if assertion_results
             else 200 <= response.status_code < 400
         )
+        if step_passed and pending_extractions:
+            _apply_pending_extractions(pending_extractions, response_data, variables)
+        extraction_end = time.perf_counter()
+        observe_api_step("passed" if step_passed else "failed", extraction_end - assertions_start + elapsed, assertion_results)
+        timing = {
+            "total_ms": round(elapsed * 1000, 2),
+            **network_timing,
+            "substitution_ms": substitution_ms,
+            "assertions_ms": round((extraction_start - assertions_start) * 1000, 2),
+            "extraction_ms": round((extraction_end - extraction_start) * 1000, 2),
+        }
         return ({
             "index": index,
             "name": merged.get("step_name"),
@@ -886,14 +950,16 @@ async def _execute_endpoint_step(
             "response": {
                 "status_code": response.status_code,
                 "headers": dict(response.headers),
-                "body": response_data,
+                **response_body_snapshot(captured, response_data),
                 "elapsed_ms": elapsed_ms,
             },
+            "timing": timing,
             "pre_updates": pre_updates,
             "extracted": extracted,
             "assertions": assertion_results,
         }, step_passed)
     except Exception as exc:
+        observe_api_step("error", time.monotonic() - start)
         return ({
             "index": index,
             "name": merged.get("step_name"),
@@ -907,7 +973,7 @@ async def run_endpoint(db: Session, project: ApiProject, endpoint: ApiEndpoint,
     env_id = overrides.get("environment_id") or endpoint.environment_id or project.environment_id
     variables = build_param_map(db, env_id, overrides.get("variables") or [])
     default_base_url = (overrides.get("base_url") or project.base_url or "").rstrip("/")
-    async with httpx.AsyncClient(limits=API_TEST_HTTP_LIMITS) as client:
+    async with http_session(POOL_TARGETS) as client:
         step, passed = await _execute_endpoint_step(
             client,
             project=project,
@@ -917,6 +983,8 @@ async def run_endpoint(db: Session, project: ApiProject, endpoint: ApiEndpoint,
             default_base_url=default_base_url,
             index=1,
         )
+    samples = [(project.id, endpoint.id, step.get("timing"))]
+    submit_write(lambda session: record_endpoint_timings(session, samples))
     return {"passed": passed, "variables": variables, "step": step}
 
 
@@ -935,9 +1003,11 @@ async def run_endpoint_steps(db: Session, executable_steps: list[dict]) -> dict:
     )
     variables = build_param_map(db, env_id, first_overrides.get("variables") or [])
     results = []
+    timing_samples = []
     passed = True
+    started = time.monotonic()
 
-    async with httpx.AsyncClient(limits=API_TEST_HTTP_LIMITS) as client:
+    async with http_session(POOL_TARGETS) as client:
         for index, item in enumerate(executable_steps, 1):
             endpoint = item.get("endpoint")
             project = item.get("project")
@@ -970,11 +1040,14 @@ async def run_endpoint_steps(db: Session, executable_steps: list[dict]) -> dict:
             step_result["project_name"] = project.name
             step_result["testcase_step"] = item.get("testcase_step")
             results.append(step_result)
+            timing_samples.append((project.id, endpoint.id, step_result.get("timing")))
             passed = passed and step_passed
             if not step_passed and not overrides.get("continue_on_failure"):
                 break
 
-    return {"passed": passed, "variables": variables, "steps": results}
+    duration_ms = int((time.monotonic() - started) * 1000)
+    submit_write(lambda session: record_endpoint_timings(session, timing_samples))
+    return {"passed": passed, "variables": variables, "steps": results, "duration_ms": duration_ms}
 
 
 def build_body_from_schema(schema: dict) -> str:
@@ -1103,13 +1176,8 @@ async def generate_body_from_schema(
             from langchain_openai import ChatOpenAI
             from pydantic import SecretStr
 
-            extra_kwargs = {}
-            if api_proxy_url:
-                import httpx
-                extra_kwargs["http_async_client"] = httpx.AsyncClient(
-                    proxy=api_proxy_url,
-                    timeout=httpx.Timeout(None, connect=30.0, read=None, write=None, pool=None),
-                )
+            # 复用大模型连接池（有代理时按代理地址单独建池）
+            extra_kwargs = {"http_async_client": http_clients.client(POOL_LLM, proxy=api_proxy_url or None)}
             model = ChatOpenAI(
                 model=api_model,
                 temperature=0,
@@ -1128,8 +1196,12 @@ async def generate_body_from_schema(
         return {"body": rule_body, "used_ai": False, "message": f"AI 生成失败，已使用 schema 规则生成: {exc}"}
 
 
-def _endpoint_body_example(endpoint: ApiEndpoint) -> Any:
-    schema_example = _schema_example({}, endpoint.request_schema) if endpoint.request_schema else None
+_UNSET = object()
+
+
+def _endpoint_body_example(endpoint: ApiEndpoint, *, schema_example: Any = _UNSET) -> Any:
+    if schema_example is _UNSET:
+        schema_example = _schema_example({}, endpoint.request_schema) if endpoint.request_schema else None
     if endpoint.body and str(endpoint.body).strip():
         try:
             parsed = json.loads(endpoint.body)
@@ -1476,13 +1548,24 @@ def _path_exists(value: Any, path: tuple[Any, ...]) -> bool:
         return False
 
 
+def _shallow_container_copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
 def _modify_body_path(body: Any, path: tuple[Any, ...], *, value: Any = None, remove: bool = False) -> Any:
-    result = deepcopy(body)
+    # 只复制路径上的容器，其余子树与 body 共享；生成的步骤会立即序列化为文本，共享是安全的
     if not path:
         return value
+    result = _shallow_container_copy(body)
     parent = result
     for part in path[:-1]:
-        parent = parent[part]
+        child = _shallow_container_copy(parent[part])
+        parent[part] = child
+        parent = child
     last = path[-1]
     if remove:
         if isinstance(parent, dict) and not isinstance(last, int):
@@ -1645,8 +1728,24 @@ def _append_unit_step(steps: list[dict], seen: set[str], step: dict) -> None:
     seen.add(fingerprint)
 
 
-def generate_unit_test_steps(endpoint: ApiEndpoint) -> list[dict]:
-    base_body = _endpoint_body_example(endpoint)
+def _cached_schema_analysis(cache: dict | None, kind: str, schema: Any, build) -> Any:
+    if cache is None or not schema:
+        return build()
+    key = (kind, _json_fingerprint(schema))
+    if key not in cache:
+        cache[key] = build()
+    return cache[key]
+
+
+def generate_unit_test_steps(endpoint: ApiEndpoint, *, schema_cache: dict | None = None) -> list[dict]:
+    # schema_cache 在多个接口间共享：相同 request schema 只分析一次
+    schema_example = _cached_schema_analysis(
+        schema_cache,
+        "example",
+        endpoint.request_schema,
+        lambda: _schema_example({}, endpoint.request_schema) if endpoint.request_schema else None,
+    )
+    base_body = _endpoint_body_example(endpoint, schema_example=schema_example)
     steps: list[dict] = [
         _unit_step(endpoint, "有效等价类：schema 合法请求", body=base_body, assertions=_success_assertions())
     ]
@@ -1661,7 +1760,12 @@ def generate_unit_test_steps(endpoint: ApiEndpoint) -> list[dict]:
     }
 
     if isinstance(base_body, (dict, list)):
-        fields = _iter_schema_fields(endpoint.request_schema)
+        fields = _cached_schema_analysis(
+            schema_cache,
+            "fields",
+            endpoint.request_schema,
+            lambda: _iter_schema_fields(endpoint.request_schema),
+        )
 
         for field in fields:
             if len(steps) >= MAX_GENERATED_UNIT_STEPS:
@@ -1816,29 +1920,64 @@ def generate_unit_test_steps(endpoint: ApiEndpoint) -> list[dict]:
     return steps[:MAX_GENERATED_UNIT_STEPS]
 
 
-def create_unit_test_scenario(db: Session, project: ApiProject, endpoint: ApiEndpoint, user_id: str | None) -> ApiScenario:
-    scenario = ApiScenario(
+def _unit_test_scenario(
+    project: ApiProject,
+    endpoint: ApiEndpoint,
+    user_id: str | None,
+    *,
+    schema_cache: dict | None = None,
+    timestamp: str | None = None,
+) -> ApiScenario:
+    timestamp = timestamp or time.strftime('%Y%m%d%H%M%S')
+    return ApiScenario(
         project_id=project.id,
-        name=f"{endpoint.name or endpoint.method + ' ' + endpoint.path} 接口单测 {time.strftime('%Y%m%d%H%M%S')}",
+        name=f"{endpoint.name or endpoint.method + ' ' + endpoint.path} 接口单测 {timestamp}",
         description=f"自动生成接口单测：{endpoint.method} {endpoint.path}",
         base_url=project.base_url,
         environment_id=endpoint.environment_id or project.environment_id,
         variables=[],
-        steps=generate_unit_test_steps(endpoint),
+        steps=generate_unit_test_steps(endpoint, schema_cache=schema_cache),
         user_id=user_id,
     )
+
+
+def create_unit_test_scenario(db: Session, project: ApiProject, endpoint: ApiEndpoint, user_id: str | None) -> ApiScenario:
+    scenario = _unit_test_scenario(project, endpoint, user_id)
     db.add(scenario)
     db.commit()
     db.refresh(scenario)
     return scenario
 
 
+def create_project_unit_test_scenarios(
+    db: Session,
+    project: ApiProject,
+    endpoints: list[ApiEndpoint],
+    user_id: str | None,
+) -> list[ApiScenario]:
+    schema_cache: dict = {}
+    timestamp = time.strftime('%Y%m%d%H%M%S')
+    scenarios = [
+        _unit_test_scenario(project, endpoint, user_id, schema_cache=schema_cache, timestamp=timestamp)
+        for endpoint in endpoints
+    ]
+    if not scenarios:
+        return []
+    db.add_all(scenarios)
+    db.commit()
+    for scenario in scenarios:
+        db.refresh(scenario)
+    return scenarios
+
+
 async def run_scenario(db: Session, scenario: ApiScenario, project: ApiProject) -> dict:
     env_id = scenario.environment_id or project.environment_id
     variables = build_param_map(db, env_id, scenario.variables or [])
     base_url = (project.base_url or "").rstrip("/")
     results = []
+    timing_samples = []
     passed = True
+    started = time.monotonic()
 
     # 收集需要从响应中提取的变量（值以 $. 开头的视为 jsonpath 表达式）
     pending_extractions: dict[str, str] = {}  # variable_name -> jsonpath_expression
@@ -1848,12 +1987,18 @@ async def run_scenario(db: Session, scenario: ApiScenario, project: ApiProject)
             # 临时移除，等提取后再赋值
             variables.pop(var["key"], None)
 
-    async with httpx.AsyncClient(limits=API_TEST_HTTP_LIMITS) as client:
+    # 一次查询取出场景用到的全部接口，执行过程中不再访问数据库
+    endpoint_ids = {step.get("endpoint_id") for step in scenario.steps or [] if isinstance(step, dict)} - {None}
+    endpoints = (
+        {endpoint.id: endpoint for endpoint in db.exec(select(ApiEndpoint).where(ApiEndpoint.id.in_(endpoint_ids))).all()}
+        if endpoint_ids else {}
+    )
+
+    async with http_session(POOL_TARGETS) as client:
         for index, step in enumerate(scenario.steps or [], 1):
             if not isinstance(step, dict) or step.get("enabled", True) is False:
                 continue
-            endpoint_id = step.get("endpoint_id")
-            endpoint = db.get(ApiEndpoint, endpoint_id) if endpoint_id else None
+            endpoint = endpoints.get(step.get("endpoint_id"))
             if not endpoint:
                 results.append({"index": index, "status": "error", "detail": "接口步骤不存在"})
                 passed = False
@@ -1869,29 +2014,15 @@ async def run_scenario(db: Session, scenario: ApiScenario, project: ApiProject)
                 variables=variables,
                 default_base_url=base_url,
                 index=index,
+                pending_extractions=pending_extractions,
             )
             results.append(result)
+            timing_samples.append((project.id, endpoint.id, result.get("timing")))
             passed = passed and step_passed
 
-            # 从当前步骤的响应中提取待提取的变量
-            if step_passed and pending_extractions:
-                response_data = result.get("response", {}).get("body")
-                if isinstance(response_data, (dict, list)):
-                    extracted_keys = []
-                    for var_name, jsonpath_expr in pending_extractions.items():
-                        try:
-                            matches = parse_jsonpath(jsonpath_expr).find(response_data)
-                            if matches:
-                                value = matches[0].value
-                                variables[var_name] = str(value) if not isinstance(value, str) else value
-                                extracted_keys.append(var_name)
-                        except Exception:
-                            pass
-                    # 移除已提取的变量
-                    for key in extracted_keys:
-                        del pending_extractions[key]
-
             if not step_passed and not step.get("continue_on_failure"):
                 break
 
-    return {"passed": passed, "variables": variables, "steps": results}
+    duration_ms = int((time.monotonic() - started) * 1000)
+    submit_write(lambda session: record_endpoint_timings(session, timing_samples))
+    return {"passed": passed, "variables": variables, "steps": results, "duration_ms": duration_ms}
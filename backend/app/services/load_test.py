@@ -0,0 +1,621 @@
+"""压测：按目标并发数或目标 RPS 在指定时长内反复执行保存的请求或接口场景。
+
+- concurrency 模式：N 个虚拟用户各自循环执行目标，启动阶段按 ramp_up_seconds 逐个加入；
+- rps 模式：调度器按目标速率（启动阶段线性爬升）派发迭代，同时执行的迭代数不超过
+  max_concurrency，来不及派发的记为 dropped，不会因为目标变慢而悄悄降低压力。
+
+每个虚拟用户持有独立的变量副本（环境/场景变量 + vu_variables 数据行 + __vu/__iteration），
+前置动作和后置提取只影响自己。请求走本次压测专用的连接池（连接数与并发数一致，
+不保存 Cookie），结果写入对数分桶直方图，每秒汇总一次推送给订阅方，结束后写入汇总报告。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Optional
+
+import httpx
+from sqlmodel import Session, select
+
+from app.routes.proxy import (
+    build_param_map, is_valid_url, substitute_in_data, substitute_in_headers,
+    substitute_in_params, substitute_variables,
+)
+from app.scheduler import strip_json_comments
+from app.services.api_test_tool import (
+    _apply_pending_extractions,
+    _extract_post_actions,
+    _run_assertions,
+    build_step_request,
+)
+from db.db import engine
+from db.models import ApiEndpoint, ApiProject, ApiScenario, LoadTestRun, SavedRequest, cn_tz
+from db.write_queue import run_write
+from utils.histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# 压测任务内 httpx 每个请求一条的 INFO 日志（HTTP Request: ...）只保留 WARNING 及以上
+_in_load_test: ContextVar[bool] = ContextVar("in_load_test", default=False)
+
+
+class _LoadTestHttpxLogFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or not _in_load_test.get()
+
+
+logging.getLogger("httpx").addFilter(_LoadTestHttpxLogFilter())
+
+LOAD_TEST_MAX_CONCURRENCY = int(os.getenv("LOAD_TEST_MAX_CONCURRENCY", "500"))
+LOAD_TEST_MAX_RPS = float(os.getenv("LOAD_TEST_MAX_RPS", "2000"))
+LOAD_TEST_MAX_DURATION_SECONDS = int(os.getenv("LOAD_TEST_MAX_DURATION_SECONDS", "3600"))
+# 同时运行的压测数上限，避免多个压测互相干扰结果
+LOAD_TEST_MAX_ACTIVE_RUNS = int(os.getenv("LOAD_TEST_MAX_ACTIVE_RUNS", "3"))
+
+MODE_CONCURRENCY = "concurrency"
+MODE_RPS = "rps"
+TARGET_SAVED_REQUEST = "saved_request"
+TARGET_SCENARIO = "scenario"
+
+ERROR_SAMPLE_LIMIT = 20
+SUBSCRIBER_QUEUE_SIZE = 120
+
+
+class _StepStats:
+    __slots__ = ("histogram", "requests", "errors")
+
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+
+
+class LoadTestAggregator:
+    """压测结果汇总：累计直方图 + 当前一秒的窗口直方图，只在事件循环内调用，无需加锁"""
+
+    def __init__(self) -> None:
+        self.total = LatencyHistogram()
+        self.window = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.window_requests = 0
+        self.window_errors = 0
+        self.iterations = 0
+        self.dropped = 0
+        self.status_codes: dict[str, int] = {}
+        self.steps: dict[str, _StepStats] = {}
+        self.error_samples: list[dict] = []
+
+    def record(self, step: str, elapsed_ms: float, status_code: Optional[int], ok: bool, error: str = "") -> None:
+        self.requests += 1
+        self.window_requests += 1
+        self.total.record(elapsed_ms)
+        self.window.record(elapsed_ms)
+        code = str(status_code) if status_code is not None else "error"
+        self.status_codes[code] = self.status_codes.get(code, 0) + 1
+        stats = self.steps.get(step)
+        if stats is None:
+            stats = self.steps[step] = _StepStats()
+        stats.requests += 1
+        stats.histogram.record(elapsed_ms)
+        if not ok:
+            self.errors += 1
+            self.window_errors += 1
+            stats.errors += 1
+            if len(self.error_samples) < ERROR_SAMPLE_LIMIT:
+                self.error_samples.append({"step": step, "status_code": status_code, "detail": error[:500]})
+
+    def flush_window(self, second: int, window_seconds: float, active: int) -> dict:
+        latency = self.window.summary()
+        point = {
+            "t": second,
+            "requests": self.window_requests,
+            "errors": self.window_errors,
+            "rps": round(self.window_requests / window_seconds, 2) if window_seconds > 0 else 0,
+            "error_rate": round(self.window_errors / self.window_requests, 4) if self.window_requests else 0,
+            "active": active,
+            "avg": latency["avg"],
+            "p50": latency["p50"],
+            "p95": latency["p95"],
+            "p99": latency["p99"],
+        }
+        self.window = LatencyHistogram()
+        self.window_requests = 0
+        self.window_errors = 0
+        return point
+
+    def summary(self, duration_seconds: float) -> dict:
+        return {
+            "duration_seconds": round(duration_seconds, 2),
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0,
+            "throughput": round(self.requests / duration_seconds, 2) if duration_seconds > 0 else 0,
+            "iterations": self.iterations,
+            "dropped": self.dropped,
+            "latency": self.total.summary(),
+            "latency_buckets": self.total.to_buckets(),
+            "status_codes": self.status_codes,
+            "steps": [
+                {
+                    "name": name,
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "latency": stats.histogram.summary(),
+                }
+                for name, stats in self.steps.items()
+            ],
+            "error_samples": self.error_samples,
+        }
+
+
+class _VirtualUser:
+    __slots__ = ("index", "variables", "iteration")
+
+    def __init__(self, index: int, variables: dict) -> None:
+        self.index = index
+        self.variables = variables
+        self.iteration = 0
+
+    def next_variables(self) -> dict:
+        # 每次迭代从虚拟用户自己的变量副本开始，迭代内的提取结果不串到其它虚拟用户
+        self.iteration += 1
+        return {**self.variables, "__vu": str(self.index), "__iteration": str(self.iteration)}
+
+
+class _SavedRequestTarget:
+    """保存的请求：请求体只解析一次，每次迭代只做变量替换"""
+
+    def __init__(self, saved: SavedRequest, base_variables: dict) -> None:
+        self.name = saved.name or f"request-{saved.id}"
+        self.base_variables = base_variables
+        self.method = saved.method or "GET"
+        self.url = saved.url or ""
+        self.headers = {h["key"]: h["value"] for h in saved.headers or [] if h.get("key") and h.get("value")}
+        self.params = {p["key"]: str(p.get("value", "")) for p in saved.parameters or [] if p.get("key")}
+        self.body = None
+        if saved.body and self.method in ("POST", "PUT", "PATCH"):
+            try:
+                self.body = json.loads(strip_json_comments(saved.body))
+            except json.JSONDecodeError:
+                self.body = saved.body
+
+    async def iterate(self, client: httpx.AsyncClient, variables: dict, aggregator: LoadTestAggregator) -> None:
+        unresolved: set[str] = set()
+        url = substitute_variables(self.url, variables, unresolved)
+        headers = substitute_in_headers(self.headers, variables, unresolved)
+        data = substitute_in_data(self.body, variables, unresolved)
+        params = substitute_in_params(self.params, variables, unresolved)
+        if unresolved:
+            aggregator.record(self.name, 0, None, False, f"变量未定义: {', '.join(sorted(unresolved))}")
+            return
+        await _send(client, aggregator, self.name, {
+            "method": self.method,
+            "url": url,
+            "headers": headers,
+            "params": params,
+            "json": data if isinstance(data, (dict, list)) else None,
+            "content": data if isinstance(data, str) else None,
+        })
+
+
+class _ScenarioTarget:
+    """接口场景：按场景步骤顺序执行，断言/后置提取只在步骤配置了时才解析响应体"""
+
+    def __init__(self, scenario: ApiScenario, project: ApiProject, endpoints: dict[int, ApiEndpoint], base_variables: dict) -> None:
+        self.name = scenario.name or f"scenario-{scenario.id}"
+        self.project = project
+        self.base_url = (project.base_url or "").rstrip("/")
+        # 提取规则只读，每次迭代复制一份（提取成功的变量会从副本中移除）
+        self.pending_extractions: dict[str, str] = {}
+        for var in scenario.variables or []:
+            if isinstance(var, dict) and var.get("key") and str(var.get("value", "")).startswith("$."):
+                self.pending_extractions[var["key"]] = var["value"]
+                base_variables.pop(var["key"], None)
+        self.base_variables = base_variables
+        self.steps = []
+        for index, step in enumerate(scenario.steps or [], 1):
+            if not isinstance(step, dict) or step.get("enabled", True) is False:
+                continue
+            endpoint = endpoints.get(step.get("endpoint_id"))
+            if endpoint is None:
+                raise ValueError(f"场景第 {index} 步的接口不存在")
+            name = step.get("step_name") or endpoint.name or f"{endpoint.method} {endpoint.path}"
+            self.steps.append((f"{index}. {name}", endpoint, step))
+        if not self.steps:
+            raise ValueError("场景没有可执行的步骤")
+
+    async def iterate(self, client: httpx.AsyncClient, variables: dict, aggregator: LoadTestAggregator) -> None:
+        pending = dict(self.pending_extractions)
+        for name, endpoint, step in self.steps:
+            merged, snapshot, _, unresolved = build_step_request(
+                self.project, endpoint, step, variables, self.base_url
+            )
+            if unresolved or not is_valid_url(snapshot["url"]):
+                detail = f"变量未定义: {', '.join(sorted(unresolved))}" if unresolved else "无效的 URL"
+                aggregator.record(name, 0, None, False, detail)
+                if not step.get("continue_on_failure"):
+                    return
+                continue
+            data = snapshot["body"]
+            assertions = merged.get("assertions")
+            post_actions = merged.get("post_actions")
+            passed = await _send(client, aggregator, name, {
+                "method": merged.get("method", "GET"),
+                "url": snapshot["url"],
+                "headers": snapshot["headers"],
+                "params": snapshot["params"],
+                "json": data if isinstance(data, (dict, list)) else None,
+                "content": data if isinstance(data, str) else None,
+            }, lambda response, elapsed_ms: self._check(response, elapsed_ms, assertions, post_actions, variables, pending))
+            if not passed and not step.get("continue_on_failure"):
+                return
+
+    def _check(
+        self, response: httpx.Response, elapsed_ms: float, assertions, post_actions, variables: dict, pending: dict
+    ) -> tuple[bool, str]:
+        if not assertions and not post_actions and not pending:
+            return 200 <= response.status_code < 400, ""
+        try:
+            response_data = response.json()
+        except Exception:
+            response_data = response.text
+        results = _run_assertions(assertions, response_data, response.status_code, int(elapsed_ms), variables)
+        _extract_post_actions(post_actions, response_data, variables)
+        passed = all(a["passed"] for a in results) if results else 200 <= response.status_code < 400
+        if passed and pending:
+            _apply_pending_extractions(pending, response_data, variables)
+        failed = [a for a in results if not a["passed"]]
+        detail = json.dumps(failed[0], ensure_ascii=False, default=str) if failed else ""
+        return passed, detail
+
+
+async def _send(client: httpx.AsyncClient, aggregator: LoadTestAggregator, name: str, request_kwargs: dict, check=None) -> bool:
+    started = time.perf_counter()
+    try:
+        response = await client.request(**request_kwargs)
+    except Exception as exc:
+        aggregator.record(name, (time.perf_counter() - started) * 1000, None, False, f"{type(exc).__name__}: {exc}")
+        return False
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if check is None:
+        passed, detail = 200 <= response.status_code < 400, ""
+    else:
+        try:
+            passed, detail = check(response, elapsed_ms)
+        except Exception as exc:
+            passed, detail = False, f"断言执行失败: {exc}"
+    if not passed and not detail:
+        detail = f"HTTP {response.status_code}: {response.text[:200]}"
+    aggregator.record(name, elapsed_ms, response.status_code, passed, detail)
+    return passed
+
+
+def load_target(db: Session, run: LoadTestRun, config: dict):
+    """根据压测记录加载目标并准备变量；目标不可执行时抛出 ValueError"""
+    variables = config.get("variables") or []
+    if run.target_type == TARGET_SAVED_REQUEST:
+        saved = db.get(SavedRequest, run.target_id)
+        if saved is None:
+            raise ValueError("请求配置不存在")
+        if any(p.get("type") == "file" for p in saved.parameters or [] if isinstance(p, dict)):
+            raise ValueError("包含文件参数的请求暂不支持压测")
+        return _SavedRequestTarget(saved, build_param_map(db, config.get("environment_id"), variables))
+
+    scenario = db.get(ApiScenario, run.target_id)
+    if scenario is None or scenario.user_id != run.user_id:
+        raise ValueError("场景不存在")
+    project = db.get(ApiProject, scenario.project_id)
+    if project is None or project.user_id != run.user_id:
+        raise ValueError("接口项目不存在")
+    env_id = config.get("environment_id") or scenario.environment_id or project.environment_id
+    base_variables = build_param_map(db, env_id, [*(scenario.variables or []), *variables])
+    endpoint_ids = {step.get("endpoint_id") for step in scenario.steps or [] if isinstance(step, dict)} - {None}
+    endpoints = (
+        {endpoint.id: endpoint for endpoint in db.exec(select(ApiEndpoint).where(ApiEndpoint.id.in_(endpoint_ids))).all()}
+        if endpoint_ids else {}
+    )
+    target = _ScenarioTarget(scenario, project, endpoints, base_variables)
+    # 压测期间一直使用这些对象，脱离会话以免请求提交后属性过期
+    for obj in (project, *endpoints.values()):
+        db.expunge(obj)
+    return target
+
+
+class LoadTestRunner:
+    def __init__(self, run_id: int, config: dict, target) -> None:
+        self.run_id = run_id
+        self.config = config
+        self.target = target
+        self.aggregator = LoadTestAggregator()
+        self.timeline: list[dict] = []
+        self.status = "running"
+        self.summary: dict = {}
+        self.active = 0
+        self.finished = False
+        self.started = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def workers(self) -> int:
+        if self.config["mode"] == MODE_RPS:
+            return self.config["max_concurrency"]
+        return self.config["concurrency"]
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def _publish(self, event: str, data: dict) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # 订阅方读得太慢时丢弃中间的秒级数据，最终结果仍会送达
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _make_vu(self, index: int) -> _VirtualUser:
+        rows = self.config.get("vu_variables") or []
+        variables = dict(self.target.base_variables)
+        if rows:
+            row = rows[(index - 1) % len(rows)]
+            variables.update({str(k): v for k, v in row.items()})
+        return _VirtualUser(index, variables)
+
+    async def _iterate(self, client: httpx.AsyncClient, vu: _VirtualUser) -> None:
+        self.active += 1
+        try:
+            await self.target.iterate(client, vu.next_variables(), self.aggregator)
+        except Exception as exc:
+            logger.debug("压测迭代异常: %s", exc)
+            self.aggregator.record(self.target.name, 0, None, False, str(exc))
+        finally:
+            self.active -= 1
+        # 停止时被取消的迭代不计入完成数
+        self.aggregator.iterations += 1
+
+    async def _virtual_user(self, client: httpx.AsyncClient, index: int, start_delay: float) -> None:
+        if start_delay > 0:
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=start_delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+        vu = self._make_vu(index)
+        think_time = self.config.get("think_time_ms", 0) / 1000
+        while not self._stop.is_set():
+            await self._iterate(client, vu)
+            if think_time > 0:
+                await asyncio.sleep(think_time)
+
+    async def _run_concurrency(self, client: httpx.AsyncClient) -> None:
+        concurrency = self.config["concurrency"]
+        ramp_up = self.config.get("ramp_up_seconds", 0)
+        tasks = [
+            asyncio.create_task(self._virtual_user(client, index, ramp_up * (index - 1) / concurrency))
+            for index in range(1, concurrency + 1)
+        ]
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _expected_dispatches(self, elapsed: float) -> float:
+        rps = self.config["rps"]
+        ramp_up = self.config.get("ramp_up_seconds", 0)
+        if elapsed < ramp_up:
+            return rps * elapsed * elapsed / (2 * ramp_up)
+        return rps * ramp_up / 2 + rps * (elapsed - ramp_up)
+
+    async def _run_rps(self, client: httpx.AsyncClient) -> None:
+        free = [self._make_vu(index) for index in range(self.config["max_concurrency"], 0, -1)]
+        tasks: set[asyncio.Task] = set()
+        dispatched = 0
+
+        def _release(task: asyncio.Task, vu: _VirtualUser) -> None:
+            tasks.discard(task)
+            free.append(vu)
+
+        try:
+            while not self._stop.is_set():
+                due = int(self._expected_dispatches(time.monotonic() - self.started)) - dispatched
+                for _ in range(due):
+                    dispatched += 1
+                    if not free:
+                        self.aggregator.dropped += 1
+                        continue
+                    vu = free.pop()
+                    task = asyncio.create_task(self._iterate(client, vu))
+                    tasks.add(task)
+                    task.add_done_callback(lambda t, vu=vu: _release(t, vu))
+                # 按当前速率估算下一次派发时间，最长 50ms 检查一次停止信号
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=min(0.05, 1 / self.config["rps"]))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _ticker(self) -> None:
+        last = self.started
+        second = 0
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            second += 1
+            point = self.aggregator.flush_window(second, now - last, self.active)
+            last = now
+            self.timeline.append(point)
+            self._publish("tick", point)
+
+    def _client(self) -> httpx.AsyncClient:
+        workers = self.workers
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers),
+            timeout=httpx.Timeout(self.config.get("timeout_seconds", 30.0)),
+            cookies=httpx.Cookies(CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))),
+            verify=self.config.get("verify_ssl", True),
+        )
+
+    async def run(self) -> None:
+        self.started = time.monotonic()
+        ticker = asyncio.create_task(self._ticker())
+        stopper = asyncio.get_running_loop().call_later(self.config["duration_seconds"], self._stop.set)
+        try:
+            async with self._client() as client:
+                if self.config["mode"] == MODE_RPS:
+                    await self._run_rps(client)
+                else:
+                    await self._run_concurrency(client)
+            self.status = "completed" if time.monotonic() - self.started >= self.config["duration_seconds"] else "stopped"
+        except Exception as exc:
+            logger.exception("压测 %s 执行失败", self.run_id)
+            self.status = "failed"
+            self.aggregator.error_samples.append({"step": None, "status_code": None, "detail": str(exc)})
+        finally:
+            stopper.cancel()
+            ticker.cancel()
+            duration = time.monotonic() - self.started
+            if self.aggregator.window_requests:
+                self.timeline.append(self.aggregator.flush_window(
+                    len(self.timeline) + 1, max(duration - len(self.timeline), 0.001), 0
+                ))
+            self.summary = self.aggregator.summary(duration)
+            await self._save()
+            self.finished = True
+            self._publish("done", {"status": self.status, "summary": self.summary})
+
+    async def _save(self) -> None:
+        run_id, status, summary, timeline = self.run_id, self.status, self.summary, list(self.timeline)
+        finished_at = datetime.now(tz=cn_tz)
+
+        def _write(session: Session) -> None:
+            run = session.get(LoadTestRun, run_id)
+            if run:
+                run.status = status
+                run.summary = summary
+                run.timeline = timeline
+                run.finished_at = finished_at
+                session.add(run)
+                session.commit()
+
+        try:
+            await run_write(_write)
+        except Exception as exc:
+            logger.warning("保存压测结果失败: %s", exc)
+
+    def snapshot(self) -> dict:
+        duration = time.monotonic() - self.started if self.started else 0
+        return {
+            "status": self.status,
+            "active": self.active,
+            "summary": self.aggregator.summary(duration),
+            "timeline": list(self.timeline),
+        }
+
+
+_active_runs: dict[int, LoadTestRunner] = {}
+
+
+def normalize_config(config: dict) -> dict:
+    """校验并补全压测配置，超出上限时抛出 ValueError"""
+    mode = config.get("mode") or MODE_CONCURRENCY
+    if mode not in (MODE_CONCURRENCY, MODE_RPS):
+        raise ValueError("mode 只能是 concurrency 或 rps")
+    duration = int(config.get("duration_seconds") or 0)
+    if duration <= 0 or duration > LOAD_TEST_MAX_DURATION_SECONDS:
+        raise ValueError(f"压测时长需在 1~{LOAD_TEST_MAX_DURATION_SECONDS} 秒之间")
+    ramp_up = max(int(config.get("ramp_up_seconds") or 0), 0)
+    if ramp_up > duration:
+        raise ValueError("ramp_up_seconds 不能超过压测时长")
+    normalized = {
+        **config,
+        "mode": mode,
+        "duration_seconds": duration,
+        "ramp_up_seconds": ramp_up,
+        "think_time_ms": max(int(config.get("think_time_ms") or 0), 0),
+        "timeout_seconds": float(config.get("timeout_seconds") or 30.0),
+    }
+    if mode == MODE_RPS:
+        rps = float(config.get("rps") or 0)
+        if rps <= 0 or rps > LOAD_TEST_MAX_RPS:
+            raise ValueError(f"rps 需在 0~{LOAD_TEST_MAX_RPS:g} 之间")
+        max_concurrency = int(config.get("max_concurrency") or min(LOAD_TEST_MAX_CONCURRENCY, max(int(rps), 10)))
+        if max_concurrency <= 0 or max_concurrency > LOAD_TEST_MAX_CONCURRENCY:
+            raise ValueError(f"max_concurrency 需在 1~{LOAD_TEST_MAX_CONCURRENCY} 之间")
+        normalized.update(rps=rps, max_concurrency=max_concurrency)
+    else:
+        concurrency = int(config.get("concurrency") or 0)
+        if concurrency <= 0 or concurrency > LOAD_TEST_MAX_CONCURRENCY:
+            raise ValueError(f"concurrency 需在 1~{LOAD_TEST_MAX_CONCURRENCY} 之间")
+        normalized["concurrency"] = concurrency
+    return normalized
+
+
+def can_start_load_test() -> bool:
+    return len(_active_runs) < LOAD_TEST_MAX_ACTIVE_RUNS
+
+
+def start_load_test(run_id: int, config: dict, target) -> LoadTestRunner:
+    runner = LoadTestRunner(run_id, config, target)
+    _active_runs[run_id] = runner
+
+    async def _main() -> None:
+        # 只作用于本压测任务及其派生的任务
+        _in_load_test.set(True)
+        try:
+            await runner.run()
+        finally:
+            _active_runs.pop(run_id, None)
+
+    runner.task = asyncio.create_task(_main())
+    return runner
+
+
+def get_active_load_test(run_id: int) -> Optional[LoadTestRunner]:
+    return _active_runs.get(run_id)
+
+
+async def shutdown_load_tests(timeout: float = 10.0) -> None:
+    """停止所有进行中的压测并等待汇总写入"""
+    runners = list(_active_runs.values())
+    for runner in runners:
+        runner.stop()
+    tasks = [runner.task for runner in runners if runner.task]
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+
+
+def mark_interrupted_runs() -> None:
+    """进程重启后，上次未结束的压测标记为 stopped"""
+    with Session(engine) as db:
+        runs = db.exec(select(LoadTestRun).where(LoadTestRun.status == "running")).all()
+        for run in runs:
+            if run.id not in _active_runs:
+                run.status = "stopped"
+                run.finished_at = run.finished_at or datetime.now(tz=cn_tz)
+                db.add(run)
+        if runs:
+            db.commit()
+
+
+def event_payload(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
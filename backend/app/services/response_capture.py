@@ -0,0 +1,196 @@
+"""接口执行响应采集：按大小上限流式读取响应体，结果中只保存截断预览、大小和哈希。
+
+完整响应体可选写入按 sha256 寻址的磁盘 blob 存储，供前端按需下载；
+每个 blob 旁的 .owners 文件记录产生过该响应体的用户，下载时据此校验归属。
+"""
+
+import hashlib
+import json
+import os
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 内存中最多保留并解析的响应字节数，超出部分只参与哈希/大小统计（及 blob 落盘）
+RESPONSE_MAX_BYTES = int(os.getenv("API_TEST_RESPONSE_MAX_BYTES", str(20 * 1024 * 1024)))
+# 写入执行结果的响应体预览上限；不超过该大小的响应体原样保存
+RESPONSE_PREVIEW_BYTES = min(int(os.getenv("API_TEST_RESPONSE_PREVIEW_BYTES", str(64 * 1024))), RESPONSE_MAX_BYTES)
+RESPONSE_BLOB_STORE = os.getenv("API_TEST_RESPONSE_BLOB_STORE", "false").lower() == "true"
+RESPONSE_BLOB_DIR = os.getenv("API_TEST_RESPONSE_BLOB_DIR", os.path.join(PROJECT_ROOT, "data", "response_blobs"))
+# blob 清理：超过保留天数的删除，总大小超过上限时从最久未产生的开始删除（0 表示不限制）
+RESPONSE_BLOB_MAX_AGE_DAYS = float(os.getenv("API_TEST_RESPONSE_BLOB_MAX_AGE_DAYS", "7"))
+RESPONSE_BLOB_MAX_TOTAL_BYTES = int(os.getenv("API_TEST_RESPONSE_BLOB_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+RESPONSE_BLOB_PRUNE_INTERVAL_MINUTES = int(os.getenv("API_TEST_RESPONSE_BLOB_PRUNE_INTERVAL_MINUTES", "60"))
+
+
+@dataclass
+class CapturedBody:
+    content: bytes
+    size: int
+    sha256: str
+    complete: bool
+    blob: str | None = None
+
+
+def _blob_path(digest: str) -> Path:
+    return Path(RESPONSE_BLOB_DIR) / digest[:2] / digest
+
+
+def _owners_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.owners")
+
+
+def _owner_key(owner: str | None) -> str:
+    return owner or ""
+
+
+def _add_blob_owner(path: Path, owner: str | None) -> None:
+    owners_path = _owners_path(path)
+    key = _owner_key(owner)
+    try:
+        owners = owners_path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        owners = []
+    if key in owners:
+        owners_path.touch()
+        return
+    with open(owners_path, "a", encoding="utf-8") as f:
+        f.write(key + "\n")
+
+
+def get_blob_path(digest: str, owner: str | None) -> Path | None:
+    """按哈希查找 owner 产生过的完整响应体，不存在、哈希非法或不属于该用户时返回 None。"""
+    if len(digest) != 64 or any(ch not in "0123456789abcdef" for ch in digest):
+        return None
+    path = _blob_path(digest)
+    if not path.is_file():
+        return None
+    try:
+        owners = _owners_path(path).read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return None
+    return path if _owner_key(owner) in owners else None
+
+
+def prune_blob_store() -> None:
+    """按保留天数和总大小上限清理 blob（以最近一次产生的时间为准），同时清理中断遗留的临时文件。"""
+    root = Path(RESPONSE_BLOB_DIR)
+    if not root.is_dir():
+        return
+    now = time.time()
+    max_age = RESPONSE_BLOB_MAX_AGE_DAYS * 86400
+    removed = 0
+    blobs = []
+    for entry in root.iterdir():
+        if entry.is_file():
+            # 根目录下只有写入中的临时文件，超过一天仍存在的是进程中断遗留
+            if now - entry.stat().st_mtime > 86400:
+                entry.unlink(missing_ok=True)
+            continue
+        for path in entry.iterdir():
+            if path.name.endswith(".owners"):
+                if not path.with_name(path.name[:-len(".owners")]).exists():
+                    path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            if max_age and now - stat.st_mtime > max_age:
+                _remove_blob(path)
+                removed += 1
+            else:
+                blobs.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in blobs)
+    if RESPONSE_BLOB_MAX_TOTAL_BYTES and total > RESPONSE_BLOB_MAX_TOTAL_BYTES:
+        for _, size, path in sorted(blobs):
+            _remove_blob(path)
+            removed += 1
+            total -= size
+            if total <= RESPONSE_BLOB_MAX_TOTAL_BYTES:
+                break
+    if removed:
+        logger.info("清理响应体 blob %d 个，剩余 %d 字节", removed, total)
+
+
+def _remove_blob(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    _owners_path(path).unlink(missing_ok=True)
+
+
+async def read_response_body(response: httpx.Response, owner: str | None = None) -> CapturedBody:
+    """流式读取响应体：内存中最多保留 RESPONSE_MAX_BYTES，大响应可同时写入 blob 存储（记录 owner 归属）。"""
+    hasher = hashlib.sha256()
+    chunks: list[bytes] = []
+    kept = 0
+    size = 0
+    spool = None
+    try:
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            hasher.update(chunk)
+            if kept < RESPONSE_MAX_BYTES:
+                part = chunk[:RESPONSE_MAX_BYTES - kept]
+                chunks.append(part)
+                kept += len(part)
+            if RESPONSE_BLOB_STORE:
+                if spool is None and size > RESPONSE_PREVIEW_BYTES:
+                    os.makedirs(RESPONSE_BLOB_DIR, exist_ok=True)
+                    spool = tempfile.NamedTemporaryFile(dir=RESPONSE_BLOB_DIR, delete=False)
+                    spool.write(b"".join(chunks)[:size - len(chunk)])
+                if spool is not None:
+                    spool.write(chunk)
+        digest = hasher.hexdigest()
+        blob = None
+        if spool is not None:
+            spool.close()
+            target = _blob_path(digest)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(spool.name, target)
+            spool = None
+            _add_blob_owner(target, owner)
+            blob = digest
+        return CapturedBody(
+            content=b"".join(chunks),
+            size=size,
+            sha256=digest,
+            complete=size == kept,
+            blob=blob,
+        )
+    finally:
+        if spool is not None:
+            spool.close()
+            os.unlink(spool.name)
+
+
+def parse_response_body(response: httpx.Response, captured: CapturedBody) -> Any:
+    """与 response.json()/response.text 行为一致；被截断的响应体只能作为文本处理。"""
+    if captured.complete:
+        try:
+            return json.loads(captured.content)
+        except Exception:
+            pass
+    return captured.content.decode(response.encoding or "utf-8", errors="replace")
+
+
+def response_body_snapshot(captured: CapturedBody, data: Any) -> dict:
+    """生成写入执行结果的响应体字段：小响应体原样保存，大响应体只保留预览。"""
+    snapshot: dict[str, Any] = {
+        "body_size": captured.size,
+        "body_sha256": captured.sha256,
+        "body_truncated": captured.size > RESPONSE_PREVIEW_BYTES,
+    }
+    if snapshot["body_truncated"]:
+        preview = captured.content[:RESPONSE_PREVIEW_BYTES].decode("utf-8", errors="ignore")
+        snapshot["body"] = f"{preview}\n... (已截断，共 {captured.size} 字节)"
+    else:
+        snapshot["body"] = data
+    if captured.blob:
+        snapshot["body_blob"] = captured.blob
+    return snapshot
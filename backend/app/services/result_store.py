@@ -0,0 +1,200 @@
+"""执行结果存储：摘要字段写入结果表，完整结果压缩后写入 ExecutionResultDetail，按需加载。"""
+
+import gzip
+import json
+import os
+from typing import Any
+
+from sqlalchemy import delete, select as sa_select
+from sqlmodel import Session, select
+
+from db.models import ApiScenarioResult, ExecutionResultDetail, TestCaseExecutionLog
+
+SCENARIO_RESULT = "scenario_result"
+TESTCASE_LOG = "testcase_log"
+
+# gzip 为标准库实现；安装 zstandard 后可配置为 zstd 获得更快的压缩速度
+RESULT_CODEC = os.getenv("EXECUTION_RESULT_CODEC", "gzip").lower()
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress_payload(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def encode_result(result: dict) -> tuple[str, int, bytes]:
+    raw = json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+    codec = RESULT_CODEC if RESULT_CODEC in {"gzip", "zstd"} else "gzip"
+    try:
+        payload = _compress(raw, codec)
+    except ImportError:
+        codec = "gzip"
+        payload = _compress(raw, codec)
+    return codec, len(raw), payload
+
+
+def decode_result(detail: ExecutionResultDetail) -> dict:
+    return json.loads(decompress_payload(detail.payload, detail.codec))
+
+
+def summarize_result(result: dict) -> dict:
+    steps = [step for step in (result.get("steps") or []) if isinstance(step, dict)]
+    passed_steps = sum(1 for step in steps if step.get("status") == "passed")
+    duration_ms = result.get("duration_ms")
+    if not isinstance(duration_ms, int):
+        duration_ms = sum(
+            int((step.get("response") or {}).get("elapsed_ms") or 0)
+            for step in steps
+        )
+    return {
+        "duration_ms": duration_ms,
+        "total_steps": len(steps),
+        "passed_steps": passed_steps,
+        "failed_steps": len(steps) - passed_steps,
+    }
+
+
+def _add_detail(db: Session, owner_type: str, owner_id: int, result: dict) -> None:
+    codec, raw_size, payload = encode_result(result)
+    db.add(ExecutionResultDetail(
+        owner_type=owner_type,
+        owner_id=owner_id,
+        codec=codec,
+        raw_size=raw_size,
+        payload=payload,
+    ))
+
+
+def load_result_detail(db: Session, owner_type: str, record: ApiScenarioResult | TestCaseExecutionLog) -> dict:
+    """读取记录的完整结果；旧数据直接返回 result 列。"""
+    detail = db.exec(
+        select(ExecutionResultDetail)
+        .where(ExecutionResultDetail.owner_type == owner_type)
+        .where(ExecutionResultDetail.owner_id == record.id)
+    ).first()
+    if detail is None:
+        return record.result or {}
+    return decode_result(detail)
+
+
+def load_result_details(db: Session, owner_type: str, records: list) -> dict[int, dict]:
+    """批量读取多条记录的完整结果，返回 {record_id: result}。"""
+    ids = [record.id for record in records]
+    if not ids:
+        return {}
+    details = db.exec(
+        select(ExecutionResultDetail)
+        .where(ExecutionResultDetail.owner_type == owner_type)
+        .where(ExecutionResultDetail.owner_id.in_(ids))
+    ).all()
+    decoded = {detail.owner_id: decode_result(detail) for detail in details}
+    return {record.id: decoded.get(record.id, record.result or {}) for record in records}
+
+
+def with_result(record, result: dict):
+    """返回带完整结果的记录副本，避免修改会话中的持久化对象。"""
+    return type(record).model_validate({**record.model_dump(), "result": result})
+
+
+def _prune(db: Session, model, owner_type: str, filters: list, keep: int) -> None:
+    # 保留最新 keep 条：先删详情再删摘要，两条语句都走 filters 对应的索引，不把旧记录加载到内存
+    keep_ids = (
+        sa_select(model.id)
+        .where(*filters)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(keep)
+    )
+    stale_ids = sa_select(model.id).where(*filters).where(model.id.not_in(keep_ids))
+    db.exec(
+        delete(ExecutionResultDetail)
+        .where(ExecutionResultDetail.owner_type == owner_type)
+        .where(ExecutionResultDetail.owner_id.in_(stale_ids))
+    )
+    db.exec(delete(model).where(*filters).where(model.id.not_in(keep_ids)))
+
+
+def save_scenario_result(
+    db: Session,
+    *,
+    scenario_id: int,
+    project_id: int,
+    scenario_name: str,
+    user_id: str | None,
+    result: dict,
+    keep: int,
+) -> ApiScenarioResult:
+    record = ApiScenarioResult(
+        scenario_id=scenario_id,
+        project_id=project_id,
+        scenario_name=scenario_name,
+        passed=bool(result.get("passed")),
+        result={},
+        user_id=user_id,
+        **summarize_result(result),
+    )
+    db.add(record)
+    db.flush()
+    _add_detail(db, SCENARIO_RESULT, record.id, result)
+    db.flush()
+    _prune(
+        db,
+        ApiScenarioResult,
+        SCENARIO_RESULT,
+        [ApiScenarioResult.scenario_id == scenario_id, ApiScenarioResult.user_id == user_id],
+        keep,
+    )
+    db.commit()
+    db.refresh(record)
+    return record
+
+
+def save_testcase_log(
+    db: Session,
+    *,
+    testcase_id: int,
+    session_id: int,
+    case_name: str,
+    passed: bool,
+    status: str,
+    user_id: str | None,
+    result: dict,
+    keep: int,
+) -> TestCaseExecutionLog:
+    log = TestCaseExecutionLog(
+        testcase_id=testcase_id,
+        session_id=session_id,
+        case_name=case_name,
+        passed=passed,
+        status=status,
+        result={},
+        user_id=user_id,
+        **summarize_result(result),
+    )
+    db.add(log)
+    db.flush()
+    _add_detail(db, TESTCASE_LOG, log.id, result)
+    db.flush()
+    _prune(db, TestCaseExecutionLog, TESTCASE_LOG, [TestCaseExecutionLog.testcase_id == testcase_id], keep)
+    db.commit()
+    db.refresh(log)
+    return log
+
+
+def delete_result_details(db: Session, owner_type: str, owner_ids: Any) -> None:
+    """删除指定记录的压缩详情（owner_ids 可以是 id 列表或子查询）。"""
+    db.exec(
+        delete(ExecutionResultDetail)
+        .where(ExecutionResultDetail.owner_type == owner_type)
+        .where(ExecutionResultDetail.owner_id.in_(owner_ids))
+    )
@@ -0,0 +1,188 @@
+"""接口步骤耗时拆分与按接口聚合的延迟直方图。
+
+网络阶段通过 httpcore 的 trace 扩展采集，工具自身耗时（变量替换、断言、提取）由执行器计时；
+每次执行结束后按 (接口, 日期, 阶段) 合并进 ApiEndpointLatencyStat，用于查询 p50/p95/p99。
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from db.models import ApiEndpointLatencyStat, cn_tz
+from utils.histogram import LatencyHistogram
+
+# 对外展示的阶段顺序；connect 包含 DNS 解析（httpcore 在建立 TCP 连接时一并解析）
+TIMING_PHASES = (
+    "total",
+    "connect",
+    "tls",
+    "send",
+    "ttfb",
+    "download",
+    "substitution",
+    "assertions",
+    "extraction",
+)
+
+
+def _ms(start: float | None, end: float | None) -> float | None:
+    if start is None or end is None:
+        return None
+    return round((end - start) * 1000, 2)
+
+
+class StepTracer:
+    """httpcore trace 回调：记录各阶段事件的首次时间点。"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.events: dict[str, float] = {}
+        self.body_done: float | None = None
+
+    async def __call__(self, event_name: str, info: dict) -> None:
+        # 事件名形如 connection.connect_tcp.started / http11.receive_response_headers.complete
+        name = event_name.split(".", 1)[-1]
+        self.events.setdefault(name, time.perf_counter())
+
+    def finish(self) -> None:
+        self.body_done = time.perf_counter()
+
+    def phases(self) -> dict[str, float]:
+        events = self.events
+        sent = events.get("send_request_body.complete") or events.get("send_request_headers.complete")
+        timing = {
+            "connect": _ms(events.get("connect_tcp.started"), events.get("connect_tcp.complete")),
+            "tls": _ms(events.get("start_tls.started"), events.get("start_tls.complete")),
+            "send": _ms(events.get("send_request_headers.started"), sent),
+            "ttfb": _ms(sent, events.get("receive_response_headers.complete")),
+            "download": _ms(events.get("receive_response_headers.complete"), self.body_done),
+        }
+        return {f"{phase}_ms": value for phase, value in timing.items() if value is not None}
+
+
+def _stat_date(moment: datetime | None = None) -> str:
+    return (moment or datetime.now(tz=cn_tz)).strftime("%Y-%m-%d")
+
+
+def record_endpoint_timings(db: Session, samples: list[tuple[int, int, dict]]) -> None:
+    """合并一次执行产生的 (project_id, endpoint_id, timing) 样本到当天的直方图。"""
+    batch: dict[tuple[int, str], tuple[int, LatencyHistogram]] = {}
+    for project_id, endpoint_id, timing in samples:
+        if not endpoint_id or not timing:
+            continue
+        for phase in TIMING_PHASES:
+            value = timing.get(f"{phase}_ms")
+            if value is None:
+                continue
+            key = (endpoint_id, phase)
+            if key not in batch:
+                batch[key] = (project_id, LatencyHistogram())
+            batch[key][1].record(value)
+    if not batch:
+        return
+
+    stat_date = _stat_date()
+    # 先插入缺失的行（冲突忽略），再加锁读取后合并：并发写入同一 (接口, 日期, 阶段) 时不会丢失样本
+    _insert_missing_rows(db, stat_date, batch)
+    endpoint_ids = {endpoint_id for endpoint_id, _ in batch}
+    existing = {
+        (row.endpoint_id, row.phase): row
+        for row in db.exec(
+            select(ApiEndpointLatencyStat)
+            .where(ApiEndpointLatencyStat.endpoint_id.in_(endpoint_ids))
+            .where(ApiEndpointLatencyStat.stat_date == stat_date)
+            .with_for_update()
+        ).all()
+    }
+    for (endpoint_id, phase), (_, histogram) in batch.items():
+        row = existing[(endpoint_id, phase)]
+        histogram.merge(_row_histogram(row))
+        row.count = histogram.count
+        row.total_ms = histogram.total
+        row.min_ms = histogram.min
+        row.max_ms = histogram.max
+        row.buckets = histogram.to_buckets()
+        db.add(row)
+    db.commit()
+
+
+def _insert_missing_rows(db: Session, stat_date: str, batch: dict) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING；SQLite 下同时拿到写锁，后续读取与更新在同一写事务内。"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.now(tz=cn_tz)
+    rows = [
+        {
+            "project_id": project_id,
+            "endpoint_id": endpoint_id,
+            "stat_date": stat_date,
+            "phase": phase,
+            "count": 0,
+            "total_ms": 0.0,
+            "buckets": {},
+            "created_at": now,
+            "updated_at": now,
+        }
+        for (endpoint_id, phase), (project_id, _) in batch.items()
+    ]
+    db.exec(
+        insert(ApiEndpointLatencyStat)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["endpoint_id", "stat_date", "phase"])
+    )
+
+
+def _row_histogram(row: ApiEndpointLatencyStat) -> LatencyHistogram:
+    return LatencyHistogram.from_state(
+        row.buckets,
+        count=row.count,
+        total=row.total_ms,
+        min_value=row.min_ms,
+        max_value=row.max_ms,
+    )
+
+
+def endpoint_latency_stats(
+    db: Session,
+    project_id: int,
+    *,
+    endpoint_id: int | None = None,
+    days: int = 7,
+) -> dict[int, dict]:
+    """返回 {endpoint_id: {"phases": {阶段: 分位数摘要}, "daily": [每日 total 摘要]}}。"""
+    since = _stat_date(datetime.now(tz=cn_tz) - timedelta(days=max(days, 1) - 1))
+    statement = (
+        select(ApiEndpointLatencyStat)
+        .where(ApiEndpointLatencyStat.project_id == project_id)
+        .where(ApiEndpointLatencyStat.stat_date >= since)
+    )
+    if endpoint_id is not None:
+        statement = statement.where(ApiEndpointLatencyStat.endpoint_id == endpoint_id)
+
+    merged: dict[int, dict[str, LatencyHistogram]] = {}
+    daily: dict[int, list[dict]] = {}
+    for row in db.exec(statement.order_by(ApiEndpointLatencyStat.stat_date)).all():
+        histogram = _row_histogram(row)
+        if row.phase == "total":
+            daily.setdefault(row.endpoint_id, []).append({"date": row.stat_date, **histogram.summary()})
+        phases = merged.setdefault(row.endpoint_id, {})
+        if row.phase in phases:
+            phases[row.phase].merge(histogram)
+        else:
+            phases[row.phase] = histogram
+
+    return {
+        endpoint_id: {
+            "phases": {
+                phase: phases[phase].summary()
+                for phase in TIMING_PHASES
+                if phase in phases
+            },
+            "daily": daily.get(endpoint_id, []),
+        }
+        for endpoint_id, phases in merged.items()
+    }
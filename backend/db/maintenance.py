@@ -0,0 +1,112 @@
+"""数据库维护命令（在 backend 目录下执行）。
+
+    python -m db.maintenance sync-schema              强制重新检查表结构并补齐缺失字段
+    python -m db.maintenance repair-json              修复 JSON 列中的空字符串/NULL，可中断后续跑
+    python -m db.maintenance repair-json --restart    清除进度，从头扫描
+    python -m db.maintenance repair-json --table mocklog --batch-size 20000
+
+repair-json 按主键区间分批更新，每批提交后把进度写入 app_schema_state，
+中断后再次执行会从上次位置继续。
+"""
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
+from sqlmodel import SQLModel
+
+from db.db import create_db_and_tables, delete_state, engine, get_state, json_column_default, set_state
+
+REPAIR_STATE_PREFIX = "json_repair:"
+
+
+def _json_columns(table_name: str | None):
+    for table in SQLModel.metadata.sorted_tables:
+        if table_name and table.name != table_name:
+            continue
+        if "id" not in table.c:
+            continue
+        for column in table.columns:
+            if isinstance(column.type, SQLiteJSON):
+                yield table, column
+
+
+def _repair_column(table, column, batch_size: int) -> int:
+    state_key = f"{REPAIR_STATE_PREFIX}{table.name}.{column.name}"
+    last_id = int(get_state(state_key) or 0)
+    with engine.connect() as conn:
+        max_id = conn.execute(select(func.max(table.c.id))).scalar() or 0
+    if last_id >= max_id:
+        print(f"[{table.name}.{column.name}] 已完成，跳过")
+        return 0
+
+    # 空字符串一律修复；NULL 只在非空列上修复，可空列的 NULL 保留原语义
+    if column.nullable:
+        statement = text(
+            f"UPDATE {table.name} SET {column.name} = NULL "
+            f"WHERE id > :lower AND id <= :upper AND {column.name} = ''"
+        )
+        params = {}
+    else:
+        statement = text(
+            f"UPDATE {table.name} SET {column.name} = :json_default "
+            f"WHERE id > :lower AND id <= :upper AND ({column.name} = '' OR {column.name} IS NULL)"
+        )
+        params = {"json_default": json_column_default(table, column)}
+
+    fixed = 0
+    started = time.monotonic()
+    total = max_id - last_id
+    while last_id < max_id:
+        upper = min(last_id + batch_size, max_id)
+        with engine.begin() as conn:
+            result = conn.execute(statement, {**params, "lower": last_id, "upper": upper})
+            fixed += result.rowcount or 0
+        last_id = upper
+        set_state(state_key, str(last_id))
+        done = total - (max_id - last_id)
+        print(
+            f"[{table.name}.{column.name}] {done}/{total} ({done * 100 / total:.1f}%) "
+            f"已修复 {fixed} 行，耗时 {time.monotonic() - started:.1f}s",
+            flush=True,
+        )
+    return fixed
+
+
+def repair_json(table_name: str | None, batch_size: int, restart: bool) -> None:
+    if engine.dialect.name != "sqlite":
+        print("只有 SQLite 数据库的 JSON 列需要修复，已跳过")
+        return
+    if restart:
+        delete_state(REPAIR_STATE_PREFIX + (f"{table_name}." if table_name else ""))
+    total_fixed = 0
+    for table, column in _json_columns(table_name):
+        total_fixed += _repair_column(table, column, batch_size)
+    print(f"JSON 列修复完成，共修复 {total_fixed} 行")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m db.maintenance", description="数据库维护命令")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("sync-schema", help="强制检查表结构并补齐缺失字段")
+
+    repair = subparsers.add_parser("repair-json", help="修复 JSON 列中的空字符串/NULL（可续跑）")
+    repair.add_argument("--table", help="只处理指定表")
+    repair.add_argument("--batch-size", type=int, default=5000, help="每批处理的主键区间大小")
+    repair.add_argument("--restart", action="store_true", help="清除进度从头扫描")
+
+    args = parser.parse_args(argv)
+    if args.command == "sync-schema":
+        create_db_and_tables(force=True)
+        print("表结构检查完成")
+    elif args.command == "repair-json":
+        create_db_and_tables()
+        repair_json(args.table, max(args.batch_size, 1), args.restart)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
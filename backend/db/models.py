@@ -6,7 +6,12 @@ from typing import List, Optional
 from pydantic import field_validator, model_validator
 from sqlmodel import Field, SQLModel, Relationship
 from pydantic.config import ConfigDict
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
+
+# JSON 字段在 SQLite 下保持原有 JSON 文本存储，PostgreSQL 下映射为 JSONB
+JSON = SQLiteJSON().with_variant(JSONB(), "postgresql")
 
 cn_tz = zoneinfo.ZoneInfo("Asia/Shanghai")
 
@@ -72,6 +77,17 @@ class Session(BaseModel, table=True):
 
 class TestCase(BaseModel, table=True):
     """测试用例数据模型"""
+    __table_args__ = (
+        # 用例列表与状态统计：bug_id 放在末尾，分组计数只需扫描索引
+        Index("ix_testcase_session_module_status", "session_id", "module_id", "status", "bug_id"),
+        # 用例列表游标分页的排序键：case_level, created_at DESC, id DESC
+        Index("ix_testcase_session_order", "session_id", "case_level", text("created_at DESC"), text("id DESC")),
+        Index(
+            "ix_testcase_module_order", "session_id", "module_id", "case_level",
+            text("created_at DESC"), text("id DESC"),
+        ),
+    )
+
     case_name: str = Field(default="")
     case_level: Optional[int] = Field(default=4, ge=1, le=4)  # 使用整数类型，添加范围约束
     preset_conditions: List = Field(default_factory=list, sa_type=JSON)
@@ -137,6 +153,11 @@ class GlobalParameter(BaseModel, table=True):
 
 class HistoryPrompt(BaseModel, table=True):
     """历史需求描述（提示词）数据模型"""
+    __table_args__ = (
+        Index("ix_historyprompt_module_created", "module_id", "created_at"),
+        Index("ix_historyprompt_session_created", "session_id", "created_at"),
+    )
+
     content: str = Field(default="", description="需求描述内容")
     module_id: Optional[int] = Field(default=None, foreign_key="module.id", description="关联模块ID")
     session_id: Optional[int] = Field(default=None, foreign_key="session.id", description="关联会话ID")
@@ -238,27 +259,100 @@ class ApiScenario(BaseModel, table=True):
 
 class ApiScenarioResult(BaseModel, table=True):
     """接口场景执行结果"""
+    __table_args__ = (
+        # 按场景+用户查询最近记录及保留条数清理
+        Index("ix_apiscenarioresult_retention", "scenario_id", "user_id", "created_at", "id"),
+    )
+
     scenario_id: int = Field(foreign_key="apiscenario.id", index=True, description="接口场景ID")
     project_id: int = Field(foreign_key="apiproject.id", index=True, description="接口项目ID")
     scenario_name: str = Field(default="", description="执行时的场景名称快照")
     passed: bool = Field(default=False, description="是否执行通过")
-    result: dict = Field(default_factory=dict, sa_type=JSON, description="执行结果详情")
+    duration_ms: int = Field(default=0, description="执行耗时（毫秒）")
+    total_steps: int = Field(default=0, description="执行步骤数")
+    passed_steps: int = Field(default=0, description="通过步骤数")
+    failed_steps: int = Field(default=0, description="失败/出错步骤数")
+    result: dict = Field(default_factory=dict, sa_type=JSON, description="执行结果详情（旧数据；新数据压缩存储于 ExecutionResultDetail）")
     user_id: Optional[str] = Field(default=None, index=True, description="所属用户ID（Keycloak sub）")
 
 
 class TestCaseExecutionLog(BaseModel, table=True):
     """测试用例 API 执行日志"""
+    __table_args__ = (
+        Index("ix_testcaseexecutionlog_retention", "testcase_id", "created_at", "id"),
+    )
+
     testcase_id: int = Field(foreign_key="testcase.id", index=True, description="测试用例ID")
     session_id: int = Field(foreign_key="session.id", index=True, description="会话ID")
     case_name: str = Field(default="", description="执行时的用例名称快照")
     passed: bool = Field(default=False, description="是否执行通过")
     status: str = Field(default="FAILED", description="执行后的用例状态")
-    result: dict = Field(default_factory=dict, sa_type=JSON, description="执行日志详情")
+    duration_ms: int = Field(default=0, description="执行耗时（毫秒）")
+    total_steps: int = Field(default=0, description="执行步骤数")
+    passed_steps: int = Field(default=0, description="通过步骤数")
+    failed_steps: int = Field(default=0, description="失败/出错步骤数")
+    result: dict = Field(default_factory=dict, sa_type=JSON, description="执行日志详情（旧数据；新数据压缩存储于 ExecutionResultDetail）")
     user_id: Optional[str] = Field(default=None, index=True, description="所属用户ID")
 
 
+class ExecutionResultDetail(BaseModel, table=True):
+    """执行结果详情（压缩存储，按需加载）"""
+    __table_args__ = (
+        Index("ix_executionresultdetail_owner", "owner_type", "owner_id", unique=True),
+    )
+
+    owner_type: str = Field(default="", description="所属记录类型: scenario_result | testcase_log")
+    owner_id: int = Field(default=0, description="所属记录ID")
+    codec: str = Field(default="gzip", description="压缩格式: gzip | zstd")
+    raw_size: int = Field(default=0, description="压缩前 JSON 字节数")
+    payload: bytes = Field(default=b"", sa_type=LargeBinary, description="压缩后的执行结果 JSON")
+
+
+class ApiEndpointLatencyStat(BaseModel, table=True):
+    """接口执行耗时直方图（按接口、日期、阶段聚合）"""
+    __table_args__ = (
+        Index("ix_apiendpointlatencystat_key", "endpoint_id", "stat_date", "phase", unique=True),
+        Index("ix_apiendpointlatencystat_project", "project_id", "stat_date"),
+    )
+
+    project_id: int = Field(default=0, description="接口项目ID")
+    endpoint_id: int = Field(default=0, description="接口ID")
+    stat_date: str = Field(default="", description="统计日期 YYYY-MM-DD")
+    phase: str = Field(default="total", description="耗时阶段: total | connect | tls | ttfb | download | substitution | assertions | extraction 等")
+    count: int = Field(default=0, description="样本数")
+    total_ms: float = Field(default=0.0, description="耗时总和（毫秒）")
+    min_ms: Optional[float] = Field(default=None, description="最小耗时（毫秒）")
+    max_ms: Optional[float] = Field(default=None, description="最大耗时（毫秒）")
+    buckets: dict = Field(default_factory=dict, sa_type=JSON, description="对数分桶计数 {桶序号: 次数}")
+
+
+class LoadTestRun(BaseModel, table=True):
+    """压测执行记录（配置、状态、汇总报告和逐秒统计）"""
+    __table_args__ = (
+        Index("ix_loadtestrun_user_created", "user_id", "created_at", "id"),
+    )
+
+    target_type: str = Field(default="saved_request", description="压测目标类型: saved_request | scenario")
+    target_id: int = Field(default=0, description="压测目标ID")
+    target_name: str = Field(default="", description="压测目标名称快照")
+    project_id: Optional[int] = Field(default=None, description="场景所属接口项目ID")
+    status: str = Field(default="running", description="状态: running | completed | stopped | failed")
+    config: dict = Field(default_factory=dict, sa_type=JSON, description="压测配置")
+    summary: dict = Field(default_factory=dict, sa_type=JSON, description="汇总报告")
+    timeline: List[dict] = Field(default_factory=list, sa_type=JSON, description="逐秒吞吐、错误率和延迟分位数")
+    finished_at: Optional[datetime] = Field(default=None, description="结束时间")
+    user_id: Optional[str] = Field(default=None, index=True, description="所属用户ID（Keycloak sub）")
+
+
 class MockLog(BaseModel, table=True):
     """Mock 日志数据模型，记录每次Mock请求/响应的完整信息"""
+    __table_args__ = (
+        # 日志列表按时间倒序，可选按配置或是否匹配过滤
+        Index("ix_mocklog_created", "created_at", "id"),
+        Index("ix_mocklog_config_created", "config_id", "created_at", "id"),
+        Index("ix_mocklog_matched_created", "matched", "created_at", "id"),
+    )
+
     config_id: Optional[int] = Field(default=None, foreign_key="mockconfig.id", description="关联的Mock配置ID")
     config_name: str = Field(default="", description="Mock配置名称（快照，即使配置被删除也可追溯）")
     request_method: str = Field(default="", description="HTTP请求方法")
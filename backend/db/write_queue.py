@@ -0,0 +1,136 @@
+"""后台写入队列：Mock 日志、定时任务、执行结果等后台写操作由单个写线程串行提交。
+
+SQLite 同一时刻只允许一个写事务，多个后台写入方同时抢锁会触发 `database is locked`
+并拖慢请求处理。写入函数接收一个新的 Session，在写线程中执行并自行提交。
+未启用队列时（如 PostgreSQL）写入交给一个小线程池并发执行，同样不占用事件循环。
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from sqlmodel import Session
+
+from db.db import engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 默认仅在 SQLite 下启用；其它数据库支持并发写入，可显式设置为 true/false
+DB_SINGLE_WRITER = os.getenv("DB_SINGLE_WRITER", "auto").lower()
+WRITE_QUEUE_ENABLED = (
+    engine.dialect.name == "sqlite" if DB_SINGLE_WRITER == "auto" else DB_SINGLE_WRITER == "true"
+)
+# 队列上限，写入积压超过该值时新的写入直接失败（Future 抛出 WriteQueueFull），不阻塞提交方
+WRITE_QUEUE_MAX_SIZE = int(os.getenv("DB_WRITE_QUEUE_MAX_SIZE", "10000"))
+# 未启用队列时执行写入的线程数
+DB_WRITE_THREADS = int(os.getenv("DB_WRITE_THREADS", "4"))
+
+_STOP = object()
+_queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_MAX_SIZE)
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_rejected = 0
+
+
+class WriteQueueFull(RuntimeError):
+    """写入队列已满，本次写入被拒绝"""
+
+
+def _run_job(fn: Callable[[Session], T]) -> T:
+    with Session(engine) as session:
+        return fn(session)
+
+
+def _run_job_logged(fn: Callable[[Session], T]) -> T:
+    try:
+        return _run_job(fn)
+    except BaseException as exc:
+        logger.warning("后台写入失败: %s", exc)
+        raise
+
+
+def _worker_loop() -> None:
+    while True:
+        item = _queue.get()
+        try:
+            if item is _STOP:
+                return
+            fn, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(_run_job(fn))
+            except BaseException as exc:
+                logger.warning("后台写入失败: %s", exc)
+                future.set_exception(exc)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_worker_loop, name="db-writer", daemon=True)
+            _worker.start()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _worker_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_WRITE_THREADS, thread_name_prefix="db-write")
+    return _executor
+
+
+def submit_write(fn: Callable[[Session], T]) -> Future:
+    """提交写入函数并立即返回 Future，不在调用方线程执行写入；队列已满时 Future 以 WriteQueueFull 失败。"""
+    if not WRITE_QUEUE_ENABLED:
+        return _get_executor().submit(_run_job_logged, fn)
+    global _rejected
+    future: Future = Future()
+    _ensure_worker()
+    try:
+        _queue.put_nowait((fn, future))
+    except queue.Full:
+        _rejected += 1
+        logger.warning("后台写入队列已满（%d），丢弃本次写入", WRITE_QUEUE_MAX_SIZE)
+        future.set_exception(WriteQueueFull(f"后台写入队列已满（{WRITE_QUEUE_MAX_SIZE}）"))
+    return future
+
+
+async def run_write(fn: Callable[[Session], T]) -> T:
+    """在写线程中执行写入函数并等待结果，不阻塞事件循环；队列已满时抛出 WriteQueueFull。"""
+    return await asyncio.wrap_future(submit_write(fn))
+
+
+def write_queue_stats() -> dict:
+    return {
+        "enabled": WRITE_QUEUE_ENABLED,
+        "pending": _queue.qsize(),
+        "rejected": _rejected,
+        "worker_alive": bool(_worker and _worker.is_alive()),
+    }
+
+
+def shutdown_write_queue(timeout: float = 10.0) -> None:
+    """应用退出时调用：等待已提交的写入完成后停止写线程。"""
+    global _worker, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _worker is None or not _worker.is_alive():
+        return
+    _queue.put(_STOP)
+    _worker.join(timeout)
+    _worker = None
@@ -1,14 +1,18 @@
+import hmac
 import os
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Body  # type: ignore
+from fastapi import FastAPI, Body, Request  # type: ignore
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
 from app.main import api_router
 from app.services.keycloak_sync import sync_keycloak_roles
-from db.db import create_db_and_tables
+from db.db import create_db_and_tables, record_db_sessions, track_db_sessions
+from utils.metrics import observe_request, register_runtime_collector, render_metrics
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -25,8 +29,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 列表接口通过响应头返回总数和下一页游标
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
+
+# /metrics 端点默认关闭（METRICS_ENABLED=true 开启）；设置 METRICS_TOKEN 后需携带 Authorization: Bearer <token>
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """按路由记录请求耗时，并统计每个请求使用的数据库会话数（见 db.db.db_session_stats）"""
+    started = time.perf_counter()
+    # 未处理的异常按 500 记录后继续抛出
+    status_code = 500
+    try:
+        with track_db_sessions() as sessions:
+            response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        if route is not None:
+            route_name = f"{request.method} {route.path}"
+            record_db_sessions(route_name, len(sessions))
+            observe_request(request.method, route.path, status_code, time.perf_counter() - started)
+
+
+if METRICS_ENABLED:
+    register_runtime_collector()
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        if METRICS_TOKEN and not hmac.compare_digest(
+            request.headers.get("authorization", "").encode(), f"Bearer {METRICS_TOKEN}".encode()
+        ):
+            return PlainTextResponse("Unauthorized", status_code=401)
+        body, content_type = render_metrics()
+        return PlainTextResponse(body, media_type=content_type)
+
+
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
@@ -34,5 +78,33 @@ def on_startup():
     from app.scheduler import scheduler, load_all_jobs
     scheduler.start()
     load_all_jobs()
+    from app.services.response_capture import (
+        RESPONSE_BLOB_PRUNE_INTERVAL_MINUTES,
+        RESPONSE_BLOB_STORE,
+        prune_blob_store,
+    )
+    if RESPONSE_BLOB_STORE and RESPONSE_BLOB_PRUNE_INTERVAL_MINUTES > 0:
+        from apscheduler.triggers.interval import IntervalTrigger
+        scheduler.add_job(
+            prune_blob_store,
+            IntervalTrigger(minutes=RESPONSE_BLOB_PRUNE_INTERVAL_MINUTES),
+            id="prune_response_blobs",
+            replace_existing=True,
+        )
+    from app.services.load_test import mark_interrupted_runs
+    mark_interrupted_runs()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 停止进行中的压测并保存汇总
+    from app.services.load_test import shutdown_load_tests
+    await shutdown_load_tests()
+    # 关闭共享的出站 HTTP 连接池
+    from utils.http_clients import close_http_clients
+    await close_http_clients()
+    # 等待后台写线程提交完已排队的写入
+    from db.write_queue import shutdown_write_queue
+    shutdown_write_queue()
 
 app.include_router(api_router, prefix="/api")
@@ -0,0 +1,41 @@
+"""Tests for load test targets."""
+
+import asyncio
+
+import httpx
+
+from app.services.load_test import LoadTestAggregator, _ScenarioTarget, _VirtualUser
+from db.models import ApiEndpoint, ApiProject, ApiScenario
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    action, vu = request.url.path.strip("/").split("/")
+    if action == "login":
+        return httpx.Response(200, json={"token": f"t-{vu}"})
+    if request.headers.get("authorization") == f"Bearer t-{vu}":
+        return httpx.Response(200, json={"ok": True})
+    return httpx.Response(401, json={"ok": False})
+
+
+def test_scenario_extractions_apply_to_every_iteration():
+    project = ApiProject(id=1, name="p", base_url="http://api.test")
+    endpoints = {
+        1: ApiEndpoint(id=1, project_id=1, name="login", method="GET", path="/login/{{__vu}}"),
+        2: ApiEndpoint(id=2, project_id=1, name="me", method="GET", path="/me/{{__vu}}",
+                       headers=[{"key": "Authorization", "value": "Bearer {{token}}"}]),
+    }
+    scenario = ApiScenario(id=1, project_id=1, name="s", variables=[{"key": "token", "value": "$.token"}],
+                           steps=[{"endpoint_id": 1}, {"endpoint_id": 2}])
+    target = _ScenarioTarget(scenario, project, endpoints, {"token": "$.token"})
+    aggregator = LoadTestAggregator()
+    users = [_VirtualUser(index, dict(target.base_variables)) for index in (1, 2)]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handler)) as client:
+            for _ in range(3):
+                await asyncio.gather(*(target.iterate(client, vu.next_variables(), aggregator) for vu in users))
+
+    asyncio.run(run())
+    assert aggregator.requests == 12
+    assert aggregator.errors == 0, aggregator.error_samples
+    assert target.pending_extractions == {"token": "$.token"}
@@ -4,6 +4,7 @@ import json
 import logging
 import os
 import re
+import time
 from typing import Any
 
 from langchain_core.callbacks import BaseCallbackHandler
@@ -11,6 +12,7 @@ from sqlmodel import select, desc
 
 from db.models import HistoryPrompt
 from utils.history_prompt_cleaner import clean_history_prompt_content
+from utils.metrics import observe_llm_call
 
 logger = logging.getLogger(__name__)
 
@@ -536,8 +538,22 @@ def _normalize_extracted_json(data: dict) -> dict:
     return data
 
 
+def _llm_usage(response) -> dict:
+    """从 LLMResult 中取 token 用量，统一为 input_tokens/output_tokens"""
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    return {
+        "input_tokens": token_usage.get("prompt_tokens", 0),
+        "output_tokens": token_usage.get("completion_tokens", 0),
+    }
+
+
 class _TokenUsageCallback(BaseCallbackHandler):
-    """在 LLM 调用前记录消息总字符数，用于诊断上下文超限问题。"""
+    """在 LLM 调用前记录消息总字符数，用于诊断上下文超限问题；调用结束后上报耗时和 token 用量。"""
     def __init__(self):
         super().__init__()
         self.raise_error = True
@@ -545,8 +561,13 @@ class _TokenUsageCallback(BaseCallbackHandler):
         self.mcp_validation_error: str | None = None
         self._mcp_validation_error_count = 0
         self._last_mcp_validation_error: str | None = None
+        # run_id -> (开始时间, 模型名)
+        self._llm_runs: dict = {}
 
     def on_chat_model_start(self, serialized, messages, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or ""
+        self._llm_runs[kwargs.get("run_id")] = (time.perf_counter(), model)
         total = 0
         for msg_list in messages:
             for m in msg_list:
@@ -559,6 +580,16 @@ class _TokenUsageCallback(BaseCallbackHandler):
             total += len(tools_str)
         logger.warning(f"[诊断] 预估总计: {total} chars / {total//4} tokens / {total//2} CJK tokens")
 
+    def on_llm_end(self, response, **kwargs):
+        run = self._llm_runs.pop(kwargs.get("run_id"), None)
+        if run:
+            observe_llm_call(run[1], time.perf_counter() - run[0], usage=_llm_usage(response))
+
+    def on_llm_error(self, error, **kwargs):
+        run = self._llm_runs.pop(kwargs.get("run_id"), None)
+        if run:
+            observe_llm_call(run[1], time.perf_counter() - run[0], status="error")
+
     def on_tool_start(self, serialized, input_str, **kwargs):
         name = serialized.get("name") if isinstance(serialized, dict) else None
         logger.info(f"[诊断] MCP 工具调用开始: tool={name} input={str(input_str)[:500]}")
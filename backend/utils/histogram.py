@@ -0,0 +1,104 @@
+"""对数分桶的延迟直方图（HDR 风格）。
+
+桶边界按固定比例增长，任意量级的耗时都只有约 2.5% 的相对误差，
+计数以稀疏字典保存，可直接序列化为 JSON 并与其它直方图合并。
+"""
+
+import math
+from typing import Any
+
+# 相邻桶边界的增长比例，决定分位数的相对精度
+BUCKET_GROWTH = 1.05
+# 小于该值（毫秒）的耗时统一落入 0 号桶
+MIN_TRACKABLE_MS = 0.01
+
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def _bucket_index(value: float) -> int:
+    if value <= MIN_TRACKABLE_MS:
+        return 0
+    return max(0, math.ceil(math.log(value / MIN_TRACKABLE_MS) / _LOG_GROWTH))
+
+
+def _bucket_value(index: int) -> float:
+    # 取桶上下边界的几何中点作为代表值
+    if index == 0:
+        return MIN_TRACKABLE_MS
+    return MIN_TRACKABLE_MS * BUCKET_GROWTH ** (index - 0.5)
+
+
+class LatencyHistogram:
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def record(self, value: float, count: int = 1) -> None:
+        value = max(float(value), 0.0)
+        index = _bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float | None:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(_bucket_value(index), self.min or 0.0), self.max or 0.0)
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        def _round(value: float | None) -> float | None:
+            return None if value is None else round(value, 2)
+
+        return {
+            "count": self.count,
+            "avg": _round(self.total / self.count) if self.count else None,
+            "min": _round(self.min),
+            "max": _round(self.max),
+            "p50": _round(self.percentile(50)),
+            "p95": _round(self.percentile(95)),
+            "p99": _round(self.percentile(99)),
+        }
+
+    def to_buckets(self) -> dict[str, int]:
+        return {str(index): count for index, count in self.buckets.items()}
+
+    @classmethod
+    def from_state(
+        cls,
+        buckets: dict | None,
+        *,
+        count: int = 0,
+        total: float = 0.0,
+        min_value: float | None = None,
+        max_value: float | None = None,
+    ) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.buckets = {int(index): int(value) for index, value in (buckets or {}).items()}
+        histogram.count = count
+        histogram.total = total
+        histogram.min = min_value
+        histogram.max = max_value
+        return histogram
@@ -0,0 +1,215 @@
+"""出站 HTTP 连接池：按用途划分的共享 httpx 连接，随应用启动/关闭。
+
+每个连接池（targets/mcp/llm/identity）持有一个长期存活的 AsyncClient，负责连接复用、
+TLS 会话、代理和连接数限制。业务代码通过 http_session() 拿到轻量的会话客户端：
+会话有自己的 Cookie、超时和跳转设置，但底层连接来自共享池，关闭会话不会断开连接。
+
+各连接池参数可通过环境变量覆盖，如 HTTP_POOL_TARGETS_MAX_CONNECTIONS、
+HTTP_POOL_LLM_TIMEOUT、HTTP_POOL_MCP_PROXY。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+POOL_TARGETS = "targets"  # 接口测试、代理转发、定时任务、OpenAPI 导入等用户配置的目标地址
+POOL_MCP = "mcp"  # MCP 服务（蓝湖等）
+POOL_LLM = "llm"  # 大模型 API
+POOL_IDENTITY = "identity"  # Keycloak 等身份服务
+
+# (最大连接数, 最大空闲连接数, 空闲连接保持秒数, 默认超时秒数；0 表示不限)
+_POOL_DEFAULTS = {
+    POOL_TARGETS: (200, 50, 30.0, 30.0),
+    POOL_MCP: (50, 10, 60.0, 300.0),
+    POOL_LLM: (50, 10, 60.0, 0),
+    POOL_IDENTITY: (20, 5, 60.0, 10.0),
+}
+
+
+def _pool_env(pool: str, key: str, default):
+    value = os.getenv(f"HTTP_POOL_{pool.upper()}_{key}")
+    return default if value in (None, "") else type(default)(value)
+
+
+class PoolConfig:
+    def __init__(self, name: str):
+        max_connections, max_keepalive, keepalive_expiry, timeout = _POOL_DEFAULTS[name]
+        self.name = name
+        self.max_connections = _pool_env(name, "MAX_CONNECTIONS", max_connections)
+        self.max_keepalive = _pool_env(name, "MAX_KEEPALIVE", max_keepalive)
+        self.keepalive_expiry = _pool_env(name, "KEEPALIVE_EXPIRY", keepalive_expiry)
+        self.timeout = _pool_env(name, "TIMEOUT", float(timeout))
+        self.proxy = os.getenv(f"HTTP_POOL_{name.upper()}_PROXY") or None
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections or None,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def default_timeout(self) -> httpx.Timeout:
+        # 连接/获取连接始终有上限，读写按连接池配置（0 表示不限，用于大模型流式输出）
+        timeout = self.timeout or None
+        return httpx.Timeout(timeout, connect=min(self.timeout or 30.0, 30.0), pool=30.0)
+
+
+class _PoolStats:
+    __slots__ = ("requests", "errors", "active", "max_active", "total_ms")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.active = 0
+        self.max_active = 0
+        self.total_ms = 0.0
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """响应体读取完毕或关闭时才把请求记为结束"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close()
+
+
+class _PooledTransport(httpx.AsyncBaseTransport):
+    """把会话客户端的请求转交给共享客户端发送；关闭会话时不关闭共享连接"""
+
+    def __init__(self, registry: "HttpClientRegistry", pool: str, proxy: Optional[str]) -> None:
+        self._registry = registry
+        self._pool = pool
+        self._proxy = proxy
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        shared = self._registry._shared_client(self._pool, self._proxy)
+        stats = self._registry._stats[self._pool]
+        stats.requests += 1
+        stats.active += 1
+        stats.max_active = max(stats.max_active, stats.active)
+        started = time.perf_counter()
+
+        def _finish() -> None:
+            stats.active -= 1
+            stats.total_ms += (time.perf_counter() - started) * 1000
+
+        try:
+            response = await shared.send(request, stream=True, follow_redirects=False)
+        except BaseException:
+            stats.errors += 1
+            _finish()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, _finish),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpClientRegistry:
+    def __init__(self) -> None:
+        self._configs = {name: PoolConfig(name) for name in _POOL_DEFAULTS}
+        self._clients: dict[tuple[str, Optional[str]], httpx.AsyncClient] = {}
+        self._stats = {name: _PoolStats() for name in _POOL_DEFAULTS}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _shared_client(self, pool: str, proxy: Optional[str]) -> httpx.AsyncClient:
+        key = (pool, proxy)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            config = self._configs[pool]
+            client = httpx.AsyncClient(
+                limits=config.limits(),
+                proxy=proxy or config.proxy,
+                # 共享连接不保存 Cookie，Cookie 由各会话客户端自行维护
+                cookies=httpx.Cookies(CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))),
+            )
+            self._clients[key] = client
+        return client
+
+    def _bound_to_current_loop(self) -> bool:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._loop is None or self._loop.is_closed():
+            self._loop = loop
+        return self._loop is loop
+
+    def client(self, pool: str, *, proxy: Optional[str] = None, **kwargs) -> httpx.AsyncClient:
+        """返回使用共享连接的会话客户端，可传入 timeout/follow_redirects/headers 等 AsyncClient 参数。
+
+        不在应用事件循环中（如独立线程里的 asyncio.run）时返回一个独立客户端，调用方需自行关闭。
+        """
+        config = self._configs[pool]
+        kwargs.setdefault("timeout", config.default_timeout())
+        if not self._bound_to_current_loop():
+            return httpx.AsyncClient(limits=config.limits(), proxy=proxy or config.proxy, **kwargs)
+        return httpx.AsyncClient(transport=_PooledTransport(self, pool, proxy), **kwargs)
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("关闭 HTTP 连接池失败: %s", e)
+        self._loop = None
+
+    def stats(self) -> dict[str, dict]:
+        result = {}
+        for name, stats in self._stats.items():
+            config = self._configs[name]
+            result[name] = {
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "active": stats.active,
+                "max_active": stats.max_active,
+                "max_connections": config.max_connections,
+                "utilization": round(stats.active / config.max_connections, 4) if config.max_connections else None,
+                "avg_ms": round(stats.total_ms / stats.requests, 2) if stats.requests else None,
+                "clients": sum(1 for pool, _ in self._clients if pool == name),
+            }
+        return result
+
+
+http_clients = HttpClientRegistry()
+
+
+@asynccontextmanager
+async def http_session(pool: str, *, proxy: Optional[str] = None, **kwargs) -> AsyncIterator[httpx.AsyncClient]:
+    """async with http_session(POOL_TARGETS, timeout=30) as client: ...（退出时不会断开共享连接）"""
+    async with http_clients.client(pool, proxy=proxy, **kwargs) as client:
+        yield client
+
+
+async def close_http_clients() -> None:
+    await http_clients.aclose()
+
+
+def http_pool_stats() -> dict[str, dict]:
+    return http_clients.stats()
@@ -0,0 +1,90 @@
+"""JSONPath 表达式编译缓存。
+
+jsonpath_ng 的 parse 走 PLY 语法分析，耗时远高于实际查找。这里对编译结果做有界 LRU 缓存，
+并为 `$.data.items[0].id` 这类纯字段/下标路径提供不经过解析器的快速路径。
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Any
+
+from jsonpath_ng import parse as _parse_jsonpath
+
+from utils.metrics import register_cache_stats
+
+JSONPATH_CACHE_SIZE = int(os.getenv("JSONPATH_CACHE_SIZE", "1024"))
+
+_SIMPLE_PATH_RE = re.compile(r"^\$(?:\.[A-Za-z_@][A-Za-z0-9_@\-]*|\[\d+\])*$")
+_SIMPLE_PART_RE = re.compile(r"\.([A-Za-z_@][A-Za-z0-9_@\-]*)|\[(\d+)\]")
+# jsonpath_ng 词法中的保留字，不能当作普通字段走快速路径
+_RESERVED_FIELDS = {"where"}
+_FALLBACK = object()
+
+
+@lru_cache(maxsize=JSONPATH_CACHE_SIZE)
+def compile_jsonpath(expr: str):
+    """返回编译后的 jsonpath_ng 表达式（按表达式文本缓存）。"""
+    return _parse_jsonpath(expr)
+
+
+@lru_cache(maxsize=JSONPATH_CACHE_SIZE)
+def _simple_path_parts(expr: str) -> tuple[str | int, ...] | None:
+    if not _SIMPLE_PATH_RE.match(expr):
+        return None
+    parts: list[str | int] = []
+    for field, index in _SIMPLE_PART_RE.findall(expr):
+        if field:
+            if field in _RESERVED_FIELDS:
+                return None
+            parts.append(field)
+        else:
+            parts.append(int(index))
+    return tuple(parts)
+
+
+def _walk_simple_path(data: Any, parts: tuple[str | int, ...]) -> list[Any] | object:
+    """按 jsonpath_ng 的语义逐段取值；遇到语义不确定的类型时返回 _FALLBACK。"""
+    current = data
+    for part in parts:
+        if isinstance(part, int):
+            if isinstance(current, (list, str)):
+                if len(current) <= part:
+                    return []
+                current = current[part]
+            elif not current:
+                return []
+            else:
+                return _FALLBACK
+        else:
+            if not isinstance(current, dict):
+                return []
+            if part not in current:
+                return []
+            current = current[part]
+    return [current]
+
+
+def find_jsonpath_values(expr: str, data: Any) -> list[Any]:
+    """返回 JSONPath 在 data 上匹配到的全部值，简单路径不经过 jsonpath_ng。"""
+    expr = expr.strip()
+    parts = _simple_path_parts(expr)
+    if parts is not None:
+        values = _walk_simple_path(data, parts)
+        if values is not _FALLBACK:
+            return values
+    return [match.value for match in compile_jsonpath(expr).find(data)]
+
+
+def jsonpath_cache_info() -> dict:
+    """返回编译缓存的命中统计，便于观测。"""
+    compiled = compile_jsonpath.cache_info()
+    simple = _simple_path_parts.cache_info()
+    return {
+        "compiled": compiled._asdict(),
+        "simple": simple._asdict(),
+    }
+
+
+register_cache_stats("jsonpath_compile", compile_jsonpath)
+register_cache_stats("jsonpath_simple_path", _simple_path_parts)
@@ -12,6 +12,9 @@ from typing import Any, Optional
 
 import httpx
 
+from utils.http_clients import POOL_MCP, http_session
+from utils.metrics import observe_mcp_tool
+
 logger = logging.getLogger(__name__)
 
 _MCP_HEADERS = {
@@ -174,7 +177,7 @@ class MCPClient:
             return None
 
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
+            async with http_session(POOL_MCP, timeout=10) as client:
                 for sse_path in sse_paths:
                     sse_url = urlunparse((
                         parsed.scheme, parsed.netloc, sse_path, "", "", ""
@@ -293,7 +296,7 @@ class MCPClient:
         """直接在目标 URL 上 POST JSON-RPC（无会话管理）。"""
         t0 = time.monotonic()
         try:
-            async with httpx.AsyncClient(timeout=8) as client:
+            async with http_session(POOL_MCP, timeout=8) as client:
                 t1 = time.monotonic()
                 result = await self._jsonrpc_request(client, target, "initialize", {
                     "protocolVersion": "2024-11-05",
@@ -335,7 +338,7 @@ class MCPClient:
         t0 = time.monotonic()
         try:
             logger.info(f"尝试连接 MCP 服务器: {target}")
-            async with httpx.AsyncClient(timeout=10) as client:
+            async with http_session(POOL_MCP, timeout=10) as client:
                 # Step 1: 首次 POST 创建会话，获取 session ID
                 t1 = time.monotonic()
                 resp = await client.post(target, headers=_MCP_HEADERS, json={})
@@ -405,10 +408,13 @@ class MCPClient:
         if not self.available:
             return json.dumps({"error": "MCP 未连接"}, ensure_ascii=False)
 
+        started = time.perf_counter()
         if self._is_stdio:
-            return await self._call_tool_stdio(name, arguments)
-
-        return await self._call_tool_http(name, arguments)
+            reply = await self._call_tool_stdio(name, arguments)
+        else:
+            reply = await self._call_tool_http(name, arguments)
+        observe_mcp_tool(name, time.perf_counter() - started, ok=not reply.startswith('{"error"'))
+        return reply
 
     async def _call_tool_http(self, name: str, arguments: dict) -> str:
         """通过 HTTP 调用 MCP 工具。"""
@@ -423,7 +429,7 @@ class MCPClient:
             headers = dict(_MCP_HEADERS)
             if self._session_id:
                 headers["mcp-session-id"] = self._session_id
-            async with httpx.AsyncClient(timeout=300) as client:
+            async with http_session(POOL_MCP, timeout=300) as client:
                 resp = await client.post(url, headers=headers, json=payload)
                 result = _parse_sse_response(resp.text)
 
@@ -0,0 +1,143 @@
+"""Prometheus 指标：请求延迟、Mock、接口测试步骤、定时任务、MCP、LLM 及数据库/缓存状态。
+
+业务代码只调用这里的 observe_* 函数；数据库会话数、连接池、缓存命中率等现成统计
+在抓取 /metrics 时由 RuntimeCollector 读取，不在热路径上额外计数。
+"""
+
+import logging
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# 毫秒级接口到分钟级 LLM 调用都能落在合适的桶里
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP 请求处理耗时", ["method", "route", "status"], buckets=_REQUEST_BUCKETS,
+)
+MOCK_REQUESTS = Counter("mock_requests_total", "Mock 请求数", ["result"])
+MOCK_MATCH_SECONDS = Histogram("mock_match_duration_seconds", "Mock 配置匹配耗时", buckets=_FAST_BUCKETS)
+API_TEST_STEP_SECONDS = Histogram(
+    "api_test_step_duration_seconds", "接口测试步骤耗时（请求发出到断言完成）", ["status"], buckets=_REQUEST_BUCKETS,
+)
+API_TEST_ASSERTIONS = Counter("api_test_assertions_total", "接口测试断言结果", ["result"])
+SCHEDULER_JOB_LAG_SECONDS = Histogram(
+    "scheduler_job_lag_seconds", "定时任务实际开始时间与计划时间之差", buckets=_REQUEST_BUCKETS,
+)
+SCHEDULER_JOB_SECONDS = Histogram("scheduler_job_duration_seconds", "定时任务执行耗时", buckets=_SLOW_BUCKETS)
+MCP_TOOL_SECONDS = Histogram(
+    "mcp_tool_call_duration_seconds", "MCP 工具调用耗时", ["tool", "status"], buckets=_SLOW_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram("llm_call_duration_seconds", "LLM 调用耗时", ["model", "status"], buckets=_SLOW_BUCKETS)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM token 用量", ["model", "type"])
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def observe_mock(matched: bool, match_seconds: float) -> None:
+    MOCK_REQUESTS.labels("hit" if matched else "miss").inc()
+    MOCK_MATCH_SECONDS.observe(match_seconds)
+
+
+def observe_api_step(status: str, seconds: float | None, assertions: list[dict] | None = None) -> None:
+    if seconds is not None:
+        API_TEST_STEP_SECONDS.labels(status).observe(seconds)
+    for assertion in assertions or []:
+        API_TEST_ASSERTIONS.labels("passed" if assertion.get("passed") else "failed").inc()
+
+
+def observe_mcp_tool(tool: str, seconds: float, ok: bool = True) -> None:
+    MCP_TOOL_SECONDS.labels(tool, "ok" if ok else "error").observe(seconds)
+
+
+def observe_llm_call(model: str, seconds: float, status: str = "ok", usage: dict | None = None) -> None:
+    model = model or "unknown"
+    LLM_CALL_SECONDS.labels(model, status).observe(seconds)
+    for token_type in ("input_tokens", "output_tokens"):
+        count = (usage or {}).get(token_type)
+        if count:
+            LLM_TOKENS.labels(model, token_type.split("_")[0]).inc(count)
+
+
+# 缓存名 -> 返回 (命中数, 未命中数, 当前条数) 的函数，由各模块注册
+_cache_stats_providers: dict = {}
+
+
+def register_cache_stats(name: str, provider) -> None:
+    """注册缓存统计；provider 可以是 functools.lru_cache 包装的函数或返回三元组的函数"""
+    _cache_stats_providers[name] = provider
+
+
+def _read_cache_stats(provider) -> tuple[int, int, int]:
+    if hasattr(provider, "cache_info"):
+        info = provider.cache_info()
+        return info.hits, info.misses, info.currsize
+    return provider()
+
+
+class RuntimeCollector:
+    """抓取时读取数据库会话、写队列、HTTP 连接池和各缓存的现有统计"""
+
+    def collect(self):
+        from db.db import db_session_stats
+        from db.write_queue import write_queue_stats
+        from utils.http_clients import http_pool_stats
+
+        scope_requests = CounterMetricFamily("db_session_scopes", "统计过数据库会话的请求/任务次数", labels=["scope"])
+        scope_sessions = CounterMetricFamily("db_sessions", "请求/任务使用的数据库会话总数", labels=["scope"])
+        scope_max = GaugeMetricFamily("db_sessions_per_scope_max", "单次请求/任务使用的最多会话数", labels=["scope"])
+        for scope, stats in db_session_stats().items():
+            scope_requests.add_metric([scope], stats["requests"])
+            scope_sessions.add_metric([scope], stats["sessions"])
+            scope_max.add_metric([scope], stats["max"])
+        yield from (scope_requests, scope_sessions, scope_max)
+
+        queue = write_queue_stats()
+        yield GaugeMetricFamily("db_write_queue_pending", "后台写队列积压数", value=queue["pending"])
+        yield CounterMetricFamily("db_write_queue_rejected", "队列已满被拒绝的后台写入数", value=queue["rejected"])
+
+        pool_requests = CounterMetricFamily("http_pool_requests", "出站 HTTP 请求数", labels=["pool"])
+        pool_errors = CounterMetricFamily("http_pool_errors", "出站 HTTP 请求失败数", labels=["pool"])
+        pool_active = GaugeMetricFamily("http_pool_active_requests", "进行中的出站请求数", labels=["pool"])
+        pool_utilization = GaugeMetricFamily("http_pool_utilization", "进行中请求数 / 最大连接数", labels=["pool"])
+        for pool, stats in http_pool_stats().items():
+            pool_requests.add_metric([pool], stats["requests"])
+            pool_errors.add_metric([pool], stats["errors"])
+            pool_active.add_metric([pool], stats["active"])
+            if stats["utilization"] is not None:
+                pool_utilization.add_metric([pool], stats["utilization"])
+        yield from (pool_requests, pool_errors, pool_active, pool_utilization)
+
+        hits = CounterMetricFamily("cache_hits", "缓存命中数", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "缓存未命中数", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "缓存当前条数", labels=["cache"])
+        for name, provider in list(_cache_stats_providers.items()):
+            try:
+                cache_hits, cache_misses, cache_size = _read_cache_stats(provider)
+            except Exception as e:
+                logger.debug("读取缓存统计 %s 失败: %s", name, e)
+                continue
+            hits.add_metric([name], cache_hits)
+            misses.add_metric([name], cache_misses)
+            size.add_metric([name], cache_size)
+        yield from (hits, misses, size)
+
+
+_collector_registered = False
+
+
+def register_runtime_collector() -> None:
+    global _collector_registered
+    if not _collector_registered:
+        REGISTRY.register(RuntimeCollector())
+        _collector_registered = True
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -19,6 +19,7 @@ from db.models import TestCase as DBTestCase, ApiScenario, ApiEndpoint
 
 # 从拆分模块导入
 from utils.prompts import PromptConfig
+from utils.http_clients import POOL_LLM, http_clients
 from utils.models import (
     AllowedValue, AssertionRule, ApiCallKeyValue, ApiCallStep,
     TestCase, ResponseFormat, TestCaseDesignMethod,
@@ -473,14 +474,8 @@ async def create_testcase_agent(
         api_proxy_url = api_proxy_url.strip() if api_proxy_url else None
         api_model = api_model.strip() if api_model else "deepseek-v4-flash"
 
-        # 构建 ChatOpenAI 的额外参数
-        extra_kwargs = {}
-        if api_proxy_url:
-            import httpx
-            extra_kwargs["http_async_client"] = httpx.AsyncClient(
-                proxy=api_proxy_url,
-                timeout=httpx.Timeout(None, connect=30.0, read=None, write=None, pool=None),
-            )
+        # 构建 ChatOpenAI 的额外参数：复用大模型连接池（有代理时按代理地址单独建池）
+        extra_kwargs = {"http_async_client": http_clients.client(POOL_LLM, proxy=api_proxy_url or None)}
 
         model = ChatOpenAI(
             model=api_model,
@@ -680,13 +675,8 @@ async def generate_testcases(
             if parsed_content:
                 # 外部文档内容已预取到 prompt，直接调用模型结构化输出，跳过 agent ReAct 循环。
                 logger.info("文档内容已预取，直接调用模型（跳过 agent）")
-                direct_extra_kwargs = {}
-                if api_proxy_url:
-                    import httpx
-                    direct_extra_kwargs["http_async_client"] = httpx.AsyncClient(
-                        proxy=api_proxy_url,
-                        timeout=httpx.Timeout(None, connect=30.0, read=None, write=None, pool=None),
-                    )
+                # 复用大模型连接池（有代理时按代理地址单独建池）
+                direct_extra_kwargs = {"http_async_client": http_clients.client(POOL_LLM, proxy=api_proxy_url or None)}
                 model = ChatOpenAI(
                     model=api_model,
                     temperature=0,
@@ -740,13 +730,8 @@ async def generate_testcases(
                 else:
                     # 无 MCP 工具时直接调用模型结构化输出，跳过 agent
                     logger.info("无 MCP 工具，直接调用模型结构化输出（跳过 agent）")
-                    direct_extra_kwargs = {}
-                    if api_proxy_url:
-                        import httpx
-                        direct_extra_kwargs["http_async_client"] = httpx.AsyncClient(
-                            proxy=api_proxy_url,
-                            timeout=httpx.Timeout(None, connect=30.0, read=None, write=None, pool=None),
-                        )
+                    # 复用大模型连接池（有代理时按代理地址单独建池）
+                    direct_extra_kwargs = {"http_async_client": http_clients.client(POOL_LLM, proxy=api_proxy_url or None)}
                     model = ChatOpenAI(
                         model=api_model,
                         temperature=0,
@@ -0,0 +1,88 @@
+"""游标（keyset）分页。
+
+按 (排序键..., id) 记住上一页最后一行，下一页用 WHERE 条件直接从该位置继续，
+配合对应的复合索引，任意深度的翻页开销都与首页相同。NULL 统一视为最小值。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import DateTime, and_, false, or_
+from sqlalchemy.orm import InstrumentedAttribute
+
+# (列, 是否倒序)
+KeysetOrder = Sequence[tuple[InstrumentedAttribute, bool]]
+
+
+def keyset_order_by(order: KeysetOrder) -> list:
+    clauses = []
+    for column, descending in order:
+        clause = column.desc() if descending else column.asc()
+        if column.nullable:
+            clause = clause.nulls_last() if descending else clause.nulls_first()
+        clauses.append(clause)
+    return clauses
+
+
+def _after(column, descending: bool, value: Any):
+    if value is None:
+        return false() if descending else column.is_not(None)
+    if descending:
+        return or_(column < value, column.is_(None)) if column.nullable else column < value
+    return column > value
+
+
+def _equal(column, value: Any):
+    return column.is_(None) if value is None else column == value
+
+
+def _leading_bound(column, descending: bool, value: Any):
+    # 首个排序键的范围条件与 OR 条件等价但可直接用于索引定位
+    if value is None:
+        return None if not descending else column.is_(None)
+    if descending:
+        return or_(column <= value, column.is_(None)) if column.nullable else column <= value
+    return column >= value
+
+
+def keyset_filter(order: KeysetOrder, values: Sequence[Any]):
+    """返回“位于游标之后”的过滤条件。"""
+    branches = []
+    for index, (column, descending) in enumerate(order):
+        prefix = [_equal(order[i][0], values[i]) for i in range(index)]
+        branches.append(and_(*prefix, _after(column, descending, values[index])))
+    condition = or_(*branches)
+    bound = _leading_bound(order[0][0], order[0][1], values[0])
+    return condition if bound is None else and_(bound, condition)
+
+
+def row_cursor(row: Any, order: KeysetOrder) -> str:
+    """根据一页中最后一行生成下一页游标（row 可以是模型对象或字典）。"""
+    values = []
+    for column, _ in order:
+        value = row[column.key] if isinstance(row, dict) else getattr(row, column.key)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order: KeysetOrder) -> list[Any]:
+    """解析游标，格式不合法时抛出 ValueError。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("无效的分页游标") from exc
+    if not isinstance(values, list) or len(values) != len(order):
+        raise ValueError("无效的分页游标")
+    decoded = []
+    for (column, _), value in zip(order, values):
+        if value is not None and isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError) as exc:
+                raise ValueError("无效的分页游标") from exc
+        decoded.append(value)
+    return decoded
@@ -431,6 +431,10 @@ export const apiTestApi = {
     api.post(`/api-test/endpoints/${endpointId}/generate-body`, payload),
   generateEndpointScenarioTests: (endpointId: number): Promise<ApiResponse<ApiScenario>> =>
     api.post(`/api-test/endpoints/${endpointId}/generate-scenario-tests`),
+  generateProjectScenarioTests: (projectId: number, payload: { endpoint_ids?: number[]; generate_all?: boolean }): Promise<ApiResponse<ApiScenario[]>> =>
+    api.post(`/api-test/projects/${projectId}/generate-scenario-tests`, payload),
+  getProjectLatencyStats: (projectId: number, params?: { endpoint_id?: number; days?: number }): Promise<ApiResponse<any[]>> =>
+    api.get(`/api-test/projects/${projectId}/latency-stats`, { params }),
   getScenarios: (projectId: number): Promise<ApiResponse<ApiScenario[]>> =>
     api.get(`/api-test/projects/${projectId}/scenarios`),
   createScenario: (projectId: number, scenario: Partial<ApiScenario>): Promise<ApiResponse<ApiScenario>> =>
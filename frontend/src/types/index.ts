@@ -54,6 +54,10 @@ export interface TestCaseExecutionLog {
   passed: boolean;
   status: string;
   result: Record<string, any>;
+  duration_ms?: number;
+  total_steps?: number;
+  passed_steps?: number;
+  failed_steps?: number;
   user_id?: string;
   created_at: string;
   updated_at: string;
@@ -309,6 +313,10 @@ export interface ApiScenarioResult {
   scenario_name: string;
   passed: boolean;
   result: Record<string, any>;
+  duration_ms?: number;
+  total_steps?: number;
+  passed_steps?: number;
+  failed_steps?: number;
   user_id?: string;
   created_at: string;
   updated_at: string;
@@ -0,0 +1,208 @@
+"""
+Benchmark for the flattened Sketch/PS layer tree (SketchLayers).
+
+Generates large synthetic design JSON (seeded, reproducible) and times the
+tree build plus every consumer: design tokens, HTML conversion, full
+annotations and slice extraction.
+
+    python benchmarks/bench_sketch_layers.py [--layers 400] [--repeat 15]
+
+The generators are also used by tests/test_sketch_layers_regression.py.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lanhu_mcp_server as lanhu  # noqa: E402
+
+
+def _color(r: random.Random) -> dict:
+    return {
+        'red': r.randint(0, 255), 'green': r.randint(0, 255), 'blue': r.randint(0, 255),
+        'value': f'rgba({r.randint(0, 255)},1,1,{r.choice([0, 1, 0.5])})',
+    }
+
+
+def _ps_layer(r: random.Random, depth: int, counter: list) -> dict:
+    """PS 图层：含隐藏层、空名称、零尺寸容器和 children 键"""
+    counter[0] += 1
+    kind = r.choice(['textLayer', 'shapeLayer', 'layer', 'layerSection', 'layerSection'])
+    zero = r.random() < 0.15
+    layer = {
+        'id': counter[0], 'name': r.choice(['', f'n{counter[0]}', 'a/b']), 'type': kind,
+        'left': r.randint(0, 700), 'top': r.randint(0, 1300),
+        'width': 0 if zero else r.randint(1, 400), 'height': 0 if zero else r.randint(1, 400),
+    }
+    if r.random() < 0.1:
+        layer['visible'] = False
+    if r.random() < 0.3:
+        layer['blendOptions'] = {'opacity': {'value': r.randint(10, 100)}}
+    if kind == 'textLayer':
+        layer['textInfo'] = {
+            'text': 'hello\rworld', 'color': _color(r), 'size': r.randint(20, 40),
+            'fontPostScriptName': 'PingFangSC-Medium', 'fontStyleName': 'Medium 500',
+            'bold': r.random() < 0.2, 'justification': r.choice(['left', 'center']),
+        }
+    if kind == 'shapeLayer':
+        layer['fill'] = {'color': _color(r)}
+        layer['layerEffects'] = {
+            'dropShadow': {'enabled': True, 'color': _color(r), 'distance': 4, 'blur': 8,
+                           'opacity': {'value': 50}},
+            'frameFX': {'enabled': True, 'size': 2, 'color': _color(r)},
+        }
+        layer['path'] = {'pathComponents': [{'origin': {'radii': [r.randint(0, 8) for _ in range(4)]}}]}
+    if r.random() < 0.2:
+        layer['images'] = {'png_xxxhd': f'http://img/{counter[0]}.png'}
+    if depth < 6 and (kind == 'layerSection' or zero):
+        layer['layers'] = [_ps_layer(r, depth + 1, counter) for _ in range(r.randint(0, 6))]
+        if r.random() < 0.1:
+            layer['children'] = [_ps_layer(r, depth + 1, counter) for _ in range(2)]
+    return layer
+
+
+def _sketch_layer(r: random.Random, depth: int, counter: list) -> dict:
+    """Sketch 图层：含隐藏层、填充/描边/阴影、切图和 children 键"""
+    counter[0] += 1
+    layer = {
+        'id': f'l{counter[0]}', 'name': r.choice(['', f'n{counter[0]}']),
+        'type': r.choice(['shape', 'text', 'group', 'bitmapLayer', 'color']),
+        'ddsOriginFrame': {'x': r.randint(0, 700), 'y': r.randint(0, 700),
+                           'width': r.randint(0, 300), 'height': r.randint(0, 300)},
+        'frame': {'x': 1, 'y': 2, 'width': r.randint(0, 50), 'height': r.randint(0, 50)},
+    }
+    if r.random() < 0.1:
+        layer['isVisible'] = False
+    if r.random() < 0.3:
+        layer['fills'] = [{
+            'fillType': r.choice([0, 1]), 'color': {'value': '#fff'},
+            'gradient': {'colorStops': [{'color': {'value': '#000'}, 'position': 0.5}],
+                         'from': {'x': 0, 'y': 0}, 'to': {'x': 1, 'y': 1}},
+        }]
+    if r.random() < 0.2:
+        layer['borders'] = [{'isEnabled': True, 'color': {'value': '#111'}, 'thickness': 1}]
+    if r.random() < 0.2:
+        layer['radius'] = [r.randint(0, 4) for _ in range(4)]
+    if r.random() < 0.2:
+        layer['opacity'] = r.randint(10, 100)
+    if r.random() < 0.2:
+        layer['shadows'] = [{'isEnabled': True, 'color': {'value': '#222'}, 'offsetX': 1, 'offsetY': 2}]
+    if r.random() < 0.15:
+        layer['image'] = {'imageUrl': f'http://s/{counter[0]}.png', 'size': {'width': 10, 'height': 10}}
+    if r.random() < 0.1:
+        layer['ddsImage'] = {'imageUrl': f'http://d/{counter[0]}.png'}
+    if depth < 7 and r.random() < 0.5:
+        layer['layers'] = [_sketch_layer(r, depth + 1, counter) for _ in range(r.randint(0, 6))]
+        if r.random() < 0.15:
+            layer['children'] = [_sketch_layer(r, depth + 1, counter) for _ in range(2)]
+    return layer
+
+
+def ps_sketch(seed: int, top_layers: int) -> dict:
+    """生成 PS 设计 JSON（board），约每 7 个图层标记一个切图资源"""
+    r, counter = random.Random(seed), [0]
+    layers = [_ps_layer(r, 0, counter) for _ in range(top_layers)]
+    return {
+        'device': 'iOS @2x', 'psdName': 'x', 'type': 'ps',
+        'board': {'width': 750, 'height': 1334, 'layers': layers,
+                  'fill': {'color': {'red': 255, 'green': 255, 'blue': 255}}},
+        'assets': [{'id': i, 'isSlice': True, 'name': f'a{i}'} for i in range(1, counter[0] + 1, 7)],
+    }
+
+
+def sketch_sketch(seed: int, top_layers: int, info: bool = False) -> dict:
+    """生成 Sketch 设计 JSON（artboard，info=True 时为 info 分组格式）"""
+    r, counter = random.Random(seed), [0]
+    layers = [_sketch_layer(r, 0, counter) for _ in range(top_layers)]
+    if info:
+        return {'info': [{'name': 'sec', 'layers': layers, 'style': {'name': 'st', 'fills': []}}]}
+    return {'artboard': {'layers': layers}, 'meta': {}}
+
+
+def count_layers(layers: list) -> int:
+    count, stack = 0, list(layers)
+    while stack:
+        layer = stack.pop()
+        count += 1
+        stack.extend(layer.get('layers') or [])
+        stack.extend(layer.get('children') or [])
+    return count
+
+
+class _Response:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class _FakeClient:
+    """只返回给定设计 JSON 的 HTTP 客户端，供切图提取使用"""
+
+    def __init__(self, sketch_data: dict):
+        self.sketch_data = sketch_data
+
+    async def get(self, url, params=None):
+        if params:
+            return _Response({'code': '00000', 'result': {
+                'name': 'd', 'width': 750, 'height': 1334,
+                'versions': [{'json_url': 'json', 'version_info': 'v1'}],
+            }})
+        return _Response(self.sketch_data)
+
+
+def extract_slices(sketch_data: dict) -> dict:
+    extractor = lanhu.LanhuExtractor()
+    extractor._client = _FakeClient(sketch_data)
+    return asyncio.run(extractor.get_design_slices_info('image', 'team', 'project'))
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--layers', type=int, default=400, help='top-level layers per design')
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    ps = ps_sketch(args.seed, args.layers)
+    sk = sketch_sketch(args.seed, args.layers)
+    print(f"PS board: {count_layers(ps['board']['layers'])} layers, "
+          f"Sketch artboard: {count_layers(sk['artboard']['layers'])} layers")
+
+    def ps_pipeline():
+        layers = lanhu.SketchLayers(ps)
+        lanhu._extract_design_tokens(ps, layers)
+        lanhu.convert_sketch_to_html(ps, 2.0, 'u', layers=layers)
+        lanhu._extract_full_annotations_from_sketch(ps, 2.0, layers=layers)
+
+    cases = {
+        'build board': lambda: lanhu.SketchLayers(ps).board(),
+        'build artboard': lambda: lanhu.SketchLayers(sk).artboard(),
+        'tokens': lambda: lanhu._extract_design_tokens(sk),
+        'html': lambda: lanhu.convert_sketch_to_html(ps, 2.0, 'u'),
+        'annotations': lambda: lanhu._extract_full_annotations_from_sketch(ps, 2.0),
+        'slices (PS)': lambda: extract_slices(ps),
+        'slices (Sketch)': lambda: extract_slices(sk),
+        'PS pipeline (shared tree)': ps_pipeline,
+    }
+    for name, fn in cases.items():
+        print(f"{name:28s} {_best_of(fn, args.repeat) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,9 +9,20 @@ import re
 import base64
 import json
 import hashlib
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, contextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from typing import Annotated, Optional, Union, List, Any
+from typing import Annotated, Optional, Union, List, Any, Awaitable, Callable
 
 # 加载 .env 文件中的环境变量（必须在其他导入之前）
 # 注意：在 Docker 容器中，环境变量通常已由 docker-compose 通过 env_file 设置
@@ -32,10 +43,7 @@ except ImportError:
 
 # 东八区时区（北京时间）
 CHINA_TZ = timezone(timedelta(hours=8))
-from urllib.parse import urlparse
-
-# 元数据缓存配置（基于版本号的永久缓存）
-_metadata_cache = {}  # {cache_key: {'data': {...}, 'version_id': str}}
+from urllib.parse import urlparse, quote, unquote
 
 import httpx
 from fastmcp import Context
@@ -44,8 +52,31 @@ from fastmcp import FastMCP
 from fastmcp.utilities.types import Image
 from playwright.async_api import async_playwright
 
+
+
+@asynccontextmanager
+async def _server_lifespan(server):
+    """服务生命周期：启动时预热浏览器池和设计稿转换进程池，关闭时释放浏览器池、共享 HTTP 客户端、设计稿转换进程池和留言数据库连接"""
+    if BROWSER_POOL_PREWARM:
+        try:
+            await browser_pool.start()
+        except Exception as e:
+            print(f"⚠️ 浏览器池预热失败，将在首次渲染时重试: {e}")
+    try:
+        start_design_executor()
+    except Exception as e:
+        print(f"⚠️ 设计稿转换进程池启动失败，将在首次转换时重试: {e}")
+    try:
+        yield {}
+    finally:
+        await browser_pool.close()
+        await lanhu_clients.close()
+        shutdown_design_executor()
+        message_db.close()
+
+
 # 创建FastMCP服务器
-mcp = FastMCP("Lanhu Axure Extractor")
+mcp = FastMCP("Lanhu Axure Extractor", lifespan=_server_lifespan)
 
 # 全局配置
 DEFAULT_COOKIE = "your_lanhu_cookie_here"  # 请替换为你的蓝湖Cookie，从浏览器开发者工具中获取
@@ -66,14 +97,62 @@ FEISHU_WEBHOOK_URL = os.getenv("FEISHU_WEBHOOK_URL", DEFAULT_FEISHU_WEBHOOK)
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Axure 资源的内容寻址存储目录（按 sign_md5 保存，各文档目录通过硬链接引用）
+AXURE_BLOB_DIR = Path(os.getenv("AXURE_BLOB_DIR", str(DATA_DIR / "axure_blobs")))
+# 资源下载：全局并发上限、单个主机的并发上限、失败重试次数、是否按 sign_md5 校验内容
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "16"))
+DOWNLOAD_PER_HOST_CONCURRENCY = int(os.getenv("DOWNLOAD_PER_HOST_CONCURRENCY", "8"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_VERIFY_CHECKSUM = os.getenv("DOWNLOAD_VERIFY_CHECKSUM", "true").lower() == "true"
+
+# 元数据缓存（文档信息、项目 mapping、页面列表、设计图列表）：磁盘目录、内存上限（MB）、磁盘条目上限
+METADATA_CACHE_DIR = Path(os.getenv("METADATA_CACHE_DIR", str(DATA_DIR / "metadata_cache")))
+METADATA_CACHE_MEMORY_MB = int(os.getenv("METADATA_CACHE_MEMORY_MB", "64"))
+METADATA_CACHE_MAX_FILES = int(os.getenv("METADATA_CACHE_MAX_FILES", "2000"))
+# 文档信息、设计图列表缓存超过该秒数后，先返回缓存再在后台刷新
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "300"))
+
+# 团队留言板数据库（SQLite）；首次启动时自动导入 $DATA_DIR/messages 下的旧版 JSON 文件
+MESSAGE_DB_PATH = Path(os.getenv("MESSAGE_DB_PATH", str(DATA_DIR / "messages" / "messages.db")))
+
 # HTTP 请求超时时间（秒）
 HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
 
+# 设计稿分析：同时处理的设计图数量、HTML/标注转换进程数（0 表示在服务进程内转换）
+DESIGN_ANALYZE_CONCURRENCY = int(os.getenv("DESIGN_ANALYZE_CONCURRENCY", "6"))
+DESIGN_CONVERT_WORKERS = int(os.getenv("DESIGN_CONVERT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# 设计稿转换结果（HTML、Design Tokens、标注）缓存：磁盘目录、内存上限（MB）、磁盘条目上限
+DESIGN_ARTIFACT_DIR = Path(os.getenv("DESIGN_ARTIFACT_DIR", str(DATA_DIR / "design_artifacts")))
+DESIGN_ARTIFACT_MEMORY_MB = int(os.getenv("DESIGN_ARTIFACT_MEMORY_MB", "32"))
+DESIGN_ARTIFACT_MAX_FILES = int(os.getenv("DESIGN_ARTIFACT_MAX_FILES", "5000"))
+
+# 共享 HTTP 连接池：最大连接数、最大空闲连接数、空闲连接保持秒数
+LANHU_HTTP_MAX_CONNECTIONS = int(os.getenv("LANHU_HTTP_MAX_CONNECTIONS", "64"))
+LANHU_HTTP_MAX_KEEPALIVE = int(os.getenv("LANHU_HTTP_MAX_KEEPALIVE", "32"))
+LANHU_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LANHU_HTTP_KEEPALIVE_EXPIRY", "60"))
+# 启用 HTTP/2（需要安装 h2，即 httpx[http2]；未安装时自动使用 HTTP/1.1）
+try:
+    import h2  # noqa: F401
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+LANHU_HTTP2 = os.getenv("LANHU_HTTP2", "true").lower() == "true" and _H2_AVAILABLE
+
 # 浏览器视口尺寸（影响页面初始渲染，不影响全页截图）
 # 注意：截图使用 full_page=True，会自动截取完整页面，不受此限制
 VIEWPORT_WIDTH = int(os.getenv("VIEWPORT_WIDTH", "1920"))
 VIEWPORT_HEIGHT = int(os.getenv("VIEWPORT_HEIGHT", "1080"))
 
+# 浏览器池配置：常驻上下文数、每个上下文渲染多少页后回收、启动时是否预热
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "3"))
+BROWSER_CONTEXT_MAX_PAGES = int(os.getenv("BROWSER_CONTEXT_MAX_PAGES", "50"))
+BROWSER_POOL_PREWARM = os.getenv("BROWSER_POOL_PREWARM", "true").lower() == "true"
+# text_only 模式用浏览器提取文本时，等待页面就绪的最长时间（毫秒）
+TEXT_READY_TIMEOUT_MS = int(os.getenv("TEXT_READY_TIMEOUT_MS", "5000"))
+# 本地 Axure 资源的虚拟域名，由浏览器池的请求路由直接返回本地文件
+LOCAL_RESOURCE_ORIGIN = "http://axure.local"
+
 # 调试模式
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
@@ -552,7 +631,133 @@ def convert_lanhu_to_html(json_data: dict) -> str:
     return html
 
 
-def _extract_design_tokens(sketch_data: dict) -> str:
+class SketchLayerTree:
+    """Sketch/PS 图层树的扁平表示：用显式栈做一次前序遍历，得到按下标访问的数组
+
+    nodes[i] 为图层 dict，parent[i] 为父节点下标（顶层为 -1），
+    end[i] 为子树结束位置（i 的子孙是 i+1 .. end[i]-1，跳过整棵子树即 i = end[i]）。
+    hidden(图层) 为真时该图层连同子图层不进入树。
+    """
+
+    __slots__ = ('nodes', 'parent', 'end', 'roots', '_paths')
+
+    def __init__(self, groups: list, child_keys: tuple = ('layers',),
+                 hidden: Optional[Callable[[dict], bool]] = None):
+        """groups: 顶层图层列表的列表（按顺序拼接），非 dict 的图层会被忽略"""
+        self.nodes = nodes = []
+        self.parent = parent_of = []
+        self.end = end = []
+        self.roots = roots = []
+        self._paths = {}
+        # 后压栈的先遍历，因此按 child_keys 逆序压栈
+        push_keys = tuple(reversed(child_keys))
+
+        # 栈元素为一组兄弟节点的迭代器：(迭代器, 父下标, 耗尽时是否回填 end[父下标])
+        # 只有含子图层的节点才会压栈，叶子节点不产生额外的栈操作
+        frames = [(iter(group), -1, False) for group in reversed(groups) if isinstance(group, list)]
+        while frames:
+            siblings, parent, closes = frames[-1]
+            for node in siblings:
+                if not isinstance(node, dict) or (hidden is not None and hidden(node)):
+                    continue
+                index = len(nodes)
+                nodes.append(node)
+                parent_of.append(parent)
+                end.append(index + 1)
+                if parent < 0:
+                    roots.append(index)
+                pushed = False
+                for key in push_keys:
+                    children = node.get(key)
+                    if children and isinstance(children, list):
+                        # 最先压栈的一组最后耗尽，由它回填 end
+                        frames.append((iter(children), index, not pushed))
+                        pushed = True
+                if pushed:
+                    break
+            else:
+                frames.pop()
+                if closes:
+                    end[parent] = len(nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def children(self, index: int) -> list:
+        """直接子节点下标（保持原顺序）"""
+        result = []
+        child = index + 1
+        stop = self.end[index]
+        end = self.end
+        while child < stop:
+            result.append(child)
+            child = end[child]
+        return result
+
+    def paths(self, missing: str = '') -> list:
+        """每个节点的名称路径（'父/子'，父路径为空时即自身名称），缺少 name 时用 missing；按需计算一次"""
+        paths = self._paths.get(missing)
+        if paths is None:
+            paths = []
+            append = paths.append
+            for node, parent in zip(self.nodes, self.parent):
+                name = node.get('name', missing)
+                parent_path = paths[parent] if parent >= 0 else ''
+                append(f"{parent_path}/{name}" if parent_path else name)
+            self._paths[missing] = paths
+        return paths
+
+
+def _ps_hidden(layer: dict) -> bool:
+    return layer.get('visible') is False
+
+
+def _sketch_hidden(layer: dict) -> bool:
+    return not layer.get('isVisible', True)
+
+
+class SketchLayers:
+    """同一份 Sketch/PS JSON 的可见图层树（只沿 layers 展开，隐藏图层连同子图层剔除），
+    每种结构只构建一次，供降级 HTML、标注、Design Tokens 共用"""
+
+    def __init__(self, sketch_data: dict):
+        self.sketch_data = sketch_data
+        self._trees = {}
+
+    def _tree(self, name: str, groups_factory: Callable[[], list],
+              hidden: Callable[[dict], bool]) -> SketchLayerTree:
+        tree = self._trees.get(name)
+        if tree is None:
+            tree = self._trees[name] = SketchLayerTree(groups_factory(), hidden=hidden)
+        return tree
+
+    def board(self) -> SketchLayerTree:
+        """PS 结构：board.layers（visible 为 False 的图层不可见）"""
+        return self._tree('board', lambda: [(self.sketch_data.get('board') or {}).get('layers')], _ps_hidden)
+
+    def artboard(self) -> SketchLayerTree:
+        """Sketch/Figma 结构：artboard.layers（isVisible 为假的图层不可见）"""
+        return self._tree('artboard', lambda: [(self.sketch_data.get('artboard') or {}).get('layers')],
+                          _sketch_hidden)
+
+    def info_expanded(self) -> SketchLayerTree:
+        """旧版 Sketch 结构：info[] 中每一项及其直接包含的 dict / dict 列表都作为顶层"""
+        def groups():
+            result = []
+            for item in self.sketch_data.get('info') or []:
+                if not isinstance(item, dict):
+                    continue
+                result.append(item)
+                for value in item.values():
+                    if isinstance(value, dict):
+                        result.append(value)
+                    elif isinstance(value, list):
+                        result.extend(v for v in value if isinstance(v, dict))
+            return [result]
+        return self._tree('info_expanded', groups, _sketch_hidden)
+
+
+def _extract_design_tokens(sketch_data: dict, layers: Optional[SketchLayers] = None) -> str:
     """
     从 Sketch JSON 中提取高风险元素的设计参数，输出紧凑文本供 AI 校验。
     只提取含渐变、非均匀圆角、边框、阴影的**真实可见**元素，过滤掉 Sketch 内部节点。
@@ -669,74 +874,57 @@ def _extract_design_tokens(sketch_data: dict) -> str:
         return False
 
     tokens = []
+    layers = layers or SketchLayers(sketch_data)
 
-    def _build_path(parent_path: str, name: str) -> str:
-        return f"{parent_path}/{name}" if parent_path else name
-
-    def _walk(obj: dict, parent_path: str = ""):
-        if not obj or not isinstance(obj, dict):
-            return
-        if not obj.get('isVisible', True):
-            return
-
-        name = obj.get('name', '')
-        current_path = _build_path(parent_path, name)
-
-        if _is_high_risk(obj):
-            obj_type = obj.get('type') or obj.get('ddsType') or 'unknown'
-            x, y, w, h = _get_dimensions(obj)
-
-            lines = [f'[{obj_type}] "{name}" @({int(x)},{int(y)}) {int(w)}x{int(h)}']
-            if parent_path:
-                lines[0] += f'  path: {current_path}'
-
-            radius = obj.get('radius')
-            if radius:
-                if isinstance(radius, list):
-                    if len(set(radius)) == 1:
-                        lines.append(f'  radius: {radius[0]}')
+    if sketch_data.get('artboard') and sketch_data['artboard'].get('layers'):
+        tree = layers.artboard()
+    elif sketch_data.get('info'):
+        tree = layers.info_expanded()
+    else:
+        tree = None
+
+    if tree is not None:
+        paths, parents = tree.paths(''), tree.parent
+        for i, obj in enumerate(tree.nodes):
+            if _is_high_risk(obj):
+                name = obj.get('name', '')
+                obj_type = obj.get('type') or obj.get('ddsType') or 'unknown'
+                x, y, w, h = _get_dimensions(obj)
+
+                lines = [f'[{obj_type}] "{name}" @({int(x)},{int(y)}) {int(w)}x{int(h)}']
+                if parents[i] >= 0 and paths[parents[i]]:
+                    lines[0] += f'  path: {paths[i]}'
+
+                radius = obj.get('radius')
+                if radius:
+                    if isinstance(radius, list):
+                        if len(set(radius)) == 1:
+                            lines.append(f'  radius: {radius[0]}')
+                        else:
+                            lines.append(f'  radius: {radius}')
                     else:
                         lines.append(f'  radius: {radius}')
-                else:
-                    lines.append(f'  radius: {radius}')
-
-            for f in obj.get('fills', []):
-                s = _simplify_fill(f)
-                if s:
-                    lines.append(f'  fill: {s}')
 
-            for b in obj.get('borders', []):
-                s = _simplify_border(b)
-                if s:
-                    lines.append(f'  border: {s}')
+                for f in obj.get('fills', []):
+                    fill_str = _simplify_fill(f)
+                    if fill_str:
+                        lines.append(f'  fill: {fill_str}')
 
-            opacity = obj.get('opacity')
-            if opacity is not None and opacity < 100:
-                lines.append(f'  opacity: {opacity}%')
+                for b in obj.get('borders', []):
+                    border_str = _simplify_border(b)
+                    if border_str:
+                        lines.append(f'  border: {border_str}')
 
-            for sh in obj.get('shadows', []):
-                s = _simplify_shadow(sh)
-                if s:
-                    lines.append(f'  shadow: {s}')
+                opacity = obj.get('opacity')
+                if opacity is not None and opacity < 100:
+                    lines.append(f'  opacity: {opacity}%')
 
-            tokens.append('\n'.join(lines))
+                for sh in obj.get('shadows', []):
+                    shadow_str = _simplify_shadow(sh)
+                    if shadow_str:
+                        lines.append(f'  shadow: {shadow_str}')
 
-        for child in obj.get('layers', []):
-            _walk(child, current_path)
-
-    if sketch_data.get('artboard') and sketch_data['artboard'].get('layers'):
-        for layer in sketch_data['artboard']['layers']:
-            _walk(layer)
-    elif sketch_data.get('info'):
-        for item in sketch_data['info']:
-            _walk(item)
-            for value in item.values():
-                if isinstance(value, dict):
-                    _walk(value)
-                elif isinstance(value, list):
-                    for v in value:
-                        if isinstance(v, dict):
-                            _walk(v)
+                tokens.append('\n'.join(lines))
 
     if not tokens:
         return ""
@@ -788,7 +976,7 @@ def _oc_to_css(oc_code: str) -> str:
 
 
 def convert_sketch_to_html(sketch_data: dict, design_scale: float = 2.0,
-                           design_img_url: str = "") -> str:
+                           design_img_url: str = "", layers: Optional[SketchLayers] = None) -> str:
     """
     将 Sketch/PSD JSON 转换为 HTML+CSS。
     策略：设计原图 background-image 裁剪 + 文字/切图叠加 + data-css 标注。
@@ -884,7 +1072,7 @@ def convert_sketch_to_html(sketch_data: dict, design_scale: float = 2.0,
         m = re.search(r'(\d+)', style_name)
         return int(m.group(1)) if m else None
 
-    layers = []
+    layers_out = []
     board_w = 375
     board_h = 667
 
@@ -892,39 +1080,34 @@ def convert_sketch_to_html(sketch_data: dict, design_scale: float = 2.0,
         board = sketch_data['board']
         board_w = px(board.get('width', 750))
         board_h = px(board.get('height', 1334))
-        raw_layers = board.get('layers', [])
-
-        def _flatten(layer):
-            if not layer or not isinstance(layer, dict):
-                return
-            if layer.get('visible') is False:
-                return
+        tree = (layers or SketchLayers(sketch_data)).board()
+
+        # 自后向前展开（后面的图层在上层）：尺寸为 0 的容器和不带切图的分组只展开子图层
+        nodes = tree.nodes
+        stack = list(tree.roots)
+        while stack:
+            i = stack.pop()
+            layer = nodes[i]
             w = layer.get('width', 0) or 0
             h = layer.get('height', 0) or 0
             if w == 0 and h == 0:
-                for child in reversed(layer.get('layers', [])):
-                    _flatten(child)
-                return
-            ltype = layer.get('type', '')
-            if ltype == 'layerSection':
+                stack.extend(tree.children(i))
+                continue
+            if layer.get('type', '') == 'layerSection':
                 images = layer.get('images') or {}
                 if images.get('png_xxxhd') or images.get('svg'):
-                    layers.append(layer)
+                    layers_out.append(layer)
                 else:
-                    for child in reversed(layer.get('layers', [])):
-                        _flatten(child)
-                return
-            layers.append(layer)
-
-        for l in reversed(raw_layers):
-            _flatten(l)
+                    stack.extend(tree.children(i))
+                continue
+            layers_out.append(layer)
 
     css_rules = []
     html_parts = []
     image_url_mapping = {}
     layer_annotations = []
 
-    for idx, L in enumerate(layers):
+    for idx, L in enumerate(layers_out):
         cls = f"el{idx + 1}"
         ltype = L.get('type', '')
         name = L.get('name', '')
@@ -1116,7 +1299,8 @@ LANHU_EXTRACT_JS = r'''
 '''
 
 
-def _extract_full_annotations_from_sketch(sketch_data: dict, design_scale: float = 2.0) -> str:
+def _extract_full_annotations_from_sketch(sketch_data: dict, design_scale: float = 2.0,
+                                          layers: Optional[SketchLayers] = None) -> str:
     """
     当 store_schema_revise 失败时，从原始 Sketch JSON 中提取完整的标注信息，
     包括画布信息、图层层级结构（文本/形状/图片）、颜色/字体/尺寸/位置/特效等，
@@ -1224,26 +1408,29 @@ def _extract_full_annotations_from_sketch(sketch_data: dict, design_scale: float
     image_layers = []
     group_structure = []
 
-    def _walk_layer(layer: dict, depth: int = 0, parent_path: str = ""):
-        if not layer or not isinstance(layer, dict):
-            return
-        vis = layer.get('visible', True)
-        if vis is False:
-            return
+    tree = (layers or SketchLayers(sketch_data)).board()
+    # 分组层级：尺寸为 0 的容器不计入层级
+    nodes, parents, paths = tree.nodes, tree.parent, tree.paths('?')
+    group_depth = [0] * len(nodes)
 
+    for index, layer in enumerate(nodes):
         name = layer.get('name', '?')
         ltype = layer.get('type', '?')
         w = layer.get('width', 0) or 0
         h = layer.get('height', 0) or 0
         left = layer.get('left', 0) or 0
         top = layer.get('top', 0) or 0
-        current_path = f"{parent_path}/{name}" if parent_path else name
+        parent = parents[index]
+        if parent >= 0:
+            parent_layer = nodes[parent]
+            parent_is_container = not (parent_layer.get('width', 0) or 0) and not (parent_layer.get('height', 0) or 0)
+            group_depth[index] = group_depth[parent] + (0 if parent_is_container else 1)
+        depth = group_depth[index]
 
         if w == 0 and h == 0:
-            for child in layer.get('layers', []):
-                _walk_layer(child, depth, current_path)
-            return
+            continue
 
+        current_path = paths[index]
         opacity = _extract_opacity(layer)
 
         if ltype == 'textLayer':
@@ -1348,13 +1535,6 @@ def _extract_full_annotations_from_sketch(sketch_data: dict, design_scale: float
                 'x': _px(left), 'y': _px(top), 'w': _px(w), 'h': _px(h),
             })
 
-        for child in layer.get('layers', []):
-            _walk_layer(child, depth + 1, current_path)
-
-    board_layers = board.get('layers', [])
-    for layer in board_layers:
-        _walk_layer(layer)
-
     if group_structure:
         lines.append("")
         lines.append("📂 图层组结构 (布局参考):")
@@ -1606,48 +1786,144 @@ def _get_metadata_cache_key(project_id: str, doc_id: str = None) -> str:
     return project_id
 
 
-def _get_cached_metadata(cache_key: str, version_id: str = None) -> Optional[dict]:
-    """
-    获取缓存的元数据
-    
-    Args:
-        cache_key: 缓存键
-        version_id: 文档版本ID，如果提供则检查版本是否匹配
-    
-    Returns:
-        缓存的元数据，如果未命中或版本不匹配则返回None
+class MetadataCache:
+    """蓝湖元数据两级缓存：内存 LRU（按序列化后的大小限额）+ DATA_DIR 下的 JSON 文件（重启后仍有效）
+
+    条目记录 version_id，调用方传入当前版本号时版本不一致即视为未命中。
+    文档信息、设计图列表这类没有版本号可比对的数据超过 TTL 后仍立即返回旧值，同时在后台刷新。
     """
-    if cache_key in _metadata_cache:
-        cache_entry = _metadata_cache[cache_key]
-        
-        # 如果提供了version_id，检查版本是否匹配
-        if version_id:
-            if cache_entry.get('version_id') == version_id:
-                return cache_entry['data']
-            else:
-                # 版本不匹配，删除旧缓存
-                del _metadata_cache[cache_key]
-                return None
-        
-        # 没有version_id，直接返回缓存（用于项目级别缓存）
-        return cache_entry['data']
-    
-    return None
 
+    def __init__(self, root: Path, max_bytes: int, max_files: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        # (namespace, key) -> (version_id, stored_at, data_json)
+        self._memory: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self._refreshing: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.disk_reads = 0
+        self.revalidations = 0
+
+    def _file(self, namespace: str, key: str) -> Path:
+        return self.root / namespace / f"{hashlib.md5(key.encode('utf-8')).hexdigest()}.json"
+
+    def _remember(self, cache_key: tuple, item: tuple):
+        old = self._memory.pop(cache_key, None)
+        if old is not None:
+            self._bytes -= len(old[2])
+        # 单条超过内存上限的只保存在磁盘
+        if len(item[2]) > self.max_bytes:
+            return
+        self._memory[cache_key] = item
+        self._bytes += len(item[2])
+        while self._bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._bytes -= len(evicted[2])
+
+    def _load(self, namespace: str, key: str) -> Optional[tuple]:
+        cache_key = (namespace, key)
+        item = self._memory.get(cache_key)
+        if item is not None:
+            self._memory.move_to_end(cache_key)
+            return item
+        # 文件格式：首行是条目信息，其余是数据 JSON（读取时不必解析数据本身）
+        try:
+            header_line, data_json = self._file(namespace, key).read_text(encoding='utf-8').split('\n', 1)
+            header = json.loads(header_line)
+        except (OSError, ValueError):
+            return None
+        if header.get('key') != key:
+            return None
+        self.disk_reads += 1
+        item = (header.get('version_id'), header.get('stored_at', 0), data_json)
+        self._remember(cache_key, item)
+        return item
+
+    def lookup(self, namespace: str, key: str, version_id: str = None) -> tuple:
+        """返回 (数据, 已缓存秒数)；未命中或版本不一致时返回 (None, None)。每次返回的都是独立副本"""
+        item = self._load(namespace, key)
+        if item is None or (version_id and item[0] != version_id):
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        return json.loads(item[2]), time.time() - item[1]
+
+    def get(self, namespace: str, key: str, version_id: str = None) -> Optional[Any]:
+        return self.lookup(namespace, key, version_id)[0]
+
+    def set(self, namespace: str, key: str, data: Any, version_id: str = None):
+        stored_at = time.time()
+        data_json = json.dumps(data, ensure_ascii=False)
+        self._remember((namespace, key), (version_id, stored_at, data_json))
+        header = json.dumps({'key': key, 'version_id': version_id, 'stored_at': stored_at}, ensure_ascii=False)
+        path = self._file(namespace, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_text(f"{header}\n{data_json}", encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ 元数据缓存写入失败: {e}")
+            return
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """磁盘上的条目超过上限时删除最久未更新的"""
+        files = list(self.root.glob('*/*.json'))
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime)
+        for f in files[:len(files) - self.max_files]:
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+    def revalidate(self, namespace: str, key: str, refresh: Callable[[], Awaitable[Any]]):
+        """在后台执行 refresh()（由它负责写回缓存），同一条目同时只刷新一次"""
+        cache_key = (namespace, key)
+        if cache_key in self._refreshing:
+            return
+        self.revalidations += 1
 
-def _set_cached_metadata(cache_key: str, metadata: dict, version_id: str = None):
-    """
-    设置缓存（基于版本号的永久缓存）
-    
-    Args:
-        cache_key: 缓存键
-        metadata: 元数据
-        version_id: 文档版本ID，存储后只要版本不变就永久有效
-    """
-    _metadata_cache[cache_key] = {
-        'data': metadata.copy(),
-        'version_id': version_id  # 版本号作为缓存有效性标识
-    }
+        async def _run():
+            try:
+                await refresh()
+            except Exception as e:
+                print(f"⚠️ 元数据后台刷新失败 {namespace}/{key}: {e}")
+            finally:
+                self._refreshing.pop(cache_key, None)
+
+        self._refreshing[cache_key] = asyncio.ensure_future(_run())
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._memory),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_reads': self.disk_reads,
+            'revalidations': self.revalidations,
+        }
+
+
+metadata_cache = MetadataCache(METADATA_CACHE_DIR, METADATA_CACHE_MEMORY_MB * 1024 * 1024, METADATA_CACHE_MAX_FILES)
+# 设计稿转换结果按设计图版本缓存，同一版本的转换结果不会变化（转换器修改后提升 DESIGN_CONVERTER_VERSION）
+design_artifacts = MetadataCache(DESIGN_ARTIFACT_DIR, DESIGN_ARTIFACT_MEMORY_MB * 1024 * 1024, DESIGN_ARTIFACT_MAX_FILES)
+
+
+async def _with_new_extractor(func: Callable[["LanhuExtractor"], Awaitable[Any]]) -> Any:
+    """后台刷新缓存时使用独立的 LanhuExtractor（发起请求的工具可能已关闭自己的客户端）"""
+    extractor = LanhuExtractor()
+    try:
+        return await func(extractor)
+    finally:
+        await extractor.close()
 
 
 # ============================================
@@ -1812,100 +2088,303 @@ async def send_feishu_notification(
 # 消息存储类
 # ============================================
 
+_MESSAGE_FIELDS = (
+    "id", "summary", "content", "mentions", "message_type",
+    "author_name", "author_role", "created_at",
+    "updated_at", "updated_by_name", "updated_by_role",
+    # 标准元数据（10个字段）
+    "project_id", "project_name", "folder_name",
+    "doc_id", "doc_name", "doc_type", "doc_version", "doc_updated_at", "doc_url",
+)
+
+_MESSAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    project_id TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL DEFAULT 1,
+    project_name TEXT,
+    folder_name TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    project_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    summary TEXT, content TEXT, mentions TEXT NOT NULL DEFAULT '[]', message_type TEXT,
+    author_name TEXT, author_role TEXT, created_at TEXT,
+    updated_at TEXT, updated_by_name TEXT, updated_by_role TEXT,
+    project_name TEXT, folder_name TEXT, doc_id TEXT, doc_name TEXT, doc_type TEXT,
+    doc_version TEXT, doc_updated_at TEXT, doc_url TEXT,
+    PRIMARY KEY (project_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_created ON messages (created_at);
+CREATE TABLE IF NOT EXISTS message_mentions (
+    project_id TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    mention TEXT NOT NULL,
+    PRIMARY KEY (project_id, message_id, mention)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_mentions_mention ON message_mentions (mention, project_id, message_id);
+CREATE TABLE IF NOT EXISTS collaborators (
+    project_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    first_seen TEXT,
+    last_seen TEXT,
+    UNIQUE (project_id, name, role)
+);
+CREATE TABLE IF NOT EXISTS imported_files (
+    name TEXT PRIMARY KEY,
+    imported_at TEXT
+);
+"""
+
+
+class MessageDB:
+    """留言板存储引擎（SQLite，WAL 模式）
+
+    追加/编辑/删除只写受影响的行，写操作在 BEGIN IMMEDIATE 事务中完成，
+    并发的工具调用（包括多个服务进程共用同一数据目录）不会互相覆盖。
+    @ 的对象单独建索引表，mentions_me 判断和跨项目查询都在一条 SQL 中完成。
+    首次打开时自动导入旧版 messages/{project_id}.json（原文件保留）。
+    """
+
+    def __init__(self, path: Path, legacy_dir: Optional[Path] = None):
+        self.path = Path(path)
+        self.legacy_dir = legacy_dir
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None：由 _write() 显式控制事务
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_MESSAGE_SCHEMA)
+            self._conn = conn
+            if self.legacy_dir is not None:
+                self._import_legacy_files()
+        return self._conn
+
+    @contextmanager
+    def _write(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _read(self, sql: str, params: tuple = ()) -> List[dict]:
+        with self._lock:
+            cursor = self._connect().execute(sql, params)
+            keys = [column[0] for column in cursor.description]
+            return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _import_legacy_files(self):
+        """导入旧版 JSON 文件（每个文件一个事务，已导入的记录在 imported_files 中）"""
+        if not self.legacy_dir.is_dir():
+            return
+        imported = {row[0] for row in self._conn.execute("SELECT name FROM imported_files")}
+        for json_file in sorted(self.legacy_dir.glob("*.json")):
+            if json_file.name in imported:
+                continue
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 旧版留言文件导入失败 {json_file.name}: {e}")
+                continue
+            project_id = data.get("project_id") or json_file.stem
+            messages = [m for m in data.get("messages") or [] if isinstance(m, dict) and "id" in m]
+            next_id = max([data.get("next_id") or 1] + [m["id"] + 1 for m in messages])
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT INTO projects (project_id, next_id, project_name, folder_name) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (project_id) DO UPDATE SET next_id = max(next_id, excluded.next_id)",
+                    (project_id, next_id, data.get("project_name"), data.get("folder_name")),
+                )
+                for msg in messages:
+                    self._insert_message(conn, {**msg, "project_id": msg.get("project_id") or project_id})
+                for collab in data.get("collaborators") or []:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO collaborators (project_id, name, role, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (project_id, collab.get("name"), collab.get("role"),
+                         collab.get("first_seen"), collab.get("last_seen")),
+                    )
+                conn.execute("INSERT INTO imported_files (name, imported_at) VALUES (?, ?)",
+                             (json_file.name, datetime.now(CHINA_TZ).strftime("%Y-%m-%d %H:%M:%S")))
+
+    @staticmethod
+    def _insert_message(conn: sqlite3.Connection, message: dict):
+        row = dict(message)
+        mentions = row.get("mentions") or []
+        row["mentions"] = json.dumps(mentions, ensure_ascii=False)
+        conn.execute(
+            f"INSERT OR REPLACE INTO messages ({', '.join(_MESSAGE_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(_MESSAGE_FIELDS))})",
+            tuple(row.get(field) for field in _MESSAGE_FIELDS),
+        )
+        MessageDB._set_mentions(conn, row["project_id"], row["id"], mentions)
+
+    @staticmethod
+    def _set_mentions(conn: sqlite3.Connection, project_id: str, msg_id: int, mentions: List[str]):
+        conn.execute("DELETE FROM message_mentions WHERE project_id = ? AND message_id = ?", (project_id, msg_id))
+        conn.executemany(
+            "INSERT OR IGNORE INTO message_mentions (project_id, message_id, mention) VALUES (?, ?, ?)",
+            [(project_id, msg_id, mention) for mention in mentions if isinstance(mention, str)],
+        )
+
+    @staticmethod
+    def _row_to_message(message: dict) -> dict:
+        if "mentions" in message:
+            message["mentions"] = json.loads(message["mentions"] or "[]")
+        if "mentions_me" in message:
+            message["mentions_me"] = bool(message["mentions_me"])
+        return message
+
+    def query_messages(self, project_id: Optional[str] = None, mention_keys: tuple = (),
+                       with_content: bool = False, msg_id: Optional[int] = None) -> List[dict]:
+        """按创建时间倒序查询留言；mention_keys 非空时附加 mentions_me 字段"""
+        fields = [f"m.{field}" for field in _MESSAGE_FIELDS if with_content or field != "content"]
+        params: list = []
+        if mention_keys:
+            fields.append(
+                "EXISTS (SELECT 1 FROM message_mentions mm WHERE mm.project_id = m.project_id "
+                f"AND mm.message_id = m.id AND mm.mention IN ({', '.join('?' * len(mention_keys))})) AS mentions_me"
+            )
+            params.extend(mention_keys)
+        where = []
+        if project_id is not None:
+            where.append("m.project_id = ?")
+            params.append(project_id)
+        if msg_id is not None:
+            where.append("m.id = ?")
+            params.append(msg_id)
+        sql = f"SELECT {', '.join(fields)} FROM messages m"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.created_at DESC, m.project_id, m.id"
+        return [self._row_to_message(row) for row in self._read(sql, tuple(params))]
+
+    def append_message(self, message: dict) -> dict:
+        """分配项目内自增 ID 并写入一条留言"""
+        with self._write() as conn:
+            project_id = message["project_id"]
+            conn.execute("INSERT OR IGNORE INTO projects (project_id) VALUES (?)", (project_id,))
+            msg_id = conn.execute("SELECT next_id FROM projects WHERE project_id = ?", (project_id,)).fetchone()[0]
+            conn.execute("UPDATE projects SET next_id = ? WHERE project_id = ?", (msg_id + 1, project_id))
+            message = {**message, "id": msg_id}
+            self._insert_message(conn, message)
+        return message
+
+    def update_message(self, project_id: str, msg_id: int, changes: dict) -> bool:
+        with self._write() as conn:
+            values = dict(changes)
+            if "mentions" in values:
+                self._set_mentions(conn, project_id, msg_id, values["mentions"])
+                values["mentions"] = json.dumps(values["mentions"], ensure_ascii=False)
+            cursor = conn.execute(
+                f"UPDATE messages SET {', '.join(f'{key} = ?' for key in values)} WHERE project_id = ? AND id = ?",
+                (*values.values(), project_id, msg_id),
+            )
+            return cursor.rowcount > 0
+
+    def delete_message(self, project_id: str, msg_id: int) -> bool:
+        with self._write() as conn:
+            cursor = conn.execute("DELETE FROM messages WHERE project_id = ? AND id = ?", (project_id, msg_id))
+            conn.execute("DELETE FROM message_mentions WHERE project_id = ? AND message_id = ?", (project_id, msg_id))
+            return cursor.rowcount > 0
+
+    def touch_collaborator(self, project_id: str, name: str, role: str, now: str):
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO collaborators (project_id, name, role, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (project_id, name, role) DO UPDATE SET last_seen = excluded.last_seen",
+                (project_id, name, role, now, now),
+            )
+
+    def get_collaborators(self, project_id: str) -> List[dict]:
+        return self._read(
+            "SELECT name, role, first_seen, last_seen FROM collaborators WHERE project_id = ? ORDER BY rowid",
+            (project_id,),
+        )
+
+    def get_project(self, project_id: str) -> dict:
+        rows = self._read("SELECT project_name, folder_name FROM projects WHERE project_id = ?", (project_id,))
+        return rows[0] if rows else {"project_name": None, "folder_name": None}
+
+    def set_project_info(self, project_id: str, project_name: Optional[str], folder_name: Optional[str]):
+        """仅在尚未记录时写入项目名称/文件夹名称"""
+        with self._write() as conn:
+            conn.execute("INSERT OR IGNORE INTO projects (project_id) VALUES (?)", (project_id,))
+            conn.execute(
+                "UPDATE projects SET project_name = COALESCE(NULLIF(project_name, ''), ?), "
+                "folder_name = COALESCE(NULLIF(folder_name, ''), ?) WHERE project_id = ?",
+                (project_name or None, folder_name or None, project_id),
+            )
+
+    def stats(self) -> dict:
+        rows = self._read("SELECT (SELECT COUNT(*) FROM messages) AS messages, "
+                          "(SELECT COUNT(*) FROM projects) AS projects")
+        return {"path": str(self.path), **rows[0]}
+
+
+message_db = MessageDB(MESSAGE_DB_PATH, legacy_dir=DATA_DIR / "messages")
+
+
 class MessageStore:
     """消息存储管理类 - 支持团队留言板功能"""
     
-    def __init__(self, project_id: str = None):
+    def __init__(self, project_id: str = None, db: MessageDB = None):
         """
         初始化消息存储
         
         Args:
             project_id: 项目ID，如果为None则用于全局操作模式
+            db: 存储引擎，默认使用全局 message_db
         """
         self.project_id = project_id
-        self.storage_dir = DATA_DIR / "messages"
-        self.storage_dir.mkdir(parents=True, exist_ok=True)
-        
-        if project_id:
-            self.file_path = self.storage_dir / f"{project_id}.json"
-            self._data = self._load()
-        else:
-            # 全局模式，不加载单个文件
-            self.file_path = None
-            self._data = None
-    
-    def _load(self) -> dict:
-        """加载项目数据"""
-        if self.file_path.exists():
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                pass
-        return {
-            "project_id": self.project_id,
-            "next_id": 1,
-            "messages": [],
-            "collaborators": []
-        }
-    
-    def _save(self):
-        """保存项目数据"""
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        self.db = db or message_db
     
     def _get_now(self) -> str:
         """获取当前时间字符串（东八区/北京时间）"""
         return datetime.now(CHINA_TZ).strftime("%Y-%m-%d %H:%M:%S")
     
-    def _check_mentions_me(self, mentions: List[str], user_role: str) -> bool:
-        """检查消息是否@了当前用户（支持角色归一化匹配）"""
-        if not mentions:
-            return False
-        if "所有人" in mentions:
-            return True
-        
-        # 将用户角色归一化后匹配
-        normalized_user_role = normalize_role(user_role)
-        
-        # 直接匹配原始角色
-        if user_role in mentions:
-            return True
-        
-        # 匹配归一化后的角色
-        if normalized_user_role in mentions:
-            return True
-        
-        return False
+    @staticmethod
+    def _mention_keys(user_role: str) -> tuple:
+        """@了这些名称之一即视为@了当前用户（所有人、原始角色、归一化后的角色）"""
+        if not user_role:
+            return ()
+        return tuple(dict.fromkeys(("所有人", user_role, normalize_role(user_role))))
     
     def record_collaborator(self, name: str, role: str):
         """记录/更新协作者"""
         if not name or not role:
             return
-        
-        now = self._get_now()
-        collaborators = self._data.get("collaborators", [])
-        
-        # 查找是否已存在
-        for collab in collaborators:
-            if collab["name"] == name and collab["role"] == role:
-                collab["last_seen"] = now
-                self._save()
-                return
-        
-        # 新增协作者
-        collaborators.append({
-            "name": name,
-            "role": role,
-            "first_seen": now,
-            "last_seen": now
-        })
-        self._data["collaborators"] = collaborators
-        self._save()
+        self.db.touch_collaborator(self.project_id, name, role, self._get_now())
     
     def get_collaborators(self) -> List[dict]:
         """获取协作者列表"""
-        return self._data.get("collaborators", [])
+        return self.db.get_collaborators(self.project_id)
+    
+    def get_project_info(self) -> dict:
+        """获取项目名称/文件夹名称"""
+        return self.db.get_project(self.project_id)
+    
+    def set_project_info(self, project_name: str = None, folder_name: str = None):
+        """记录项目元数据（仅首次获取到时写入）"""
+        if project_name or folder_name:
+            self.db.set_project_info(self.project_id, project_name, folder_name)
     
     def save_message(self, summary: str, content: str, author_name: str, 
                      author_role: str, mentions: List[str] = None,
@@ -1933,24 +2412,17 @@ class MessageStore:
             doc_updated_at: 文档更新时间
             doc_url: 文档URL
         """
-        msg_id = self._data["next_id"]
-        self._data["next_id"] += 1
-        
-        now = self._get_now()
-        message = {
-            "id": msg_id,
+        return self.db.append_message({
             "summary": summary,
             "content": content,
             "mentions": mentions or [],
-            "message_type": message_type,  # 新增：留言类型
+            "message_type": message_type,
             "author_name": author_name,
             "author_role": author_role,
-            "created_at": now,
+            "created_at": self._get_now(),
             "updated_at": None,
             "updated_by_name": None,
             "updated_by_role": None,
-            
-            # 标准元数据（10个字段）
             "project_id": self.project_id,
             "project_name": project_name,
             "folder_name": folder_name,
@@ -1960,62 +2432,39 @@ class MessageStore:
             "doc_version": doc_version,
             "doc_updated_at": doc_updated_at,
             "doc_url": doc_url
-        }
-        
-        self._data["messages"].append(message)
-        self._save()
-        return message
+        })
     
     def get_messages(self, user_role: str = None) -> List[dict]:
-        """获取所有消息（不含content，用于列表展示）"""
-        messages = []
-        for msg in self._data.get("messages", []):
-            msg_copy = {k: v for k, v in msg.items() if k != "content"}
-            if user_role:
-                msg_copy["mentions_me"] = self._check_mentions_me(msg.get("mentions", []), user_role)
-            messages.append(msg_copy)
-        # 按创建时间倒序排列
-        messages.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        return messages
+        """获取所有消息（不含content，用于列表展示，按创建时间倒序）"""
+        return self.db.query_messages(self.project_id, self._mention_keys(user_role))
     
     def get_message_by_id(self, msg_id: int, user_role: str = None) -> Optional[dict]:
         """根据ID获取消息（含content）"""
-        for msg in self._data.get("messages", []):
-            if msg["id"] == msg_id:
-                msg_copy = msg.copy()
-                if user_role:
-                    msg_copy["mentions_me"] = self._check_mentions_me(msg.get("mentions", []), user_role)
-                return msg_copy
-        return None
+        rows = self.db.query_messages(self.project_id, self._mention_keys(user_role),
+                                      with_content=True, msg_id=msg_id)
+        return rows[0] if rows else None
     
     def update_message(self, msg_id: int, editor_name: str, editor_role: str,
                        summary: str = None, content: str = None, 
                        mentions: List[str] = None) -> Optional[dict]:
         """更新消息"""
-        for msg in self._data.get("messages", []):
-            if msg["id"] == msg_id:
-                if summary is not None:
-                    msg["summary"] = summary
-                if content is not None:
-                    msg["content"] = content
-                if mentions is not None:
-                    msg["mentions"] = mentions
-                msg["updated_at"] = self._get_now()
-                msg["updated_by_name"] = editor_name
-                msg["updated_by_role"] = editor_role
-                self._save()
-                return msg
-        return None
+        changes = {}
+        if summary is not None:
+            changes["summary"] = summary
+        if content is not None:
+            changes["content"] = content
+        if mentions is not None:
+            changes["mentions"] = mentions
+        changes["updated_at"] = self._get_now()
+        changes["updated_by_name"] = editor_name
+        changes["updated_by_role"] = editor_role
+        if not self.db.update_message(self.project_id, msg_id, changes):
+            return None
+        return self.get_message_by_id(msg_id)
     
     def delete_message(self, msg_id: int) -> bool:
         """删除消息"""
-        messages = self._data.get("messages", [])
-        for i, msg in enumerate(messages):
-            if msg["id"] == msg_id:
-                messages.pop(i)
-                self._save()
-                return True
-        return False
+        return self.db.delete_message(self.project_id, msg_id)
     
     def get_all_messages(self, user_role: str = None) -> List[dict]:
         """
@@ -2025,26 +2474,9 @@ class MessageStore:
             user_role: 用户角色，用于判断是否@了该用户
         
         Returns:
-            包含所有项目消息的列表（已排序）
+            包含所有项目消息的列表（按创建时间倒序）
         """
-        all_messages = []
-        
-        # 遍历所有JSON文件
-        for json_file in self.storage_dir.glob("*.json"):
-            project_id = json_file.stem
-            try:
-                project_store = MessageStore(project_id)
-                messages = project_store.get_messages(user_role=user_role)
-                
-                # 消息中已包含元数据，直接添加
-                all_messages.extend(messages)
-            except Exception:
-                # 某个项目加载失败不影响其他项目
-                continue
-        
-        # 全局排序（按创建时间倒序）
-        all_messages.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        return all_messages
+        return self.db.query_messages(None, self._mention_keys(user_role))
     
     def get_all_messages_grouped(self, user_role: str = None, user_name: str = None) -> List[dict]:
         """
@@ -2236,7 +2668,7 @@ async def _fetch_metadata_from_url(url: str) -> dict:
                 metadata['doc_version'] = versions[0].get('version_info')
             
             # 检查缓存（基于版本号）
-            cached = _get_cached_metadata(cache_key, version_id)
+            cached = metadata_cache.get('doc_meta', cache_key, version_id)
             if cached:
                 return cached
             
@@ -2282,7 +2714,7 @@ async def _fetch_metadata_from_url(url: str) -> dict:
                 pass
         
         # 存入缓存（基于版本号）
-        _set_cached_metadata(cache_key, metadata, version_id)
+        metadata_cache.set('doc_meta', cache_key, metadata, version_id)
     
     except Exception:
         pass
@@ -2293,24 +2725,328 @@ async def _fetch_metadata_from_url(url: str) -> dict:
 
 
 
+class ChecksumMismatch(Exception):
+    """下载内容与预期 MD5 不一致"""
+
+
+class DownloadManager:
+    """全局下载管理：总并发和每个主机的并发都有上限，响应流式写入临时文件后原子改名
+
+    传入 md5 时边下载边计算摘要，不一致视为可重试的失败；网络错误、429、5xx 按指数退避重试，
+    其它 4xx 直接抛出。
+    """
+
+    def __init__(self, concurrency: int, per_host: int, retries: int,
+                 verify_checksum: bool = True, chunk_size: int = 64 * 1024):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.retries = max(0, retries)
+        self.verify_checksum = verify_checksum
+        self.chunk_size = chunk_size
+        self._loop = None
+        self._semaphore = None
+        self._host_semaphores: dict = {}
+        self.downloaded = 0
+        self.bytes = 0
+        self.retried = 0
+        self.failed = 0
+        self.checksum_mismatches = 0
+
+    def _bind_loop(self):
+        # 信号量只在创建它们的事件循环里有效
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._host_semaphores = {}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return semaphore
+
+    async def download(self, client: httpx.AsyncClient, url: str, dest: Path,
+                       md5: Optional[str] = None) -> Path:
+        """下载到 dest，重试后仍失败时抛出异常；dest 只会是完整内容或保持原样"""
+        self._bind_loop()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        expected = md5.lower() if md5 and self.verify_checksum else None
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 8))
+            tmp_path = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                # 先占主机名额再占全局名额，避免排队等某个主机时占着全局名额
+                async with self._host_semaphore(url), self._semaphore:
+                    async with client.stream('GET', url) as response:
+                        if response.status_code == 429 or response.status_code >= 500:
+                            last_error = f"HTTP {response.status_code}"
+                            continue
+                        response.raise_for_status()
+                        digest = hashlib.md5()
+                        size = 0
+                        with open(tmp_path, 'wb') as f:
+                            async for chunk in response.aiter_bytes(self.chunk_size):
+                                f.write(chunk)
+                                digest.update(chunk)
+                                size += len(chunk)
+                if expected and digest.hexdigest() != expected:
+                    self.checksum_mismatches += 1
+                    raise ChecksumMismatch(f"expected {expected}, got {digest.hexdigest()}")
+                os.replace(tmp_path, dest)
+                self.downloaded += 1
+                self.bytes += size
+                return dest
+            except (httpx.TransportError, ChecksumMismatch) as e:
+                last_error = str(e) or type(e).__name__
+            except httpx.HTTPStatusError:
+                self.failed += 1
+                raise
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+        self.failed += 1
+        raise RuntimeError(f"Download failed after {self.retries + 1} attempts: {url} ({last_error})")
+
+    def stats(self) -> dict:
+        return {
+            'downloaded': self.downloaded,
+            'bytes': self.bytes,
+            'retried': self.retried,
+            'failed': self.failed,
+            'checksum_mismatches': self.checksum_mismatches,
+            'hosts': len(self._host_semaphores),
+        }
+
+
+downloads = DownloadManager(DOWNLOAD_CONCURRENCY, DOWNLOAD_PER_HOST_CONCURRENCY, DOWNLOAD_RETRIES,
+                            verify_checksum=DOWNLOAD_VERIFY_CHECKSUM)
+
+
+class AxureBlobStore:
+    """按 sign_md5 寻址的 Axure 资源存储，所有文档、所有版本共享同一份文件
+
+    文档目录中的资源是指向这里的硬链接（跨文件系统时退化为符号链接或复制）。
+    实际下载交给 DownloadManager；同一资源被并发请求时只下载一次。
+    """
+
+    def __init__(self, root: Path, manager: DownloadManager):
+        self.root = root
+        self.manager = manager
+        self._loop = None
+        self._inflight: dict = {}
+        self.reused = 0
+
+    def path(self, sign_md5: str) -> Path:
+        name = sign_md5 if re.fullmatch(r'\w[\w.-]{0,119}', sign_md5) else hashlib.md5(sign_md5.encode('utf-8')).hexdigest()
+        return self.root / name[:2] / name
+
+    @staticmethod
+    def expected_md5(sign_md5: str) -> Optional[str]:
+        """sign_md5 形如 <32位md5>[.扩展名] 时返回其中的摘要，用于校验下载内容"""
+        name = sign_md5.rstrip('/').rsplit('/', 1)[-1].split('?')[0]
+        match = re.fullmatch(r'([0-9a-fA-F]{32})(\.\w+)?', name)
+        return match.group(1) if match else None
+
+    async def fetch(self, client: httpx.AsyncClient, sign_md5: str, url: str) -> Path:
+        """确保资源已在存储中，返回存储路径；重试后仍失败时抛出异常"""
+        path = self.path(sign_md5)
+        if path.exists():
+            self.reused += 1
+            return path
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._inflight = {}
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.ensure_future(
+                self.manager.download(client, url, path, md5=self.expected_md5(sign_md5))
+            )
+            self._inflight[path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(path, None))
+        return await asyncio.shield(task)
+
+    def materialize(self, sign_md5: str, dest: Path, copy: bool = False):
+        """把存储中的资源放到文档目录；copy=True 用于之后会被原地修改的文件（如 HTML）"""
+        blob = self.path(sign_md5)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists() or dest.is_symlink():
+            dest.unlink()
+        if copy:
+            shutil.copyfile(blob, dest)
+            return
+        try:
+            os.link(blob, dest)
+        except OSError:
+            try:
+                dest.symlink_to(blob.resolve())
+            except OSError:
+                shutil.copyfile(blob, dest)
+
+    def stats(self) -> dict:
+        return {'reused': self.reused, **self.manager.stats()}
+
+
+axure_blobs = AxureBlobStore(AXURE_BLOB_DIR, downloads)
+
+def _lanhu_headers() -> dict:
+    return {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+        "Referer": "https://lanhuapp.com/web/",
+        "Accept": "application/json, text/plain, */*",
+        "Cookie": COOKIE,
+        "sec-ch-ua": '"Chromium";v="142", "Google Chrome";v="142", "Not_A Brand";v="99"',
+        "sec-ch-ua-mobile": "?0",
+        "sec-ch-ua-platform": '"macOS"',
+        "request-from": "web",
+        "real-path": "/item/project/product"
+    }
+
+
+def _dds_headers() -> dict:
+    return {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+        "Accept": "application/json, text/plain, */*",
+        "Referer": "https://dds.lanhuapp.com/",
+        "Cookie": DDS_COOKIE,
+        "Authorization": "Basic dW5kZWZpbmVkOg==",
+    }
+
+
+class LanhuClientPool:
+    """进程内共享的蓝湖 HTTP 客户端：各工具调用复用同一连接池（keep-alive，可用时启用 HTTP/2）
+
+    每种请求头（lanhu / dds）一个客户端。LanhuExtractor 用到时 acquire，close 时 release。
+    更新 Cookie 后调用 rotate()：之后的调用拿到带新 Cookie 的客户端，旧客户端等最后一个使用者释放后再关闭，
+    进行中的请求不受影响。
+    """
+
+    _PROFILES = {'lanhu': _lanhu_headers, 'dds': _dds_headers}
+
+    def __init__(self):
+        self._clients: dict = {}  # profile -> 当前客户端
+        self._users: dict = {}  # 客户端 -> 使用者数量
+        self._retired: set = set()
+        self._loop = None
+        self.created = 0
+
+    def _bind_loop(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not loop:
+            # 连接绑定在事件循环上，换了循环（如多次 asyncio.run）就重新创建客户端
+            self._loop = loop
+            self._clients, self._users, self._retired = {}, {}, set()
+
+    def _create(self, profile: str) -> httpx.AsyncClient:
+        self.created += 1
+        return httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            headers=self._PROFILES[profile](),
+            follow_redirects=True,
+            http2=LANHU_HTTP2,
+            limits=httpx.Limits(
+                max_connections=LANHU_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LANHU_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=LANHU_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            # Cookie 固定由请求头提供，不在共享客户端里累积响应下发的 Cookie
+            cookies=httpx.Cookies(CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))),
+        )
+
+    def acquire(self, profile: str = 'lanhu') -> httpx.AsyncClient:
+        self._bind_loop()
+        client = self._clients.get(profile)
+        if client is None or client.is_closed:
+            client = self._clients[profile] = self._create(profile)
+        self._users[client] = self._users.get(client, 0) + 1
+        return client
+
+    async def release(self, client: httpx.AsyncClient):
+        count = self._users.get(client, 0) - 1
+        if count > 0:
+            self._users[client] = count
+            return
+        self._users.pop(client, None)
+        if client in self._retired:
+            self._retired.discard(client)
+            await client.aclose()
+
+    async def rotate(self):
+        """Cookie 变更后替换客户端；无人使用的旧客户端立即关闭"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            if self._users.get(client):
+                self._retired.add(client)
+            else:
+                await client.aclose()
+
+    async def close(self):
+        clients = set(self._clients.values()) | self._retired
+        self._clients, self._users, self._retired = {}, {}, set()
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            'http2': LANHU_HTTP2,
+            'clients': len(self._clients),
+            'retired': len(self._retired),
+            'users': sum(self._users.values()),
+            'created': self.created,
+        }
+
+
+lanhu_clients = LanhuClientPool()
+
+
+class _ProgressReporter:
+    """把逐项完成事件节流成进度回调（约每 2% 一次），回调出错不影响下载"""
+
+    def __init__(self, callback: Optional[Callable[[int, int], Awaitable[Any]]], total: int):
+        self.callback = callback
+        self.total = total
+        self.done = 0
+        self._last = -1
+        self._step = max(1, total // 50)
+
+    async def advance(self):
+        self.done += 1
+        await self(self.done)
+
+    async def __call__(self, done: int):
+        if self.callback is None:
+            return
+        if done != self.total and done - self._last < self._step:
+            return
+        self._last = done
+        try:
+            await self.callback(done, self.total)
+        except Exception:
+            pass
+
+
 class LanhuExtractor:
     """蓝湖提取器"""
 
     CACHE_META_FILE = ".lanhu_cache.json"  # 缓存元数据文件名
 
     def __init__(self):
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-            "Referer": "https://lanhuapp.com/web/",
-            "Accept": "application/json, text/plain, */*",
-            "Cookie": COOKIE,
-            "sec-ch-ua": '"Chromium";v="142", "Google Chrome";v="142", "Not_A Brand";v="99"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "request-from": "web",
-            "real-path": "/item/project/product"
-        }
-        self.client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, headers=headers, follow_redirects=True)
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享连接池中的客户端，首次使用时获取（只解析URL时不占用）"""
+        if self._client is None:
+            self._client = lanhu_clients.acquire()
+        return self._client
 
     def parse_url(self, url: str) -> dict:
         """
@@ -2371,9 +3107,19 @@ class LanhuExtractor:
             'version_id': version_id
         }
 
-    async def get_document_info(self, project_id: str, doc_id: str) -> dict:
-        """获取文档信息"""
-        api_url = f"{BASE_URL}/api/project/image"
+    async def get_document_info(self, project_id: str, doc_id: str, fresh: bool = False) -> dict:
+        """获取文档信息（先返回缓存，超过 METADATA_CACHE_TTL 时后台刷新；fresh=True 直接请求）"""
+        cache_key = _get_metadata_cache_key(project_id, doc_id)
+        if not fresh:
+            cached, age = metadata_cache.lookup('doc_info', cache_key)
+            if cached is not None:
+                if age > METADATA_CACHE_TTL:
+                    metadata_cache.revalidate('doc_info', cache_key, lambda: _with_new_extractor(
+                        lambda extractor: extractor.get_document_info(project_id, doc_id, fresh=True)
+                    ))
+                return cached
+
+        api_url = f"{BASE_URL}/api/project/image"
         params = {'pid': project_id, 'image_id': doc_id}
 
         response = await self.client.get(api_url, params=params)
@@ -2386,7 +3132,28 @@ class LanhuExtractor:
         if not success:
             raise Exception(f"API Error: {data.get('msg')} (code={code})")
 
-        return data.get('data') or data.get('result', {})
+        doc_info = data.get('data') or data.get('result', {})
+        metadata_cache.set('doc_info', cache_key, doc_info)
+        return doc_info
+
+    async def get_project_mapping(self, version_info: dict) -> dict:
+        """获取版本对应的项目级mapping JSON（同一版本内容不变，按版本ID缓存）"""
+        version_id = version_info.get('id', '')
+        json_url = version_info.get('json_url')
+        if not json_url:
+            raise Exception("Mapping JSON URL not found")
+
+        if version_id:
+            cached = metadata_cache.get('mapping', version_id)
+            if cached is not None:
+                return cached
+
+        response = await self.client.get(json_url)
+        response.raise_for_status()
+        project_mapping = response.json()
+        if version_id:
+            metadata_cache.set('mapping', version_id, project_mapping, version_id)
+        return project_mapping
 
     def _get_cache_meta_path(self, output_dir: Path) -> Path:
         """获取缓存元数据文件路径"""
@@ -2460,17 +3227,23 @@ class LanhuExtractor:
         if cached_version != current_version_id:
             return (True, 'version_changed', [])
 
-        # 检查文件完整性
-        pages = project_mapping.get('pages', {})
-        expected_files = {}
+        # 上次有下载失败的文件，需要补齐
+        if cache_meta.get('failed'):
+            return (True, 'files_missing', cache_meta['failed'])
+
+        # 检查文件完整性（优先使用下载时记录的文件清单）
+        expected_files = cache_meta.get('files')
+        if not expected_files:
+            pages = project_mapping.get('pages', {})
+            expected_files = {}
 
-        # 收集所有应该存在的文件
-        for html_filename in pages.keys():
-            expected_files[html_filename] = None
+            # 收集所有应该存在的文件
+            for html_filename in pages.keys():
+                expected_files[html_filename] = None
 
-        # 检查关键目录
-        for key_dir in ['data', 'resources', 'files', 'images']:
-            expected_files[key_dir] = None
+            # 检查关键目录
+            for key_dir in ['data', 'resources', 'files', 'images']:
+                expected_files[key_dir] = None
 
         integrity = self._check_file_integrity(output_dir, expected_files)
 
@@ -2484,6 +3257,17 @@ class LanhuExtractor:
         params = self.parse_url(url)
         doc_info = await self.get_document_info(params['project_id'], params['doc_id'])
 
+        versions = doc_info.get('versions', [])
+        if not versions:
+            raise Exception("Document version info not found")
+
+        # 页面列表按文档版本缓存
+        latest_version = versions[0]
+        cache_key = _get_metadata_cache_key(params['project_id'], params['doc_id'])
+        cached = metadata_cache.get('pages', cache_key, latest_version.get('id'))
+        if cached is not None:
+            return cached
+
         # 获取项目详细信息（包含创建者等信息）
         project_info = None
         try:
@@ -2503,18 +3287,7 @@ class LanhuExtractor:
             pass  # 如果获取失败，继续使用基本信息
 
         # 获取项目级mapping JSON
-        versions = doc_info.get('versions', [])
-        if not versions:
-            raise Exception("Document version info not found")
-
-        latest_version = versions[0]
-        json_url = latest_version.get('json_url')
-        if not json_url:
-            raise Exception("Mapping JSON URL not found")
-
-        response = await self.client.get(json_url)
-        response.raise_for_status()
-        project_mapping = response.json()
+        project_mapping = await self.get_project_mapping(latest_version)
 
         # 从sitemap获取页面列表（只返回在导航中显示的页面）
         sitemap = project_mapping.get('sitemap', {})
@@ -2640,44 +3413,49 @@ class LanhuExtractor:
             if project_info.get('member_cnt'):
                 result['member_count'] = project_info.get('member_cnt')
 
+        metadata_cache.set('pages', cache_key, result, latest_version.get('id'))
         return result
 
-    async def download_resources(self, url: str, output_dir: str, force_update: bool = False) -> dict:
+    async def download_resources(self, url: str, output_dir: str, force_update: bool = False,
+                                 progress: Optional[Callable[[int, int], Awaitable[Any]]] = None) -> dict:
         """
         下载所有Axure资源（支持智能缓存）
 
+        资源按 sign_md5 存入共享的 axure_blobs，文档目录中只放链接；版本更新时只下载新增或变化的资源，
+        内容未变的文件保持原样，下载失败的文件记录在缓存元数据中，下次调用时重试。
+
         Args:
             url: 蓝湖文档URL
             output_dir: 输出目录
             force_update: 强制更新，忽略缓存
+            progress: 进度回调 progress(已完成数, 总数)，如 MCP 的 ctx.report_progress
 
         Returns:
             {
                 'status': 'downloaded' | 'cached' | 'updated',
                 'version_id': 版本ID,
                 'reason': 更新原因,
-                'output_dir': 输出目录
+                'output_dir': 输出目录,
+                'changed_pages': 本次重新写入的HTML文件（需要 fix_html_files 处理）,
+                'failed': 下载失败的文件
             }
         """
         params = self.parse_url(url)
-        doc_info = await self.get_document_info(params['project_id'], params['doc_id'])
+        doc_info = await self.get_document_info(params['project_id'], params['doc_id'], fresh=force_update)
 
         # 获取项目级mapping JSON
         versions = doc_info.get('versions', [])
         version_info = versions[0]
         version_id = version_info.get('id', '')  # 版本ID字段名是'id'
-        json_url = version_info.get('json_url')
-
-        response = await self.client.get(json_url)
-        response.raise_for_status()
-        project_mapping = response.json()
+        project_mapping = await self.get_project_mapping(version_info)
 
         # 创建输出目录
         output_path = Path(output_dir)
 
         # 检查是否需要更新
+        reason = 'forced' if force_update else 'first_download'
         if not force_update and output_path.exists():
-            need_update, reason, missing_files = self._should_update_cache(
+            need_update, reason, _ = self._should_update_cache(
                 output_path, version_id, project_mapping
             )
 
@@ -2686,54 +3464,52 @@ class LanhuExtractor:
                     'status': 'cached',
                     'version_id': version_id,
                     'reason': reason,
-                    'output_dir': output_dir
+                    'output_dir': output_dir,
+                    'changed_pages': [],
+                    'failed': []
                 }
 
-            # 如果只是文件缺失，可以增量下载
-            if reason == 'files_missing' and missing_files:
-                # 这里可以实现增量下载逻辑
-                # 为了简化，暂时还是全量下载
-                pass
-
-        output_path.mkdir(parents=True, exist_ok=True)
-
-        # 下载每个页面的资源
+        previous_files = {} if force_update else self._load_cache_meta(output_path).get('files', {})
         pages = project_mapping.get('pages', {})
-        is_first_page = True
+        files, failed = await self._collect_page_files(pages)
 
-        downloaded_files = []
+        # 并发拉取本版本引用的全部资源（已在存储中的直接复用）
+        signs = list(set(files.values()))
+        report = _ProgressReporter(progress, len(signs))
+        await report(0)
 
-        for html_filename, page_info in pages.items():
-            html_data = page_info.get('html', {})
-            html_file_with_md5 = html_data.get('sign_md5', '')
-            page_mapping_md5 = page_info.get('mapping_md5', '')
+        async def _fetch(sign: str) -> Path:
+            try:
+                return await axure_blobs.fetch(self.client, sign, self._cdn_url(sign))
+            finally:
+                await report.advance()
 
-            if not html_file_with_md5:
-                continue
+        fetched = await asyncio.gather(*(_fetch(sign) for sign in signs), return_exceptions=True)
+        failed_signs = {sign for sign, result in zip(signs, fetched) if isinstance(result, BaseException)}
 
-            # 下载HTML
-            html_url = f"{CDN_URL}/{html_file_with_md5}"
-            response = await self.client.get(html_url)
-            response.raise_for_status()
-            html_content = response.text
-
-            # 下载页面级mapping JSON
-            if page_mapping_md5:
-                mapping_url = f"{CDN_URL}/{page_mapping_md5}"
-                response = await self.client.get(mapping_url)
-                response.raise_for_status()
-                page_mapping = response.json()
-
-                # 下载所有依赖资源
-                await self._download_page_resources(
-                    page_mapping, output_path, skip_document_js=(not is_first_page)
-                )
-                is_first_page = False
+        output_path.mkdir(parents=True, exist_ok=True)
+        written = {}
+        changed_pages = []
+        for rel_path, sign_md5 in files.items():
+            dest = Path(os.path.normpath(output_path / rel_path))
+            if not dest.is_relative_to(output_path):
+                continue
+            if sign_md5 in failed_signs:
+                failed.append(rel_path)
+                continue
+            written[rel_path] = sign_md5
+            if previous_files.get(rel_path) == sign_md5 and dest.exists():
+                continue
+            is_html = rel_path in pages
+            axure_blobs.materialize(sign_md5, dest, copy=is_html)
+            if is_html:
+                changed_pages.append(rel_path)
 
-            # 保存HTML
-            html_path = output_path / html_filename
-            html_path.write_text(html_content, encoding='utf-8')
-            downloaded_files.append(html_filename)
+        # 删除新版本中已不存在的文件
+        for rel_path in set(previous_files) - set(files):
+            stale = Path(os.path.normpath(output_path / rel_path))
+            if stale.is_relative_to(output_path) and (stale.is_file() or stale.is_symlink()):
+                stale.unlink()
 
         # 保存缓存元数据
         cache_meta = {
@@ -2742,56 +3518,56 @@ class LanhuExtractor:
             'document_name': doc_info.get('name', 'Unknown'),
             'download_time': asyncio.get_event_loop().time(),
             'pages': list(pages.keys()),
-            'total_files': len(downloaded_files)
+            'total_files': len(written),
+            'files': written,
+            'failed': failed
         }
         self._save_cache_meta(output_path, cache_meta)
 
         return {
-            'status': 'downloaded',
+            'status': 'updated' if previous_files else 'downloaded',
             'version_id': version_id,
-            'reason': 'first_download' if not output_path.exists() else 'version_changed',
-            'output_dir': output_dir
+            'reason': reason,
+            'output_dir': output_dir,
+            'changed_pages': changed_pages,
+            'failed': failed
         }
 
-    async def _download_page_resources(self, page_mapping: dict, output_dir: Path, skip_document_js: bool = False):
-        """下载页面资源"""
-        tasks = []
+    @staticmethod
+    def _cdn_url(sign_md5: str) -> str:
+        return sign_md5 if sign_md5.startswith('http') else f"{CDN_URL}/{sign_md5}"
 
-        # 下载CSS
-        for local_path, info in page_mapping.get('styles', {}).items():
-            sign_md5 = info.get('sign_md5', '')
-            if sign_md5:
-                url = sign_md5 if sign_md5.startswith('http') else f"{CDN_URL}/{sign_md5}"
-                tasks.append(self._download_file(url, output_dir / local_path))
+    async def _collect_page_files(self, pages: dict) -> tuple:
+        """读取各页面的mapping JSON，汇总本版本的全部文件 {相对路径: sign_md5} 及无法解析的页面"""
+        files = {}
+        failed = []
 
-        # 下载JS
-        for local_path, info in page_mapping.get('scripts', {}).items():
-            if skip_document_js and local_path == 'data/document.js':
+        async def _page_files(html_filename: str, page_info: dict) -> dict:
+            html_sign = page_info.get('html', {}).get('sign_md5', '')
+            if not html_sign:
+                return {}
+            page_files = {html_filename: html_sign}
+            mapping_sign = page_info.get('mapping_md5', '')
+            if mapping_sign:
+                mapping_path = await axure_blobs.fetch(self.client, mapping_sign, self._cdn_url(mapping_sign))
+                page_mapping = json.loads(mapping_path.read_text(encoding='utf-8'))
+                for group in ('styles', 'scripts', 'images'):
+                    for local_path, info in page_mapping.get(group, {}).items():
+                        sign_md5 = info.get('sign_md5', '')
+                        if sign_md5:
+                            page_files[local_path] = sign_md5
+            return page_files
+
+        names = list(pages.keys())
+        results = await asyncio.gather(
+            *(_page_files(name, pages[name]) for name in names), return_exceptions=True
+        )
+        for html_filename, result in zip(names, results):
+            if isinstance(result, BaseException):
+                failed.append(html_filename)
                 continue
-            sign_md5 = info.get('sign_md5', '')
-            if sign_md5:
-                url = sign_md5 if sign_md5.startswith('http') else f"{CDN_URL}/{sign_md5}"
-                tasks.append(self._download_file(url, output_dir / local_path))
-
-        # 下载图片
-        for local_path, info in page_mapping.get('images', {}).items():
-            sign_md5 = info.get('sign_md5', '')
-            if sign_md5:
-                url = sign_md5 if sign_md5.startswith('http') else f"{CDN_URL}/{sign_md5}"
-                tasks.append(self._download_file(url, output_dir / local_path))
-
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
-
-    async def _download_file(self, url: str, local_path: Path):
-        """下载单个文件"""
-        try:
-            local_path.parent.mkdir(parents=True, exist_ok=True)
-            response = await self.client.get(url)
-            response.raise_for_status()
-            local_path.write_bytes(response.content)
-        except Exception:
-            pass
+            files.update(result)
+        return files, failed
 
     @staticmethod
     def _build_scale_urls(image_url: str, logical_w: float, logical_h: float, slice_scale: int) -> dict:
@@ -2942,9 +3718,9 @@ class LanhuExtractor:
         # 3. 递归提取所有切图
         slices = []
 
-        def find_slices(obj, parent_name="", layer_path=""):
+        def collect_slice(obj, parent_name, current_path):
             """
-            递归查找切图，兼容新旧两种JSON结构
+            检查单个图层是否为切图，兼容新旧两种JSON结构
 
             Figma 结构:
             - 根节点: artboard.layers[]
@@ -2955,11 +3731,7 @@ class LanhuExtractor:
             - 根节点: info[]
             - 切图字段: ddsImage.imageUrl
             """
-            if not obj or not isinstance(obj, dict):
-                return
-
             current_name = obj.get('name', '')
-            current_path = f"{layer_path}/{current_name}" if layer_path else current_name
 
             # 检查 image 字段
             # Figma: bitmapLayer + hasExportImage=True 才是真切图，其余跳过
@@ -3156,45 +3928,36 @@ class LanhuExtractor:
 
                 slices.append(slice_info)
 
-            # 仅递归标准子图层字段，避免 style.fills 等属性被误识别为切图
-            for child_key in ('layers', 'children'):
-                for child in (obj.get(child_key) or []):
-                    if isinstance(child, dict):
-                        find_slices(child, current_name, current_path)
-
+        # 仅遍历标准子图层字段（layers / children），避免 style.fills 等属性被误识别为切图；隐藏图层同样查找
+        child_keys = ('layers', 'children')
+        tree = None
         # 新版结构: 从 artboard.layers 开始查找 (优先)
         if sketch_data.get('artboard') and sketch_data['artboard'].get('layers'):
-            artboard = sketch_data['artboard']
-            for layer in artboard['layers']:
-                find_slices(layer)
-
+            tree = SketchLayerTree([sketch_data['artboard']['layers']], child_keys)
         # 旧版结构: 从 info 数组开始查找 (兼容)
         elif sketch_data.get('info'):
-            for item in sketch_data['info']:
-                find_slices(item)
+            tree = SketchLayerTree([sketch_data['info']], child_keys)
+
+        if tree is not None:
+            paths = tree.paths('')
+            for i, obj in enumerate(tree.nodes):
+                if not obj:
+                    continue
+                parent = tree.parent[i]
+                parent_name = tree.nodes[parent].get('name', '') if parent >= 0 else ''
+                collect_slice(obj, parent_name, paths[i])
 
         # Photoshop：蓝湖在根节点 type=ps，切图登记在 assets[]（isSlice），
         # 实际 PNG/SVG 地址在对应 id 的图层 images.png_xxxhd / images.svg（与 convert_sketch_to_html 一致）
         if str(sketch_data.get('type') or '').lower() == 'ps':
             by_id: dict = {}
 
-            def _index_ps(obj):
-                if not isinstance(obj, dict):
-                    return
+            board = sketch_data.get('board')
+            indexed = SketchLayerTree([[board], sketch_data.get('info')], child_keys)
+            for obj in indexed.nodes:
                 oid = obj.get('id')
                 if oid is not None:
                     by_id[oid] = obj
-                for k in ('layers', 'children'):
-                    for c in (obj.get(k) or []):
-                        if isinstance(c, dict):
-                            _index_ps(c)
-
-            board = sketch_data.get('board')
-            if isinstance(board, dict):
-                _index_ps(board)
-            for sec in sketch_data.get('info') or []:
-                if isinstance(sec, dict):
-                    _index_ps(sec)
 
             existing_ids = {s.get('id') for s in slices}
 
@@ -3281,8 +4044,8 @@ class LanhuExtractor:
             'slices': slices
         }
 
-    async def _get_version_id_by_image_id(self, project_id: str, team_id: str, image_id: str) -> str:
-        """通过 multi_info 按 image_id 获取 version_id（与 lanhu-html-converter-mcp 一致）"""
+    async def get_design_version_id(self, image_id: str, team_id: str, project_id: str) -> str:
+        """通过 multi_info 按 image_id 获取设计图最新 version_id（与 lanhu-html-converter-mcp 一致）"""
         url = f"{BASE_URL}/api/project/multi_info"
         params = {
             "project_id": project_id,
@@ -3304,16 +4067,10 @@ class LanhuExtractor:
                 raise Exception("该设计图无 latest_version")
         raise Exception(f"未找到 image_id={image_id} 的设计图")
 
-    async def _fetch_dds_schema(self, version_id: str) -> dict:
+    async def get_design_schema_by_version(self, version_id: str) -> dict:
         """调用 DDS store_schema_revise 获取 data_resource_url，再拉取 schema JSON（与 lanhu-html-converter-mcp 一致）"""
-        dds_headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-            "Accept": "application/json, text/plain, */*",
-            "Referer": "https://dds.lanhuapp.com/",
-            "Cookie": DDS_COOKIE,
-            "Authorization": "Basic dW5kZWZpbmVkOg==",
-        }
-        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, headers=dds_headers, follow_redirects=True) as dds_client:
+        dds_client = lanhu_clients.acquire('dds')
+        try:
             rev_url = f"{DDS_BASE_URL}/api/dds/image/store_schema_revise"
             rev_resp = await dds_client.get(rev_url, params={"version_id": version_id})
             rev_resp.raise_for_status()
@@ -3326,17 +4083,25 @@ class LanhuExtractor:
             schema_resp = await dds_client.get(schema_url)
             schema_resp.raise_for_status()
             return schema_resp.json()
+        finally:
+            await lanhu_clients.release(dds_client)
 
     async def get_design_schema_json(self, image_id: str, team_id: str, project_id: str) -> dict:
         """
         获取设计图的 Schema JSON（用于转换为 HTML）。
         与 lanhu-html-converter-mcp 一致：multi_info -> version_id -> DDS store_schema_revise -> data_resource_url -> schema。
         """
-        version_id = await self._get_version_id_by_image_id(project_id, team_id, image_id)
-        return await self._fetch_dds_schema(version_id)
+        version_id = await self.get_design_version_id(image_id, team_id, project_id)
+        return await self.get_design_schema_by_version(version_id)
 
     async def get_sketch_json(self, image_id: str, team_id: str, project_id: str) -> dict:
         """获取原始 Sketch JSON（含完整设计标注数据，用于 design token 提取）"""
+        latest_version = await self.get_sketch_version(image_id, team_id, project_id)
+        json_response = await self.client.get(latest_version['json_url'])
+        return json_response.json()
+
+    async def get_sketch_version(self, image_id: str, team_id: str, project_id: str) -> dict:
+        """获取设计图最新版本信息（含版本 id 和 Sketch JSON 地址）"""
         url = f"{BASE_URL}/api/project/image"
         params = {
             "dds_status": 1,
@@ -3349,14 +4114,13 @@ class LanhuExtractor:
         if data['code'] != '00000':
             raise Exception(f"Failed to get design: {data['msg']}")
         result = data['result']
-        latest_version = result['versions'][0]
-        json_url = latest_version['json_url']
-        json_response = await self.client.get(json_url)
-        return json_response.json()
+        return result['versions'][0]
 
     async def close(self):
-        """关闭客户端"""
-        await self.client.aclose()
+        """归还共享客户端"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await lanhu_clients.release(client)
 
 
 def _format_page_design_info(design_info: dict, resource_dir: str = "") -> str:
@@ -3425,9 +4189,12 @@ def _format_page_design_info(design_info: dict, resource_dir: str = "") -> str:
     return "\n".join(lines)
 
 
-def fix_html_files(directory: str):
-    """修复HTML文件"""
-    html_files = list(Path(directory).glob("*.html"))
+def fix_html_files(directory: str, filenames: Optional[List[str]] = None):
+    """修复HTML文件（filenames 为空时处理目录下全部HTML，否则只处理指定文件）"""
+    if filenames is None:
+        html_files = list(Path(directory).glob("*.html"))
+    else:
+        html_files = [Path(directory) / name for name in filenames]
 
     for html_path in html_files:
         with open(html_path, 'r', encoding='utf-8') as f:
@@ -3483,14 +4250,303 @@ function lanhu_Axure_Mapping_Data(data) {
             f.write(str(soup))
 
 
+# 浏览器重启时放入旧队列，唤醒在旧队列上等待的调用方改从新队列取用
+_POOL_RESTARTED = object()
+
+
+class BrowserPool:
+    """常驻的 Chromium 浏览器池，随 MCP 服务启动/关闭
+
+    池中保持 BROWSER_POOL_SIZE 个浏览器上下文，多个页面可在不同上下文中并发渲染；
+    本地 Axure 资源通过 Playwright 请求路由直接读取文件返回，不再临时启动 HTTP 服务。
+    每个上下文渲染 BROWSER_CONTEXT_MAX_PAGES 个页面后关闭，下次取用时重建，避免内存持续增长。
+    浏览器意外退出时，下次取用会自动重新启动。
+    """
+
+    def __init__(self, size: int, max_pages: int):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._page_counts: dict = {}  # context -> 已渲染页面数
+        self._mounts: dict = {}  # 路由前缀 -> 本地资源目录
+        self._lock = asyncio.Lock()
+        self.pages_rendered = 0
+        self.contexts_recycled = 0
+        self.restarts = 0
+        self.started_at = None
+        self.last_error = None
+
+    def _is_running(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self):
+        """启动浏览器并预热全部上下文（已在运行时直接返回）"""
+        if self._is_running():
+            return
+        async with self._lock:
+            if self._is_running():
+                return
+            if self._browser is not None:
+                self.restarts += 1
+            await self._shutdown()
+            try:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                idle = asyncio.Queue()
+                for _ in range(self.size):
+                    idle.put_nowait(await self._new_context())
+            except Exception as e:
+                self.last_error = str(e)
+                await self._shutdown()
+                raise
+            self._idle = idle
+            self.started_at = datetime.now(CHINA_TZ).isoformat()
+
+    async def close(self):
+        async with self._lock:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        for context in list(self._page_counts):
+            await self._close_context(context)
+        if self._idle is not None:
+            self._idle.put_nowait(_POOL_RESTARTED)
+        self._idle = None
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            viewport={'width': VIEWPORT_WIDTH, 'height': VIEWPORT_HEIGHT}
+        )
+        await context.route(f"{LOCAL_RESOURCE_ORIGIN}/**", self._serve_local)
+        self._page_counts[context] = 0
+        return context
+
+    async def _close_context(self, context):
+        self._page_counts.pop(context, None)
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    async def new_context(self, **kwargs):
+        """创建一个不入池的临时上下文（如需要单独 Cookie 的场景），调用方负责关闭"""
+        await self.start()
+        return await self._browser.new_context(**kwargs)
+
+    def mount(self, resource_dir: str) -> str:
+        """注册本地资源目录，返回页面访问用的基础 URL"""
+        root = Path(resource_dir).resolve()
+        key = hashlib.md5(str(root).encode('utf-8')).hexdigest()[:12]
+        self._mounts[key] = root
+        return f"{LOCAL_RESOURCE_ORIGIN}/{key}"
+
+    async def _serve_local(self, route):
+        path = unquote(urlparse(route.request.url).path).lstrip('/')
+        key, _, relative = path.partition('/')
+        root = self._mounts.get(key)
+        if root is None or not relative:
+            await route.fulfill(status=404, body="Not Found")
+            return
+        # 只做路径规范化而不解析链接：文档目录里的资源可能是指向共享存储的符号链接
+        file_path = Path(os.path.normpath(root / relative))
+        if not file_path.is_relative_to(root) or not file_path.is_file():
+            await route.fulfill(status=404, body="Not Found")
+            return
+        await route.fulfill(path=str(file_path))
+
+    @asynccontextmanager
+    async def page(self):
+        """从池中取一个上下文打开新标签页，用完后归还（上下文不足时排队等待）"""
+        while True:
+            await self.start()
+            idle = self._idle
+            context = await idle.get()
+            if context is not _POOL_RESTARTED:
+                break
+            # 传给旧队列上的下一个等待者，自己到新队列重新排队
+            idle.put_nowait(context)
+        page = None
+        try:
+            if context is None:
+                context = await self._new_context()
+            page = await context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                self.pages_rendered += 1
+            await self._release(idle, context, rendered=page is not None)
+
+    async def _release(self, idle: asyncio.Queue, context, rendered: bool):
+        if context is not None:
+            if idle is not self._idle:
+                # 浏览器已重启，旧上下文直接丢弃
+                await self._close_context(context)
+                return
+            if not rendered:
+                await self._close_context(context)
+                context = None
+            else:
+                self._page_counts[context] = self._page_counts.get(context, 0) + 1
+                if self._page_counts[context] >= self.max_pages:
+                    await self._close_context(context)
+                    self.contexts_recycled += 1
+                    context = None
+        if idle is self._idle:
+            # None 表示该位置的上下文已回收，下次取用时重建
+            idle.put_nowait(context)
+
+    def stats(self) -> dict:
+        running = self._is_running()
+        return {
+            'running': running,
+            'size': self.size,
+            'contexts': len(self._page_counts),
+            'idle': self._idle.qsize() if running and self._idle is not None else 0,
+            'pages_rendered': self.pages_rendered,
+            'contexts_recycled': self.contexts_recycled,
+            'max_pages_per_context': self.max_pages,
+            'restarts': self.restarts,
+            'started_at': self.started_at,
+            'last_error': self.last_error,
+        }
+
+
+browser_pool = BrowserPool(BROWSER_POOL_SIZE, BROWSER_CONTEXT_MAX_PAGES)
+
+PAGE_TEXT_JS = '''() => {
+    let sections = [];
+
+    // 1. Extract red annotation/warning text (product key notes)
+    const redTexts = Array.from(document.querySelectorAll('*')).filter(el => {
+        const style = window.getComputedStyle(el);
+        const color = style.color;
+        // Detect red text (rgb(255,0,0) or #ff0000, etc.)
+        return color && (
+            color.includes('rgb(255, 0, 0)') || 
+            color.includes('rgb(255,0,0)') ||
+            color === 'red'
+        );
+    });
+
+    if (redTexts.length > 0) {
+        const redContent = redTexts
+            .map(el => el.textContent.trim())
+            .filter(t => t.length > 0 && t.length < 200)
+            .filter((v, i, a) => a.indexOf(v) === i); // dedupe
+        if (redContent.length > 0) {
+            sections.push("[Important Tips/Warnings]\\n" + redContent.join("\\n"));
+        }
+    }
+
+    // 2. Extract Axure shape/flowchart node text
+    const axureShapes = document.querySelectorAll('[id^="u"], .ax_shape, .shape, [class*="shape"]');
+    const shapeTexts = [];
+    axureShapes.forEach(el => {
+        const text = el.textContent.trim();
+        // Only text with appropriate length (avoid overly long paragraphs)
+        if (text && text.length > 0 && text.length < 100) {
+            shapeTexts.push(text);
+        }
+    });
+
+    if (shapeTexts.length > 5) { // If many shape texts extracted, likely a flowchart
+        const uniqueShapes = [...new Set(shapeTexts)];
+        sections.push("[Flowchart/Component Text]\\n" + uniqueShapes.slice(0, 20).join(" | ")); // max 20
+    }
+
+    // 3. Extract all visible text (most complete content)
+    const bodyText = document.body.innerText || '';
+    if (bodyText.trim()) {
+        sections.push("[Full Page Text]\\n" + bodyText.trim());
+    }
+
+    // 4. If nothing extracted
+    if (sections.length === 0) {
+        return "⚠️ Page text is empty or cannot be extracted (please refer to visual output)";
+    }
+
+    return sections.join("\\n\\n");
+}'''
+
+PAGE_STYLE_JS = '''() => {
+    const allEls = document.querySelectorAll('*');
+    const textColors = {};
+    const bgColors = {};
+    const fontSpecs = {};
+    const images = [];
+
+    allEls.forEach(el => {
+        const cs = window.getComputedStyle(el);
+        if (cs.display === 'none' || cs.visibility === 'hidden') return;
+        const rect = el.getBoundingClientRect();
+        if (rect.width < 1 || rect.height < 1) return;
+
+        // 收集直接包含文本的元素样式
+        const hasDirectText = Array.from(el.childNodes).some(
+            n => n.nodeType === 3 && n.textContent.trim().length > 0
+        );
+        if (hasDirectText) {
+            const color = cs.color;
+            if (color) textColors[color] = (textColors[color] || 0) + 1;
+            const key = cs.fontSize + '|' + cs.fontWeight + '|' + color;
+            fontSpecs[key] = (fontSpecs[key] || 0) + 1;
+        }
+
+        // 收集背景色
+        const bg = cs.backgroundColor;
+        if (bg && bg !== 'rgba(0, 0, 0, 0)' && bg !== 'transparent') {
+            bgColors[bg] = (bgColors[bg] || 0) + 1;
+        }
+
+        // 收集背景图片
+        const bgImg = cs.backgroundImage;
+        if (bgImg && bgImg !== 'none') {
+            const m = bgImg.match(/url\\("?([^"\\)]*)"?\\)/);
+            if (m && !m[1].startsWith('data:')) {
+                images.push({ src: m[1], type: 'bg', w: Math.round(rect.width), h: Math.round(rect.height) });
+            }
+        }
+    });
+
+    // 收集 <img> 元素
+    document.querySelectorAll('img').forEach(img => {
+        if (img.src && img.naturalWidth > 0 && !img.src.startsWith('data:')) {
+            images.push({ src: img.src, type: 'img', w: img.naturalWidth, h: img.naturalHeight });
+        }
+    });
+
+    // 按使用频率排序
+    const sortObj = o => Object.entries(o).sort((a, b) => b[1] - a[1]);
+    return {
+        textColors: sortObj(textColors).slice(0, 15),
+        bgColors: sortObj(bgColors).slice(0, 10),
+        fontSpecs: sortObj(fontSpecs).slice(0, 15),
+        images: images.slice(0, 30)
+    };
+}'''
+
+
 async def screenshot_page_internal(resource_dir: str, page_names: List[str], output_dir: str,
                                    return_base64: bool = True, version_id: str = None) -> List[dict]:
     """内部截图函数（同时提取页面文本），支持智能缓存"""
-    import http.server
-    import socketserver
-    import threading
-    import time
-
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
@@ -3553,213 +4609,80 @@ async def screenshot_page_internal(resource_dir: str, page_names: List[str], out
     if not pages_to_render:
         return results
     
-    # 启动HTTP服务器（只有需要渲染时才启动）
-    import random
-    port = random.randint(8800, 8900)
-    abs_dir = os.path.abspath(resource_dir)
-    handler = lambda *args, **kwargs: http.server.SimpleHTTPRequestHandler(
-        *args, directory=abs_dir, **kwargs
-    )
-    httpd = socketserver.TCPServer(("", port), handler)
-    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
-    thread.start()
-    time.sleep(1)
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        # viewport 只影响初始窗口大小，不影响 full_page=True 的截图范围
-        page = await browser.new_page(viewport={'width': VIEWPORT_WIDTH, 'height': VIEWPORT_HEIGHT})
-
-        for page_name in pages_to_render:
-            try:
-                # 查找HTML文件
-                html_file = None
-                for f in Path(resource_dir).glob("*.html"):
-                    if f.stem == page_name:
-                        html_file = f.name
-                        break
-
-                if not html_file:
-                    results.append({
-                        'page_name': page_name,
-                        'success': False,
-                        'error': f'Page {page_name} does not exist'
-                    })
-                    continue
+    # 资源目录挂载到浏览器池，页面在多个上下文中并发渲染
+    base_url = browser_pool.mount(resource_dir)
+    html_files = {f.stem: f.name for f in Path(resource_dir).glob("*.html")}
 
+    async def _render(page_name: str) -> dict:
+        html_file = html_files.get(page_name)
+        if not html_file:
+            return {
+                'page_name': page_name,
+                'success': False,
+                'error': f'Page {page_name} does not exist'
+            }
+        try:
+            async with browser_pool.page() as page:
                 # 访问页面
-                url = f"http://localhost:{port}/{html_file}"
-                await page.goto(url, wait_until='networkidle', timeout=30000)
+                await page.goto(f"{base_url}/{quote(html_file)}", wait_until='networkidle', timeout=30000)
                 await page.wait_for_timeout(2000)
 
                 # Extract page text content (optimized for Axure)
-                page_text = await page.evaluate('''() => {
-                    let sections = [];
-
-                    // 1. Extract red annotation/warning text (product key notes)
-                    const redTexts = Array.from(document.querySelectorAll('*')).filter(el => {
-                        const style = window.getComputedStyle(el);
-                        const color = style.color;
-                        // Detect red text (rgb(255,0,0) or #ff0000, etc.)
-                        return color && (
-                            color.includes('rgb(255, 0, 0)') || 
-                            color.includes('rgb(255,0,0)') ||
-                            color === 'red'
-                        );
-                    });
-
-                    if (redTexts.length > 0) {
-                        const redContent = redTexts
-                            .map(el => el.textContent.trim())
-                            .filter(t => t.length > 0 && t.length < 200)
-                            .filter((v, i, a) => a.indexOf(v) === i); // dedupe
-                        if (redContent.length > 0) {
-                            sections.push("[Important Tips/Warnings]\\n" + redContent.join("\\n"));
-                        }
-                    }
-
-                    // 2. Extract Axure shape/flowchart node text
-                    const axureShapes = document.querySelectorAll('[id^="u"], .ax_shape, .shape, [class*="shape"]');
-                    const shapeTexts = [];
-                    axureShapes.forEach(el => {
-                        const text = el.textContent.trim();
-                        // Only text with appropriate length (avoid overly long paragraphs)
-                        if (text && text.length > 0 && text.length < 100) {
-                            shapeTexts.push(text);
-                        }
-                    });
-
-                    if (shapeTexts.length > 5) { // If many shape texts extracted, likely a flowchart
-                        const uniqueShapes = [...new Set(shapeTexts)];
-                        sections.push("[Flowchart/Component Text]\\n" + uniqueShapes.slice(0, 20).join(" | ")); // max 20
-                    }
-
-                    // 3. Extract all visible text (most complete content)
-                    const bodyText = document.body.innerText || '';
-                    if (bodyText.trim()) {
-                        sections.push("[Full Page Text]\\n" + bodyText.trim());
-                    }
-
-                    // 4. If nothing extracted
-                    if (sections.length === 0) {
-                        return "⚠️ Page text is empty or cannot be extracted (please refer to visual output)";
-                    }
-
-                    return sections.join("\\n\\n");
-                }''')
+                page_text = await page.evaluate(PAGE_TEXT_JS)
 
                 # 提取页面设计样式信息（字体颜色、背景色、图片资源等）
-                page_design_info = await page.evaluate('''() => {
-                    const allEls = document.querySelectorAll('*');
-                    const textColors = {};
-                    const bgColors = {};
-                    const fontSpecs = {};
-                    const images = [];
-
-                    allEls.forEach(el => {
-                        const cs = window.getComputedStyle(el);
-                        if (cs.display === 'none' || cs.visibility === 'hidden') return;
-                        const rect = el.getBoundingClientRect();
-                        if (rect.width < 1 || rect.height < 1) return;
-
-                        // 收集直接包含文本的元素样式
-                        const hasDirectText = Array.from(el.childNodes).some(
-                            n => n.nodeType === 3 && n.textContent.trim().length > 0
-                        );
-                        if (hasDirectText) {
-                            const color = cs.color;
-                            if (color) textColors[color] = (textColors[color] || 0) + 1;
-                            const key = cs.fontSize + '|' + cs.fontWeight + '|' + color;
-                            fontSpecs[key] = (fontSpecs[key] || 0) + 1;
-                        }
-
-                        // 收集背景色
-                        const bg = cs.backgroundColor;
-                        if (bg && bg !== 'rgba(0, 0, 0, 0)' && bg !== 'transparent') {
-                            bgColors[bg] = (bgColors[bg] || 0) + 1;
-                        }
-
-                        // 收集背景图片
-                        const bgImg = cs.backgroundImage;
-                        if (bgImg && bgImg !== 'none') {
-                            const m = bgImg.match(/url\\("?([^"\\)]*)"?\\)/);
-                            if (m && !m[1].startsWith('data:')) {
-                                images.push({ src: m[1], type: 'bg', w: Math.round(rect.width), h: Math.round(rect.height) });
-                            }
-                        }
-                    });
-
-                    // 收集 <img> 元素
-                    document.querySelectorAll('img').forEach(img => {
-                        if (img.src && img.naturalWidth > 0 && !img.src.startsWith('data:')) {
-                            images.push({ src: img.src, type: 'img', w: img.naturalWidth, h: img.naturalHeight });
-                        }
-                    });
-
-                    // 按使用频率排序
-                    const sortObj = o => Object.entries(o).sort((a, b) => b[1] - a[1]);
-                    return {
-                        textColors: sortObj(textColors).slice(0, 15),
-                        bgColors: sortObj(bgColors).slice(0, 10),
-                        fontSpecs: sortObj(fontSpecs).slice(0, 15),
-                        images: images.slice(0, 30)
-                    };
-                }''')
-
-                # 截图
-                safe_name = re.sub(r'[^\w\s-]', '_', page_name)
-                screenshot_path = output_path / f"{safe_name}.png"
-                text_path = output_path / f"{safe_name}.txt"
-                styles_path = output_path / f"{safe_name}_styles.json"
+                page_design_info = await page.evaluate(PAGE_STYLE_JS)
 
                 # 获取截图字节
                 screenshot_bytes = await page.screenshot(full_page=True)
 
-                # 保存截图到文件
-                screenshot_path.write_bytes(screenshot_bytes)
-                
-                # 保存文本到文件（用于缓存）
-                try:
-                    text_path.write_text(page_text, encoding='utf-8')
-                except Exception:
-                    pass
+            safe_name = re.sub(r'[^\w\s-]', '_', page_name)
+            screenshot_path = output_path / f"{safe_name}.png"
+            text_path = output_path / f"{safe_name}.txt"
+            styles_path = output_path / f"{safe_name}_styles.json"
 
-                # 保存样式信息到文件（用于缓存）
-                try:
-                    with open(styles_path, 'w', encoding='utf-8') as sf:
-                        json.dump(page_design_info, sf, ensure_ascii=False)
-                except Exception:
-                    pass
+            # 保存截图到文件
+            screenshot_path.write_bytes(screenshot_bytes)
 
-                result = {
-                    'page_name': page_name,
-                    'success': True,
-                    'screenshot_path': str(screenshot_path),
-                    'page_text': page_text,
-                    'page_design_info': page_design_info,
-                    'size': f"{len(screenshot_bytes) / 1024:.1f}KB",
-                    'from_cache': False
-                }
+            # 保存文本到文件（用于缓存）
+            try:
+                text_path.write_text(page_text, encoding='utf-8')
+            except Exception:
+                pass
 
-                # 如果需要返回base64
-                if return_base64:
-                    result['base64'] = base64.b64encode(screenshot_bytes).decode('utf-8')
-                    result['mime_type'] = 'image/png'
+            # 保存样式信息到文件（用于缓存）
+            try:
+                with open(styles_path, 'w', encoding='utf-8') as sf:
+                    json.dump(page_design_info, sf, ensure_ascii=False)
+            except Exception:
+                pass
 
-                results.append(result)
-            except Exception as e:
-                results.append({
-                    'page_name': page_name,
-                    'success': False,
-                    'error': str(e)
-                })
+            result = {
+                'page_name': page_name,
+                'success': True,
+                'screenshot_path': str(screenshot_path),
+                'page_text': page_text,
+                'page_design_info': page_design_info,
+                'size': f"{len(screenshot_bytes) / 1024:.1f}KB",
+                'from_cache': False
+            }
 
-        await browser.close()
+            # 如果需要返回base64
+            if return_base64:
+                result['base64'] = base64.b64encode(screenshot_bytes).decode('utf-8')
+                result['mime_type'] = 'image/png'
+
+            return result
+        except Exception as e:
+            return {
+                'page_name': page_name,
+                'success': False,
+                'error': str(e)
+            }
+
+    # gather 保持页面顺序，并发度由浏览器池大小限制
+    results.extend(await asyncio.gather(*(_render(name) for name in pages_to_render)))
 
-    # 停止服务器
-    httpd.shutdown()
-    httpd.server_close()
-    
     # 更新缓存元数据
     if version_id:
         cache_meta['version_id'] = version_id
@@ -3773,6 +4696,148 @@ async def screenshot_page_internal(resource_dir: str, page_names: List[str], out
     return results
 
 
+# 静态解析 Axure 页面文本时用到的样式匹配（与 PAGE_TEXT_JS 的规则保持一致）
+_HIDDEN_STYLE_RE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden', re.I)
+_RED_TEXT_STYLE_RE = re.compile(
+    r'(?<![-\w])color\s*:\s*(?:#f00\b|#ff0000\b|rgb\(\s*255\s*,\s*0\s*,\s*0\s*\)|red\b)', re.I
+)
+_AXURE_SHAPE_SELECTOR = '[id^="u"], .ax_shape, .shape, [class*="shape"]'
+
+
+def extract_axure_text_from_html(html: str) -> str:
+    """不启动浏览器，直接从 Axure 导出的 HTML 中提取页面文本（输出格式与 PAGE_TEXT_JS 相同）
+
+    Axure 导出的页面控件文本就在静态 HTML 中（data/document.js 只有站点地图和全局配置），
+    隐藏的动态面板状态通过内联样式判断。提取不到正文时返回空字符串，由调用方改用浏览器渲染。
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    for tag in soup(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+    body = soup.body or soup
+    for tag in body.find_all(style=_HIDDEN_STYLE_RE):
+        tag.decompose()
+
+    sections = []
+
+    # 1. 红色标注/警示文字
+    red_content = []
+    for el in body.find_all(style=_RED_TEXT_STYLE_RE):
+        text = el.get_text().strip()
+        if 0 < len(text) < 200 and text not in red_content:
+            red_content.append(text)
+    if red_content:
+        sections.append("[Important Tips/Warnings]\n" + "\n".join(red_content))
+
+    # 2. Axure 形状/流程图节点文本
+    shape_texts = []
+    for el in body.select(_AXURE_SHAPE_SELECTOR):
+        text = el.get_text().strip()
+        if 0 < len(text) < 100:
+            shape_texts.append(text)
+    if len(shape_texts) > 5:
+        unique_shapes = list(dict.fromkeys(shape_texts))
+        sections.append("[Flowchart/Component Text]\n" + " | ".join(unique_shapes[:20]))
+
+    # 3. 全部可见文本
+    body_text = body.get_text("\n", strip=True)
+    if not body_text:
+        return ""
+    sections.append("[Full Page Text]\n" + body_text)
+
+    return "\n\n".join(sections)
+
+
+# 浏览器提取文本时等待页面就绪的条件：文档加载完成且正文已渲染出文字
+_PAGE_READY_JS = "() => document.readyState === 'complete' && !!document.body && document.body.innerText.trim().length > 0"
+
+
+def _text_cache_dir(output_dir: str, version_id: str) -> Optional[Path]:
+    """按文档版本划分的文本缓存目录，切换到新版本时清理旧版本的缓存"""
+    if not version_id:
+        return None
+    cache_root = Path(output_dir) / ".text_cache"
+    cache_dir = cache_root / re.sub(r'[^\w-]', '_', version_id)
+    if not cache_dir.exists():
+        if cache_root.exists():
+            for stale in cache_root.iterdir():
+                shutil.rmtree(stale, ignore_errors=True)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+async def extract_page_texts_internal(resource_dir: str, page_names: List[str], output_dir: str,
+                                      version_id: str = None) -> List[dict]:
+    """text_only 模式：只提取页面文本，不截图
+
+    依次尝试：版本文本缓存 → 静态解析 HTML → 浏览器池渲染（等待就绪信号后只执行文本提取脚本）。
+    """
+    cache_dir = _text_cache_dir(output_dir, version_id)
+    html_files = {f.stem: f for f in Path(resource_dir).glob("*.html")}
+    base_url = None
+
+    async def _extract(page_name: str) -> dict:
+        nonlocal base_url
+        safe_name = re.sub(r'[^\w\s-]', '_', page_name)
+        cache_file = cache_dir / f"{safe_name}.txt" if cache_dir else None
+        if cache_file and cache_file.exists():
+            try:
+                return {
+                    'page_name': page_name,
+                    'success': True,
+                    'page_text': cache_file.read_text(encoding='utf-8'),
+                    'from_cache': True,
+                    'source': 'cache'
+                }
+            except Exception:
+                pass
+
+        html_path = html_files.get(page_name)
+        if html_path is None:
+            return {
+                'page_name': page_name,
+                'success': False,
+                'error': f'Page {page_name} does not exist'
+            }
+
+        try:
+            html = html_path.read_text(encoding='utf-8', errors='ignore')
+            page_text = await asyncio.to_thread(extract_axure_text_from_html, html)
+            source = 'html'
+            if not page_text:
+                # 正文由脚本生成的页面才需要浏览器
+                if base_url is None:
+                    base_url = browser_pool.mount(resource_dir)
+                async with browser_pool.page() as page:
+                    await page.goto(f"{base_url}/{quote(html_path.name)}", wait_until='domcontentloaded', timeout=30000)
+                    try:
+                        await page.wait_for_function(_PAGE_READY_JS, timeout=TEXT_READY_TIMEOUT_MS, polling=100)
+                    except Exception:
+                        pass  # 超时仍提取当前已渲染的内容
+                    page_text = await page.evaluate(PAGE_TEXT_JS)
+                source = 'dom'
+        except Exception as e:
+            return {
+                'page_name': page_name,
+                'success': False,
+                'error': str(e)
+            }
+
+        if cache_file:
+            try:
+                cache_file.write_text(page_text, encoding='utf-8')
+            except Exception:
+                pass
+        return {
+            'page_name': page_name,
+            'success': True,
+            'page_text': page_text,
+            'from_cache': False,
+            'source': source
+        }
+
+    return list(await asyncio.gather(*(_extract(name) for name in page_names)))
+
+
 @mcp.tool()
 async def lanhu_resolve_invite_link(
     invite_url: Annotated[str, "Lanhu invite link. Example: https://lanhuapp.com/link/#/invite?sid=xxx"]
@@ -3800,11 +4865,9 @@ async def lanhu_resolve_invite_link(
                     'path': '/'
                 })
         
-        # 使用playwright来处理前端重定向
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            
+        # 使用playwright来处理前端重定向（复用浏览器池的浏览器，Cookie 放在临时上下文中）
+        context = await browser_pool.new_context()
+        try:
             # 添加cookies
             if cookies:
                 await context.add_cookies(cookies)
@@ -3819,32 +4882,32 @@ async def lanhu_resolve_invite_link(
             
             # 获取最终URL
             final_url = page.url
+        finally:
+            await context.close()
+
+        # 解析最终URL
+        extractor = LanhuExtractor()
+        try:
+            params = extractor.parse_url(final_url)
             
-            await browser.close()
+            return {
+                "status": "success",
+                "invite_url": invite_url,
+                "resolved_url": final_url,
+                "parsed_params": params,
+                "usage_tip": "You can now use this resolved_url with other lanhu tools (lanhu_get_pages, lanhu_get_designs, etc.)"
+            }
+        except Exception as e:
+            return {
+                "status": "partial_success",
+                "invite_url": invite_url,
+                "resolved_url": final_url,
+                "parse_error": str(e),
+                "message": "URL resolved but parsing failed. You can try using the resolved_url directly."
+            }
+        finally:
+            await extractor.close()
             
-            # 解析最终URL
-            extractor = LanhuExtractor()
-            try:
-                params = extractor.parse_url(final_url)
-                
-                return {
-                    "status": "success",
-                    "invite_url": invite_url,
-                    "resolved_url": final_url,
-                    "parsed_params": params,
-                    "usage_tip": "You can now use this resolved_url with other lanhu tools (lanhu_get_pages, lanhu_get_designs, etc.)"
-                }
-            except Exception as e:
-                return {
-                    "status": "partial_success",
-                    "invite_url": invite_url,
-                    "resolved_url": final_url,
-                    "parse_error": str(e),
-                    "message": "URL resolved but parsing failed. You can try using the resolved_url directly."
-                }
-            finally:
-                await extractor.close()
-                
     except Exception as e:
         return {
             "status": "error",
@@ -4615,11 +5678,13 @@ async def lanhu_get_ai_analyze_page_result(
         output_dir = str(DATA_DIR / f"axure_extract_{doc_id[:8]}_screenshots")
 
         # 下载资源（支持智能缓存）
-        download_result = await extractor.download_resources(url, resource_dir)
+        download_result = await extractor.download_resources(
+            url, resource_dir, progress=ctx.report_progress if ctx else None
+        )
 
-        # 如果是新下载或更新，修复HTML
+        # 只修复本次新写入的HTML（未变化的页面已修复过）
         if download_result['status'] in ['downloaded', 'updated']:
-            fix_html_files(resource_dir)
+            fix_html_files(resource_dir, download_result.get('changed_pages'))
 
         # 获取页面列表
         pages_info = await extractor.get_pages_list(url)
@@ -4653,10 +5718,14 @@ async def lanhu_get_ai_analyze_page_result(
                     target_pages.append(pn)
                     target_page_names.append(pn)
 
-        # 截图（不需要返回base64了，直接保存文件）
         # 传入version_id用于智能缓存
         version_id = download_result.get('version_id', '')
-        results = await screenshot_page_internal(resource_dir, target_pages, output_dir, return_base64=False, version_id=version_id)
+        if mode == "text_only":
+            # 只要文本时不截图：优先静态解析 HTML，必要时才用浏览器
+            results = await extract_page_texts_internal(resource_dir, target_pages, output_dir, version_id=version_id)
+        else:
+            # 截图（不需要返回base64了，直接保存文件）
+            results = await screenshot_page_internal(resource_dir, target_pages, output_dir, return_base64=False, version_id=version_id)
 
         # 构建响应
         cached_count = sum(1 for r in results if r.get('from_cache'))
@@ -4844,10 +5913,19 @@ async def lanhu_get_ai_analyze_page_result(
         await extractor.close()
 
 
-async def _get_designs_internal(extractor: LanhuExtractor, url: str) -> dict:
-    """内部函数：获取设计图列表"""
+async def _get_designs_internal(extractor: LanhuExtractor, url: str, fresh: bool = False) -> dict:
+    """内部函数：获取设计图列表（先返回缓存，超过 METADATA_CACHE_TTL 时后台刷新）"""
     # 解析URL获取参数
     params = extractor.parse_url(url)
+    cache_key = _get_metadata_cache_key(params['project_id'], params.get('team_id'))
+    if not fresh:
+        cached, age = metadata_cache.lookup('designs', cache_key)
+        if cached is not None:
+            if age > METADATA_CACHE_TTL:
+                metadata_cache.revalidate('designs', cache_key, lambda: _with_new_extractor(
+                    lambda new_extractor: _get_designs_internal(new_extractor, url, fresh=True)
+                ))
+            return cached
 
     # 构建获取设计图列表的API URL
     api_url = (
@@ -4885,12 +5963,14 @@ async def _get_designs_internal(extractor: LanhuExtractor, url: str) -> dict:
             'update_time': img.get('update_time')
         })
 
-    return {
+    result = {
         'status': 'success',
         'project_name': project_data.get('name'),
         'total_designs': len(design_list),
         'designs': design_list
     }
+    metadata_cache.set('designs', cache_key, result)
+    return result
 
 
 @mcp.tool()
@@ -4937,6 +6017,220 @@ async def lanhu_get_designs(
         await extractor.close()
 
 
+# 设计稿转换器版本：修改 convert_lanhu_to_html / convert_sketch_to_html / 标注提取等逻辑后提升，使旧的转换缓存失效
+DESIGN_CONVERTER_VERSION = "1"
+
+
+def _design_artifact_key(image_id: str, version_id: str, design_scale: Any) -> str:
+    return f"{image_id}:{version_id}:{design_scale}:{DESIGN_CONVERTER_VERSION}"
+
+
+def _sketch_design_scale(sketch_json: dict) -> float:
+    """根据 Sketch JSON 的 device 字段判断设计倍率"""
+    device_str = sketch_json.get('device', '')
+    if '@3x' in device_str:
+        return 3.0
+    if '@1x' in device_str:
+        return 1.0
+    return 2.0
+
+
+def _convert_design_schema(schema_json: dict, design_name: str) -> tuple:
+    """DDS Schema → 压缩后的 HTML 与图片下载映射（在进程池中执行）"""
+    html_code = minify_html(convert_lanhu_to_html(schema_json))
+    return _localize_image_urls(html_code, design_name)
+
+
+def _convert_sketch_design(sketch_json: dict, design_scale: float, design_img_url: str,
+                           with_fallback: bool) -> dict:
+    """Sketch JSON → Design Tokens；with_fallback 时再生成标注降级 HTML 和标注文本（在进程池中执行）"""
+    # 图层树只展开一次，三种提取共用
+    layers = SketchLayers(sketch_json)
+    result = {'design_tokens': _extract_design_tokens(sketch_json, layers)}
+    if with_fallback:
+        fallback_html, fallback_img_mapping, fallback_layer_annots = convert_sketch_to_html(
+            sketch_json, design_scale, design_img_url, layers
+        )
+        fallback_img_mapping['./assets/designs/design.png'] = design_img_url
+        result['sketch_html'] = minify_html(fallback_html)
+        result['sketch_annotations'] = _extract_full_annotations_from_sketch(sketch_json, design_scale, layers)
+        result['image_url_mapping'] = fallback_img_mapping
+        result['layer_css_annotations'] = fallback_layer_annots
+    return result
+
+
+_design_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_design_executor() -> Optional[ProcessPoolExecutor]:
+    global _design_executor
+    if _design_executor is None and DESIGN_CONVERT_WORKERS > 0:
+        # spawn：子进程不继承事件循环、浏览器驱动等线程状态
+        _design_executor = ProcessPoolExecutor(
+            max_workers=DESIGN_CONVERT_WORKERS, mp_context=multiprocessing.get_context('spawn')
+        )
+    return _design_executor
+
+
+def start_design_executor():
+    """创建进程池并拉起全部工作进程：spawn 子进程需要重新导入本模块，放在启动阶段完成，首次转换无需等待"""
+    executor = _get_design_executor()
+    if executor is not None:
+        for _ in range(DESIGN_CONVERT_WORKERS):
+            executor.submit(os.getpid)
+
+
+def shutdown_design_executor():
+    global _design_executor
+    if _design_executor is not None:
+        executor, _design_executor = _design_executor, None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_cpu_bound(func: Callable, *args) -> Any:
+    """在进程池中执行设计稿转换等 CPU 密集函数；未启用进程池或进程池异常时在当前进程执行"""
+    executor = _get_design_executor()
+    if executor is None:
+        return func(*args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        shutdown_design_executor()
+        return func(*args)
+
+
+async def _analyze_design(extractor: LanhuExtractor, design: dict, params: dict, output_dir: Path) -> tuple:
+    """处理单个设计图：下载图片、Schema 转 HTML、Sketch 提取 Design Tokens / 标注降级
+
+    三个网络请求并发发出；转换结果按 (image_id, version_id, 倍率, 转换器版本) 缓存在 design_artifacts 中，
+    同一版本再次分析时只读缓存。返回 (image_result, html_result)，结构与逐个处理时一致。
+    """
+    # 获取原图URL（去掉OSS处理参数）
+    img_url = design['url'].split('?')[0]
+
+    async def _download_image() -> dict:
+        # ===== 1. 下载图片 =====
+        try:
+            # 流式下载并保存文件
+            img_filename = f"{design['name']}.png"
+            img_filepath = output_dir / img_filename
+            await downloads.download(extractor.client, img_url, img_filepath)
+            return {
+                'success': True,
+                'design_name': design['name'],
+                'design_id': design['id'],
+                'screenshot_path': str(img_filepath)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'design_name': design['name'],
+                'error': str(e)
+            }
+
+    async def _generate_html() -> dict:
+        # ===== 2. 获取Schema并生成HTML =====
+        try:
+            version_id = await extractor.get_design_version_id(
+                design['id'], params['team_id'], params['project_id']
+            )
+            cache_key = _design_artifact_key(design['id'], version_id, 'schema')
+            cached = design_artifacts.get('schema_html', cache_key)
+            if cached is not None:
+                html_code, image_url_mapping = cached['html_code'], cached['image_url_mapping']
+            else:
+                # 获取设计图Schema JSON
+                schema_json = await extractor.get_design_schema_by_version(version_id)
+
+                # 转换为 HTML 并压缩（与 TS 端一致，减少 token），远程图片 URL 替换为本地路径
+                html_code, image_url_mapping = await _run_cpu_bound(
+                    _convert_design_schema, schema_json, design['name']
+                )
+                design_artifacts.set('schema_html', cache_key, {
+                    'html_code': html_code,
+                    'image_url_mapping': image_url_mapping,
+                }, version_id)
+
+            # 保存HTML文件
+            html_filename = f"{design['name']}.html"
+            html_filepath = output_dir / html_filename
+
+            with open(html_filepath, 'w', encoding='utf-8') as f:
+                f.write(html_code)
+
+            return {
+                'success': True,
+                'design_name': design['name'],
+                'html_path': str(html_filepath),
+                'html_code': html_code,
+                'image_url_mapping': image_url_mapping,
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'design_name': design['name'],
+                'error': str(e)
+            }
+
+    async def _prepare_sketch() -> Optional[dict]:
+        """查找 Sketch 转换缓存；缓存里没有 Design Tokens 时提前拉取 Sketch JSON"""
+        try:
+            version = await extractor.get_sketch_version(design['id'], params['team_id'], params['project_id'])
+            state = {'version': version, 'cached': None, 'sketch_json': None}
+            # 倍率取决于 Sketch JSON 内容，按版本记录下来，命中时无需再拉取 JSON
+            design_scale = design_artifacts.get('sketch_scale', _design_artifact_key(design['id'], version['id'], '-'))
+            if design_scale is not None:
+                state['cached'] = design_artifacts.get(
+                    'sketch', _design_artifact_key(design['id'], version['id'], design_scale)
+                )
+            if state['cached'] is None:
+                state['sketch_json'] = (await extractor.client.get(version['json_url'])).json()
+            return state
+        except Exception:
+            return None
+
+    image_result, html_result, sketch_state = await asyncio.gather(
+        _download_image(), _generate_html(), _prepare_sketch()
+    )
+
+    # ===== 3. 从 Sketch JSON 提取 Design Tokens / Fallback HTML =====
+    if sketch_state is not None:
+        try:
+            with_fallback = not html_result['success']
+            sketch_result = sketch_state['cached']
+            if sketch_result is None or (with_fallback and 'sketch_html' not in sketch_result):
+                version = sketch_state['version']
+                sketch_json = sketch_state['sketch_json']
+                if sketch_json is None:
+                    sketch_json = (await extractor.client.get(version['json_url'])).json()
+                design_scale = _sketch_design_scale(sketch_json)
+                sketch_result = await _run_cpu_bound(
+                    _convert_sketch_design, sketch_json, design_scale, img_url, with_fallback
+                )
+                design_artifacts.set(
+                    'sketch_scale', _design_artifact_key(design['id'], version['id'], '-'), design_scale, version['id']
+                )
+                design_artifacts.set(
+                    'sketch', _design_artifact_key(design['id'], version['id'], design_scale), sketch_result, version['id']
+                )
+
+            design_tokens = sketch_result['design_tokens']
+            if html_result['success']:
+                if design_tokens:
+                    html_result['design_tokens'] = design_tokens
+            else:
+                html_result['sketch_html'] = sketch_result['sketch_html']
+                html_result['sketch_annotations'] = sketch_result['sketch_annotations']
+                html_result['image_url_mapping'] = sketch_result['image_url_mapping']
+                html_result['layer_css_annotations'] = sketch_result['layer_css_annotations']
+                if design_tokens:
+                    html_result['design_tokens'] = design_tokens
+        except Exception:
+            pass
+
+    return image_result, html_result
+
+
 @mcp.tool()
 async def lanhu_get_ai_analyze_design_result(
         url: Annotated[str, "Lanhu URL WITHOUT docId (indicates UI design project). Example: https://lanhuapp.com/web/#/item/project/stage?tid=xxx&pid=xxx"],
@@ -5134,122 +6428,17 @@ async def lanhu_get_ai_analyze_design_result(
         output_dir = DATA_DIR / 'lanhu_designs' / params['project_id']
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # 下载设计图并生成HTML
-        image_results = []
-        html_results = []
-        
-        for design in target_designs:
-            # ===== 1. 下载图片 =====
-            try:
-                # 获取原图URL（去掉OSS处理参数）
-                img_url = design['url'].split('?')[0]
-
-                # 下载图片
-                response = await extractor.client.get(img_url)
-                response.raise_for_status()
-
-                # 保存文件
-                img_filename = f"{design['name']}.png"
-                img_filepath = output_dir / img_filename
+        # 下载设计图并生成HTML：各设计图并发处理（最多 DESIGN_ANALYZE_CONCURRENCY 个），
+        # 转换在进程池中执行，结果按 target_designs 原顺序汇总
+        semaphore = asyncio.Semaphore(max(1, DESIGN_ANALYZE_CONCURRENCY))
 
-                with open(img_filepath, 'wb') as f:
-                    f.write(response.content)
+        async def _analyze(design: dict) -> tuple:
+            async with semaphore:
+                return await _analyze_design(extractor, design, params, output_dir)
 
-                image_results.append({
-                    'success': True,
-                    'design_name': design['name'],
-                    'design_id': design['id'],
-                    'screenshot_path': str(img_filepath)
-                })
-            except Exception as e:
-                image_results.append({
-                    'success': False,
-                    'design_name': design['name'],
-                    'error': str(e)
-                })
-            
-            # ===== 2. 获取Schema并生成HTML =====
-            try:
-                # 获取设计图Schema JSON
-                schema_json = await extractor.get_design_schema_json(
-                    design['id'], 
-                    params['team_id'], 
-                    params['project_id']
-                )
-                
-                # 转换为 HTML 并压缩（与 TS 端一致，减少 token）
-                html_code = minify_html(convert_lanhu_to_html(schema_json))
-                
-                # 远程图片 URL 替换为本地路径，生成下载映射表
-                html_code, image_url_mapping = _localize_image_urls(html_code, design['name'])
-                
-                # 保存HTML文件
-                html_filename = f"{design['name']}.html"
-                html_filepath = output_dir / html_filename
-                
-                with open(html_filepath, 'w', encoding='utf-8') as f:
-                    f.write(html_code)
-                
-                html_results.append({
-                    'success': True,
-                    'design_name': design['name'],
-                    'html_path': str(html_filepath),
-                    'html_code': html_code,
-                    'image_url_mapping': image_url_mapping,
-                })
-            except Exception as e:
-                html_results.append({
-                    'success': False,
-                    'design_name': design['name'],
-                    'error': str(e)
-                })
-
-            # ===== 3. 获取 Sketch JSON 并提取 Design Tokens / Fallback HTML =====
-            try:
-                sketch_json = await extractor.get_sketch_json(
-                    design['id'],
-                    params['team_id'],
-                    params['project_id']
-                )
-                design_tokens = _extract_design_tokens(sketch_json)
-
-                html_succeeded = any(
-                    hr.get('design_name') == design['name'] and hr.get('success')
-                    for hr in html_results
-                )
-
-                if html_succeeded and design_tokens:
-                    for hr in html_results:
-                        if hr.get('design_name') == design['name'] and hr.get('success'):
-                            hr['design_tokens'] = design_tokens
-                            break
-                elif not html_succeeded:
-                    device_str = sketch_json.get('device', '')
-                    _design_scale = 2.0
-                    if '@3x' in device_str:
-                        _design_scale = 3.0
-                    elif '@1x' in device_str:
-                        _design_scale = 1.0
-
-                    _design_img_url = design['url'].split('?')[0]
-                    fallback_html, fallback_img_mapping, fallback_layer_annots = convert_sketch_to_html(
-                        sketch_json, _design_scale, _design_img_url
-                    )
-                    fallback_img_mapping['./assets/designs/design.png'] = _design_img_url
-                    fallback_html = minify_html(fallback_html)
-                    fallback_annotations = _extract_full_annotations_from_sketch(sketch_json, _design_scale)
-
-                    for hr in html_results:
-                        if hr.get('design_name') == design['name'] and not hr.get('success'):
-                            hr['sketch_html'] = fallback_html
-                            hr['sketch_annotations'] = fallback_annotations
-                            hr['image_url_mapping'] = fallback_img_mapping
-                            hr['layer_css_annotations'] = fallback_layer_annots
-                            if design_tokens:
-                                hr['design_tokens'] = design_tokens
-                            break
-            except Exception:
-                pass
+        analyzed = await asyncio.gather(*(_analyze(design) for design in target_designs))
+        image_results = [image_result for image_result, _ in analyzed]
+        html_results = [html_result for _, html_result in analyzed]
 
         # Build return content
         content = []
@@ -5840,11 +7029,7 @@ async def lanhu_say(
     store.record_collaborator(user_name, user_role)
     
     # 保存项目元数据到store（如果首次获取到）
-    if metadata.get('project_name') and not store._data.get('project_name'):
-        store._data['project_name'] = metadata['project_name']
-    if metadata.get('folder_name') and not store._data.get('folder_name'):
-        store._data['folder_name'] = metadata['folder_name']
-    store._save()
+    store.set_project_info(metadata.get('project_name'), metadata.get('folder_name'))
     
     message = store.save_message(
         summary=summary,
@@ -6146,8 +7331,7 @@ async def lanhu_say_list(
         "status": "success",
         "mode": "single_project",
         "project_id": project_id,
-        "project_name": store._data.get('project_name'),
-        "folder_name": store._data.get('folder_name'),
+        **store.get_project_info(),
         "current_user": {"name": user_name, "role": user_role},
         "total_messages": len(filtered_messages),
         "total_groups": len(groups),
@@ -6414,7 +7598,15 @@ async def lanhu_get_members(
 @mcp.custom_route("/health", methods=["GET"])
 async def health_check(request):
     from starlette.responses import JSONResponse
-    return JSONResponse({"status": "ok"})
+    return JSONResponse({
+        "status": "ok",
+        "browser_pool": browser_pool.stats(),
+        "axure_blobs": axure_blobs.stats(),
+        "metadata_cache": metadata_cache.stats(),
+        "design_artifacts": design_artifacts.stats(),
+        "http_clients": lanhu_clients.stats(),
+        "messages": message_db.stats(),
+    })
 
 
 @mcp.custom_route("/config/cookie", methods=["POST"])
@@ -6429,6 +7621,8 @@ async def update_cookie(request):
             return JSONResponse({"status": "error", "message": "Missing cookie"}, status_code=400)
         COOKIE = cookie
         DDS_COOKIE = cookie
+        # 之后的请求使用带新 Cookie 的客户端，进行中的请求继续用旧客户端完成
+        await lanhu_clients.rotate()
         return JSONResponse({"status": "ok", "message": "Cookie updated"})
     except Exception as e:
         return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
@@ -0,0 +1,27 @@
+"""Tests for browser-free Axure page text extraction."""
+
+from lanhu_mcp_server import extract_axure_text_from_html
+
+
+def test_extracts_red_notes_shapes_and_visible_text():
+    html = """<html><head><script>var ignored = 1;</script></head><body>
+    <div id="u0" class="ax_default shape"><p><span>登录</span></p></div>
+    <div id="u1" class="ax_default shape"><p><span style="color:#FF0000;">密码错误需提示</span></p></div>
+    <div id="u2" style="visibility:hidden;display:none"><p>隐藏状态</p></div>
+    <div id="u3"><p><span style="background-color:#ff0000">背景</span></p></div>
+    </body></html>"""
+
+    text = extract_axure_text_from_html(html)
+
+    assert text.startswith("[Important Tips/Warnings]\n密码错误需提示")
+    assert "[Full Page Text]\n登录\n密码错误需提示\n背景" in text
+    assert "隐藏状态" not in text
+    assert "ignored" not in text
+    # 形状少于 6 个时不输出流程图段落
+    assert "[Flowchart/Component Text]" not in text
+
+
+def test_returns_empty_when_page_is_rendered_by_script():
+    html = "<html><body><div id='base'></div><script>render()</script></body></html>"
+
+    assert extract_axure_text_from_html(html) == ""
@@ -0,0 +1,81 @@
+"""Tests for the download manager and the content-addressed Axure blob store."""
+
+import asyncio
+import hashlib
+import os
+
+import httpx
+import pytest
+
+from lanhu_mcp_server import AxureBlobStore, DownloadManager
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_fetch_retries_server_errors_and_dedupes(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, content=b"body{}")
+
+    store = AxureBlobStore(tmp_path / "blobs", DownloadManager(concurrency=2, per_host=2, retries=2))
+
+    async def run():
+        async with _client(handler) as client:
+            return await asyncio.gather(
+                store.fetch(client, "abc123", "http://cdn/abc123"),
+                store.fetch(client, "abc123", "http://cdn/abc123"),
+            )
+
+    paths = asyncio.run(run())
+
+    assert paths[0] == paths[1] == store.path("abc123")
+    assert paths[0].read_bytes() == b"body{}"
+    assert calls == ["/abc123", "/abc123"]
+    assert list(paths[0].parent.glob("*.tmp")) == []
+
+
+def test_download_verifies_md5(tmp_path):
+    body = b"PNG"
+    sign = hashlib.md5(body).hexdigest() + ".png"
+    responses = [b"truncated", body]
+
+    def handler(request):
+        return httpx.Response(200, content=responses.pop(0))
+
+    manager = DownloadManager(concurrency=1, per_host=1, retries=1)
+    store = AxureBlobStore(tmp_path / "blobs", manager)
+
+    async def run(s):
+        async with _client(handler) as client:
+            return await store.fetch(client, s, f"http://cdn/{s}")
+
+    assert asyncio.run(run(sign)).read_bytes() == body
+    assert manager.checksum_mismatches == 1
+
+    responses[:] = [b"bad", b"bad"]
+    other = hashlib.md5(b"other").hexdigest()
+    with pytest.raises(RuntimeError):
+        asyncio.run(run(other))
+    assert not store.path(other).exists()
+
+
+def test_materialize_links_blob_into_document(tmp_path):
+    store = AxureBlobStore(tmp_path / "blobs", DownloadManager(concurrency=1, per_host=1, retries=0))
+    blob = store.path("abc123")
+    blob.parent.mkdir(parents=True)
+    blob.write_bytes(b"PNG")
+
+    dest = tmp_path / "doc" / "images" / "a.png"
+    store.materialize("abc123", dest)
+    assert dest.read_bytes() == b"PNG"
+    assert os.path.samefile(dest, blob)
+
+    html = tmp_path / "doc" / "p.html"
+    store.materialize("abc123", html, copy=True)
+    assert not os.path.samefile(html, blob)
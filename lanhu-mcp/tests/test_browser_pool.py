@@ -0,0 +1,127 @@
+"""Tests for the browser pool: local resource routing and restarts."""
+
+import asyncio
+
+import lanhu_mcp_server
+from lanhu_mcp_server import BrowserPool
+
+
+class _Request:
+    def __init__(self, url):
+        self.url = url
+
+
+class _Route:
+    def __init__(self, url):
+        self.request = _Request(url)
+        self.fulfilled = None
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+
+def _serve(pool, url):
+    route = _Route(url)
+    asyncio.run(pool._serve_local(route))
+    return route.fulfilled
+
+
+def test_mount_serves_files_from_resource_dir(tmp_path):
+    (tmp_path / "页面 1.html").write_text("<html></html>", encoding="utf-8")
+    pool = BrowserPool(size=1, max_pages=10)
+    base_url = pool.mount(str(tmp_path))
+
+    fulfilled = _serve(pool, f"{base_url}/%E9%A1%B5%E9%9D%A2%201.html?v=1")
+
+    assert fulfilled == {"path": str((tmp_path / "页面 1.html").resolve())}
+
+
+def test_local_routing_rejects_unknown_and_escaping_paths(tmp_path):
+    pool = BrowserPool(size=1, max_pages=10)
+    base_url = pool.mount(str(tmp_path / "resources"))
+
+    assert _serve(pool, f"{base_url}/missing.html")["status"] == 404
+    assert _serve(pool, f"{base_url}/../../etc/passwd")["status"] == 404
+    assert _serve(pool, "http://axure.local/unknown/index.html")["status"] == 404
+
+
+class _FakePage:
+    async def close(self):
+        pass
+
+
+class _FakeContext:
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        return _FakePage()
+
+    async def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        return _FakeContext()
+
+    async def close(self):
+        self.connected = False
+
+
+class _FakePlaywright:
+    def __init__(self, browsers):
+        self.chromium = self
+        self.browsers = browsers
+
+    async def launch(self, **kwargs):
+        self.browsers.append(_FakeBrowser())
+        return self.browsers[-1]
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+def test_waiters_on_old_queue_are_served_after_browser_restart(monkeypatch):
+    browsers = []
+    monkeypatch.setattr(lanhu_mcp_server, "async_playwright", lambda: _FakePlaywright(browsers))
+    pool = BrowserPool(size=1, max_pages=10)
+
+    async def run():
+        holding = asyncio.Event()
+        release = asyncio.Event()
+
+        async def holder():
+            async with pool.page():
+                holding.set()
+                await release.wait()
+
+        async def user():
+            async with pool.page():
+                pass
+
+        first = asyncio.create_task(holder())
+        await holding.wait()
+        waiters = [asyncio.create_task(user()) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        # 浏览器在等待期间退出，下一次取用触发重启
+        browsers[0].connected = False
+        await asyncio.wait_for(user(), timeout=1)
+        release.set()
+        await asyncio.wait_for(asyncio.gather(first, *waiters), timeout=1)
+        await pool.close()
+
+    asyncio.run(run())
+    assert len(browsers) == 2
+    assert pool.restarts == 1
+    assert pool.pages_rendered == 5
@@ -0,0 +1,57 @@
+"""Tests for the shared Lanhu HTTP client pool."""
+
+import asyncio
+
+import lanhu_mcp_server
+from lanhu_mcp_server import LanhuClientPool, LanhuExtractor
+
+
+def test_extractors_share_one_client_per_profile():
+    pool = LanhuClientPool()
+
+    async def run():
+        first, second = pool.acquire(), pool.acquire()
+        dds = pool.acquire("dds")
+        assert first is second
+        assert dds is not first
+        assert dds.headers["Referer"] == "https://dds.lanhuapp.com/"
+        await pool.release(first)
+        await pool.release(second)
+        assert not first.is_closed
+        await pool.close()
+        assert first.is_closed and dds.is_closed
+
+    asyncio.run(run())
+
+
+def test_rotate_keeps_in_flight_client_until_released(monkeypatch):
+    pool = LanhuClientPool()
+
+    async def run():
+        monkeypatch.setattr(lanhu_mcp_server, "COOKIE", "old=1")
+        old = pool.acquire()
+        monkeypatch.setattr(lanhu_mcp_server, "COOKIE", "new=1")
+        await pool.rotate()
+
+        new = pool.acquire()
+        assert new is not old
+        assert new.headers["Cookie"] == "new=1"
+        assert not old.is_closed
+
+        await pool.release(old)
+        assert old.is_closed
+        await pool.release(new)
+        assert not new.is_closed
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_parse_url_does_not_acquire_client(monkeypatch):
+    pool = LanhuClientPool()
+    monkeypatch.setattr(lanhu_mcp_server, "lanhu_clients", pool)
+
+    params = LanhuExtractor().parse_url("tid=t1&pid=p1&docId=d1")
+
+    assert params["project_id"] == "p1"
+    assert pool.stats()["created"] == 0
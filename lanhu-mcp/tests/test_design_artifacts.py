@@ -0,0 +1,123 @@
+"""Tests for the per-version design conversion cache used by _analyze_design."""
+
+import asyncio
+
+import lanhu_mcp_server
+from lanhu_mcp_server import MetadataCache, _analyze_design
+
+PARAMS = {"project_id": "p1", "team_id": "t1"}
+DESIGN = {"id": "img1", "name": "home", "url": "https://cdn.example/home.png?x-oss-process=1"}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeClient:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def get(self, url):
+        self.calls.append(("sketch_json", url))
+        return FakeResponse({"device": "iPhone @2x"})
+
+
+class FakeExtractor:
+    """只提供 _analyze_design 用到的公开方法，记录每次远程调用"""
+
+    def __init__(self):
+        self.calls = []
+        self.client = FakeClient(self.calls)
+        self.schema_version = "s1"
+        self.sketch_version = "k1"
+        self.schema_fails = False
+
+    async def get_design_version_id(self, image_id, team_id, project_id):
+        return self.schema_version
+
+    async def get_design_schema_by_version(self, version_id):
+        self.calls.append(("schema", version_id))
+        if self.schema_fails:
+            raise Exception("schema unavailable")
+        return {"version": version_id}
+
+    async def get_sketch_version(self, image_id, team_id, project_id):
+        return {"id": self.sketch_version, "json_url": f"https://cdn.example/{self.sketch_version}.json"}
+
+
+def _setup(monkeypatch, tmp_path):
+    conversions = []
+
+    def convert_schema(schema_json, design_name):
+        conversions.append(("schema", schema_json["version"]))
+        return f"<div>{schema_json['version']}</div>", {}
+
+    def convert_sketch(sketch_json, design_scale, design_img_url, with_fallback):
+        conversions.append(("sketch", with_fallback))
+        result = {"design_tokens": "tokens"}
+        if with_fallback:
+            result.update(sketch_html="<div>sketch</div>", sketch_annotations="notes",
+                          image_url_mapping={}, layer_css_annotations=[])
+        return result
+
+    async def download(client, url, path):
+        path.write_bytes(b"png")
+
+    monkeypatch.setattr(lanhu_mcp_server, "design_artifacts",
+                        MetadataCache(tmp_path / "cache", max_bytes=1024 * 1024, max_files=100))
+    monkeypatch.setattr(lanhu_mcp_server, "DESIGN_CONVERT_WORKERS", 0)
+    monkeypatch.setattr(lanhu_mcp_server, "_design_executor", None)
+    monkeypatch.setattr(lanhu_mcp_server, "_convert_design_schema", convert_schema)
+    monkeypatch.setattr(lanhu_mcp_server, "_convert_sketch_design", convert_sketch)
+    monkeypatch.setattr(lanhu_mcp_server.downloads, "download", download)
+    return conversions
+
+
+def _analyze(extractor, tmp_path):
+    return asyncio.run(_analyze_design(extractor, DESIGN, PARAMS, tmp_path))
+
+
+def test_same_version_is_served_from_cache_and_new_version_reconverts(monkeypatch, tmp_path):
+    conversions = _setup(monkeypatch, tmp_path)
+    extractor = FakeExtractor()
+
+    _, first = _analyze(extractor, tmp_path)
+    assert first["html_code"] == "<div>s1</div>" and first["design_tokens"] == "tokens"
+    assert conversions == [("schema", "s1"), ("sketch", False)]
+
+    extractor.calls.clear()
+    _, cached = _analyze(extractor, tmp_path)
+    assert cached["html_code"] == "<div>s1</div>" and cached["design_tokens"] == "tokens"
+    assert len(conversions) == 2
+    assert extractor.calls == []
+
+    extractor.schema_version, extractor.sketch_version = "s2", "k2"
+    _, updated = _analyze(extractor, tmp_path)
+    assert updated["html_code"] == "<div>s2</div>"
+    assert conversions[2:] == [("schema", "s2"), ("sketch", False)]
+
+
+def test_tokens_only_entry_is_upgraded_when_schema_fails(monkeypatch, tmp_path):
+    conversions = _setup(monkeypatch, tmp_path)
+    extractor = FakeExtractor()
+    _analyze(extractor, tmp_path)
+
+    # Schema 新版本拉取失败，Sketch 版本不变：缓存里只有 Design Tokens，需要补做降级转换
+    extractor.schema_version, extractor.schema_fails = "s2", True
+    extractor.calls.clear()
+    _, fallback = _analyze(extractor, tmp_path)
+    assert not fallback["success"]
+    assert fallback["sketch_html"] == "<div>sketch</div>" and fallback["design_tokens"] == "tokens"
+    assert conversions[2:] == [("sketch", True)]
+    assert ("sketch_json", "https://cdn.example/k1.json") in extractor.calls
+
+    # 升级后的完整结果写回缓存，再次降级时不再转换
+    extractor.calls.clear()
+    _, again = _analyze(extractor, tmp_path)
+    assert again["sketch_html"] == "<div>sketch</div>"
+    assert len(conversions) == 3
+    assert [call for call in extractor.calls if call[0] == "sketch_json"] == []
@@ -0,0 +1,93 @@
+"""Tests for the design conversion process pool and its in-process fallback."""
+
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import lanhu_mcp_server
+from lanhu_mcp_server import _run_cpu_bound, shutdown_design_executor, start_design_executor
+
+
+def _square_with_pid(n):
+    return n * n, os.getpid()
+
+
+class _BrokenExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_conversion_runs_in_process_when_pool_is_disabled(monkeypatch):
+    monkeypatch.setattr(lanhu_mcp_server, "DESIGN_CONVERT_WORKERS", 0)
+    monkeypatch.setattr(lanhu_mcp_server, "_design_executor", None)
+
+    assert asyncio.run(_run_cpu_bound(_square_with_pid, 3)) == (9, os.getpid())
+    assert lanhu_mcp_server._design_executor is None
+
+
+def test_broken_pool_is_dropped_and_conversion_runs_in_process(monkeypatch):
+    broken = _BrokenExecutor()
+    monkeypatch.setattr(lanhu_mcp_server, "_design_executor", broken)
+
+    assert asyncio.run(_run_cpu_bound(_square_with_pid, 4)) == (16, os.getpid())
+    assert broken.shut_down
+    assert lanhu_mcp_server._design_executor is None
+
+
+def test_started_pool_converts_in_workers_and_keeps_call_order(monkeypatch):
+    monkeypatch.setattr(lanhu_mcp_server, "DESIGN_CONVERT_WORKERS", 2)
+    monkeypatch.setattr(lanhu_mcp_server, "_design_executor", None)
+    start_design_executor()
+    try:
+        async def run():
+            return await asyncio.gather(*(_run_cpu_bound(_square_with_pid, n) for n in range(6)))
+
+        results = asyncio.run(run())
+    finally:
+        shutdown_design_executor()
+
+    assert [square for square, _ in results] == [n * n for n in range(6)]
+    assert os.getpid() not in {pid for _, pid in results}
+
+
+def test_analyze_results_follow_target_designs_order(monkeypatch, tmp_path):
+    designs = [{"id": f"img{i}", "name": f"design{i}", "index": i + 1, "url": ""} for i in range(4)]
+
+    async def fake_designs(extractor, url):
+        return {"status": "success", "designs": designs, "project_name": "Demo"}
+
+    async def fake_analyze(extractor, design, params, output_dir):
+        # 越靠前的设计图完成得越晚
+        await asyncio.sleep(0.01 * (len(designs) - design["index"]))
+        return (
+            {"success": False, "design_name": design["name"], "error": "skipped"},
+            {"success": False, "design_name": design["name"], "error": "skipped"},
+        )
+
+    class FakeStore:
+        def __init__(self, project_id):
+            pass
+
+        def record_collaborator(self, name, role):
+            pass
+
+    monkeypatch.setattr(lanhu_mcp_server, "_get_designs_internal", fake_designs)
+    monkeypatch.setattr(lanhu_mcp_server, "_analyze_design", fake_analyze)
+    monkeypatch.setattr(lanhu_mcp_server, "MessageStore", FakeStore)
+    monkeypatch.setattr(lanhu_mcp_server, "DATA_DIR", tmp_path)
+
+    content = asyncio.run(lanhu_mcp_server.lanhu_get_ai_analyze_design_result.fn(
+        "https://lanhuapp.com/web/#/item/project/stage?tid=t1&pid=p1",
+        ["design3", "1", "design2"],
+    ))
+
+    summary = content[0]
+    positions = [summary.index(f"✗ {name}: skipped") for name in ("design3", "design0", "design2")]
+    assert positions == sorted(positions)
+    assert "design1" not in summary
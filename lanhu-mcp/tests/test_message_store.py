@@ -0,0 +1,64 @@
+"""Tests for the SQLite-backed team message store."""
+
+import json
+import threading
+
+from lanhu_mcp_server import MessageDB, MessageStore
+
+
+def test_legacy_json_files_are_imported_once(tmp_path):
+    legacy = tmp_path / "messages"
+    legacy.mkdir()
+    (legacy / "p1.json").write_text(json.dumps({
+        "project_id": "p1",
+        "next_id": 5,
+        "project_name": "Demo",
+        "messages": [{"id": 4, "summary": "old", "content": "body", "mentions": ["后端"],
+                      "created_at": "2026-01-01 10:00:00", "project_id": "p1"}],
+        "collaborators": [{"name": "a", "role": "后端", "first_seen": "x", "last_seen": "x"}],
+    }), encoding="utf-8")
+
+    db = MessageDB(tmp_path / "messages.db", legacy_dir=legacy)
+    store = MessageStore("p1", db=db)
+    assert store.get_message_by_id(4)["content"] == "body"
+    assert store.get_project_info()["project_name"] == "Demo"
+    assert store.save_message("new", "c", "b", "前端")["id"] == 5
+    db.close()
+
+    reopened = MessageStore("p1", db=MessageDB(tmp_path / "messages.db", legacy_dir=legacy))
+    assert [m["id"] for m in reopened.get_messages()] == [5, 4]
+    assert (legacy / "p1.json").exists()
+
+
+def test_mentions_me_uses_normalized_role_and_everyone(tmp_path):
+    db = MessageDB(tmp_path / "messages.db")
+    store = MessageStore("p1", db=db)
+    store.save_message("to backend", "c", "a", "产品", mentions=["后端"])
+    store.save_message("to all", "c", "a", "产品", mentions=["所有人"])
+    store.save_message("to qa", "c", "a", "产品", mentions=["测试"])
+
+    flags = {m["summary"]: m["mentions_me"] for m in MessageStore(db=db).get_all_messages("php后端")}
+    assert flags == {"to backend": True, "to all": True, "to qa": False}
+
+    store.update_message(3, "b", "测试", mentions=["后端"])
+    assert store.get_message_by_id(3, user_role="后端")["mentions_me"] is True
+
+
+def test_concurrent_appends_from_separate_connections_get_unique_ids(tmp_path):
+    path = tmp_path / "messages.db"
+    stores = [MessageStore("p1", db=MessageDB(path)) for _ in range(4)]
+
+    def append(store):
+        for i in range(25):
+            store.save_message(f"s{i}", "c", "a", "后端")
+            store.record_collaborator("a", "后端")
+
+    threads = [threading.Thread(target=append, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = sorted(m["id"] for m in stores[0].get_messages())
+    assert ids == list(range(1, 101))
+    assert len(stores[0].get_collaborators()) == 1
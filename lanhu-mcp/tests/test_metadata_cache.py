@@ -0,0 +1,50 @@
+"""Tests for the two-tier metadata cache."""
+
+import asyncio
+
+from lanhu_mcp_server import MetadataCache
+
+
+def test_version_mismatch_is_a_miss_and_disk_survives_restart(tmp_path):
+    cache = MetadataCache(tmp_path, max_bytes=1024 * 1024, max_files=100)
+    cache.set("pages", "p_d", {"pages": [1, 2]}, version_id="v1")
+
+    assert cache.get("pages", "p_d", "v1") == {"pages": [1, 2]}
+    assert cache.get("pages", "p_d", "v2") is None
+
+    restarted = MetadataCache(tmp_path, max_bytes=1024 * 1024, max_files=100)
+    assert restarted.get("pages", "p_d", "v1") == {"pages": [1, 2]}
+    assert restarted.disk_reads == 1
+
+
+def test_memory_tier_is_bounded_and_returns_copies(tmp_path):
+    cache = MetadataCache(tmp_path, max_bytes=64, max_files=100)
+    cache.set("designs", "a", {"name": "a" * 20})
+    cache.set("designs", "b", {"name": "b" * 20})
+    cache.set("designs", "c", {"name": "c" * 20})
+
+    assert cache.stats()["bytes"] <= 64
+    assert ("designs", "a") not in cache._memory
+
+    data = cache.get("designs", "a")
+    data["name"] = "changed"
+    assert cache.get("designs", "a") == {"name": "a" * 20}
+
+
+def test_revalidate_runs_once_per_key(tmp_path):
+    cache = MetadataCache(tmp_path, max_bytes=1024, max_files=100)
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        await asyncio.sleep(0)
+        cache.set("doc_info", "k", {"v": 2})
+
+    async def run():
+        cache.revalidate("doc_info", "k", refresh)
+        cache.revalidate("doc_info", "k", refresh)
+        await asyncio.gather(*cache._refreshing.values())
+
+    asyncio.run(run())
+    assert calls == [1]
+    assert cache.get("doc_info", "k") == {"v": 2}
@@ -0,0 +1,47 @@
+"""Tests for the flattened Sketch/PS layer tree."""
+
+from lanhu_mcp_server import (
+    SketchLayers,
+    SketchLayerTree,
+    _extract_design_tokens,
+    _extract_full_annotations_from_sketch,
+)
+
+
+def test_tree_is_preorder_with_subtree_ends_and_paths():
+    layers = [
+        {"name": "a", "layers": [{"name": "a1"}, {"name": "a2", "layers": [{"name": "x"}]}],
+         "children": [{"name": "c"}]},
+        "not-a-layer",
+        {"name": "b"},
+    ]
+    tree = SketchLayerTree([layers], ("layers", "children"))
+
+    assert [n["name"] for n in tree.nodes] == ["a", "a1", "a2", "x", "c", "b"]
+    assert tree.parent == [-1, 0, 0, 2, 0, -1]
+    assert tree.end == [5, 2, 4, 4, 5, 6]
+    assert tree.roots == [0, 5]
+    assert tree.children(0) == [1, 2, 4]
+    assert tree.paths()[3] == "a/a2/x"
+
+
+def test_hidden_layers_are_pruned_with_their_subtree():
+    sketch = {"artboard": {"layers": [
+        {"name": "shown", "layers": [{"name": "inner"}]},
+        {"name": "hidden", "isVisible": False, "layers": [{"name": "lost"}]},
+    ]}}
+    tree = SketchLayers(sketch).artboard()
+    assert [n["name"] for n in tree.nodes] == ["shown", "inner"]
+
+
+def test_deeply_nested_layers_do_not_hit_the_recursion_limit():
+    leaf = {"name": "s", "type": "shape", "ddsOriginFrame": {"x": 0, "y": 0, "width": 5, "height": 5},
+            "borders": [{"isEnabled": True, "color": {"value": "#000"}, "thickness": 1}]}
+    ps_leaf = {"name": "t", "type": "textLayer", "left": 0, "top": 0, "width": 10, "height": 10,
+               "textInfo": {"text": "hi", "size": 24, "color": {"red": 0, "green": 0, "blue": 0}}}
+    for depth in range(3000):
+        leaf = {"name": f"g{depth}", "type": "group", "layers": [leaf]}
+        ps_leaf = {"name": f"g{depth}", "type": "layerSection", "width": 0, "height": 0, "layers": [ps_leaf]}
+
+    assert "border" in _extract_design_tokens({"artboard": {"layers": [leaf]}})
+    assert '"hi"' in _extract_full_annotations_from_sketch({"board": {"layers": [ps_leaf]}})
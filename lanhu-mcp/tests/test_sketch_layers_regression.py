@@ -0,0 +1,54 @@
+"""Seeded regression test: layer-tree consumers match the recursive implementation.
+
+The digests below were recorded by running the same seeded trees through the
+recursive traversal that SketchLayers replaced. The trees come from
+benchmarks/bench_sketch_layers.py and include hidden layers, ``children``
+keys, empty names and zero-size containers; if the generator changes, the
+digests must be re-recorded from that implementation.
+"""
+
+import hashlib
+import json
+
+import pytest
+
+import lanhu_mcp_server as lanhu
+from benchmarks.bench_sketch_layers import extract_slices, ps_sketch, sketch_sketch
+
+SEEDS = range(60)
+
+EXPECTED = {
+    'tokens': '6ecd90e3d4fd60d6a4a18c1d4f945ac417e784dc58aafdeb963837ef7a98dbc8',
+    'html': 'bdf3cbe1d9f4b18ddd12892425c0d83bebd25f18e4dc46ccd7957f5b569af4fa',
+    'annotations': 'c6bb66483f4484340df6035885e0dd6584650b0259f621e1c192b7c636fdf46f',
+    'slices': '4e2d6f1680b4654d7d0e44403f8fe03ad06e4e1ad8db4f30ef72f57e301a5b69',
+}
+
+
+def _call(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:
+        return ['EXC', type(e).__name__]
+
+
+@pytest.fixture(scope='module')
+def digests():
+    hashes = {name: hashlib.sha256() for name in EXPECTED}
+    for seed in SEEDS:
+        for data in (ps_sketch(seed, 12), sketch_sketch(seed, 6), sketch_sketch(seed, 4, info=True)):
+            outputs = {
+                'tokens': _call(lanhu._extract_design_tokens, data),
+                'slices': _call(extract_slices, data),
+            }
+            if 'board' in data:
+                outputs['html'] = _call(lanhu.convert_sketch_to_html, data, 2.0, 'u')
+                outputs['annotations'] = _call(lanhu._extract_full_annotations_from_sketch, data, 2.0)
+            for name, value in outputs.items():
+                hashes[name].update(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode())
+    return {name: h.hexdigest() for name, h in hashes.items()}
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED))
+def test_output_matches_recursive_implementation(digests, name):
+    assert digests[name] == EXPECTED[name]